@@ -0,0 +1,239 @@
+"""
+Benchmark headless de la latencia de rerun de cada sección de main.py.
+
+Usa `streamlit.testing.v1.AppTest` para ejecutar la aplicación sin navegador y
+simula interacciones típicas: enviar el cuestionario, cambiar el año de la
+sección Respuestas, seleccionar clústeres y usar los filtros del dashboard.
+
+- Frío: AppTest nuevo y cachés vacías (st.cache_data, st.cache_resource y la
+  caché de figuras) antes de la primera ejecución de la sección.
+- Caliente: reruns posteriores sobre la misma sesión.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_secciones.py --etiqueta antes
+    python benchmarks/bench_secciones.py --etiqueta despues --comparar benchmarks/resultados/antes.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from utils.helpers.cache_figuras import CACHE_FIGURAS
+
+APP = os.path.join(RAIZ, "main.py")
+TIMEOUT = 120
+
+USUARIO = {"nombre": "Benchmark", "estado": "JALISCO", "municipio": "ZAPOPAN", "ingresos": 20000}
+YEARS_RESPUESTAS = ["2020", "2018", "2022"]
+COMBINACIONES_CLUSTERS = [
+    ["Promedio", "Quico"],
+    ["Doña Florinda", "Don Ramón", "El Chavo"],
+    ["Promedio", "Doña Florinda", "Quico", "Don Ramón", "El Chavo"],
+    ["Promedio"],
+]
+ESTADOS_DASHBOARD = [["JALISCO"], ["JALISCO", "NUEVO LEON"], ["MEXICO", "PUEBLA", "VERACRUZ DE IGNACIO DE LA LLAVE"]]
+
+
+def _cronometrar(accion):
+    """Ejecuta `accion` (que corre la app) y devuelve su duración en ms."""
+    inicio = time.perf_counter()
+    at = accion()
+    duracion = (time.perf_counter() - inicio) * 1000
+    if at.exception:
+        raise RuntimeError(f"La aplicación lanzó una excepción: {at.exception[0].value}")
+    return duracion
+
+
+def _app_en(seccion, user_data=None):
+    at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+    at.session_state["section"] = seccion
+    if user_data:
+        at.session_state["user_data"] = user_data
+    return at
+
+
+def _user_data():
+    return {
+        "Nombre": USUARIO["nombre"],
+        "Estado": USUARIO["estado"],
+        "Municipio": USUARIO["municipio"],
+        "Ingresos": USUARIO["ingresos"],
+        "Percepcion_Economica_Personal": "Neutra",
+        "Ahorro": "Sí",
+    }
+
+
+# Escenarios: cada uno devuelve una lista de latencias (ms) de reruns calientes
+def escenario_introduccion(at, repeticiones):
+    return [_cronometrar(at.run) for _ in range(repeticiones)]
+
+
+def escenario_cuestionario(at, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        at.session_state["section"] = "Cuestionario"
+        tiempos.append(_cronometrar(at.run))
+        tiempos.append(_cronometrar(lambda: at.text_input(key="nombre_input").input(USUARIO["nombre"]).run()))
+        tiempos.append(_cronometrar(lambda: at.selectbox(key="estado_select").set_value(USUARIO["estado"]).run()))
+        tiempos.append(_cronometrar(lambda: at.selectbox(key="municipio_select").set_value(USUARIO["municipio"]).run()))
+        tiempos.append(_cronometrar(lambda: at.slider(key="ingresos_select").set_value(USUARIO["ingresos"]).run()))
+        enviar = next(boton for boton in at.button if boton.label == "Enviar")
+        tiempos.append(_cronometrar(lambda: enviar.click().run()))
+    return tiempos
+
+
+def escenario_respuestas(at, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        year = YEARS_RESPUESTAS[i % len(YEARS_RESPUESTAS)]
+        tiempos.append(_cronometrar(lambda: at.selectbox[0].set_value(year).run()))
+    return tiempos
+
+
+def escenario_clusters(at, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        seleccion = COMBINACIONES_CLUSTERS[i % len(COMBINACIONES_CLUSTERS)]
+        tiempos.append(_cronometrar(lambda: at.multiselect[0].set_value(seleccion).run()))
+    return tiempos
+
+
+def escenario_dashboard(at, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        estados = ESTADOS_DASHBOARD[i % len(ESTADOS_DASHBOARD)]
+        tiempos.append(_cronometrar(lambda: at.radio[0].set_value("Estatal").run()))
+        tiempos.append(_cronometrar(lambda: at.multiselect[0].set_value(estados).run()))
+        tiempos.append(_cronometrar(lambda: at.selectbox(key="year_seleccionado").set_value(2020 + 2 * (i % 2)).run()))
+        tiempos.append(_cronometrar(lambda: at.radio[0].set_value("Municipal").run()))
+        tiempos.append(_cronometrar(lambda: at.multiselect[0].set_value(estados).run()))
+        municipios = list(at.multiselect[1].options)[:5]
+        tiempos.append(_cronometrar(lambda: at.multiselect[1].set_value(municipios).run()))
+    return tiempos
+
+
+ESCENARIOS = {
+    "Introducción": (escenario_introduccion, None),
+    "Cuestionario": (escenario_cuestionario, None),
+    "Respuestas": (escenario_respuestas, _user_data),
+    "Clusters": (escenario_clusters, None),
+    "Dashboard": (escenario_dashboard, None),
+}
+
+
+def _limpiar_caches():
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    CACHE_FIGURAS.limpiar()
+
+
+def _percentiles(tiempos):
+    tiempos = np.asarray(tiempos, dtype=float)
+    return {
+        "n": int(tiempos.size),
+        "p50_ms": round(float(np.percentile(tiempos, 50)), 2),
+        "p95_ms": round(float(np.percentile(tiempos, 95)), 2),
+        "max_ms": round(float(tiempos.max()), 2),
+    }
+
+
+def medir_seccion(seccion, repeticiones_frio, repeticiones_caliente):
+    """
+    Mide una sección en frío y en caliente.
+
+    Las latencias se miden sin tracemalloc (su sobrecosto distorsiona los tiempos);
+    la memoria pico de Python se mide en una pasada adicional en frío + caliente.
+
+    Returns:
+    - dict: Percentiles de latencia y memoria pico (tracemalloc) en MB.
+    """
+    escenario, crear_user_data = ESCENARIOS[seccion]
+
+    def nueva_app():
+        _limpiar_caches()
+        return _app_en(seccion, crear_user_data() if crear_user_data else None)
+
+    frio = []
+    for _ in range(repeticiones_frio):
+        at = nueva_app()
+        frio.append(_cronometrar(at.run))
+    caliente = escenario(at, repeticiones_caliente)
+
+    at = nueva_app()
+    tracemalloc.start()
+    at.run()
+    escenario(at, 1)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "frio": _percentiles(frio),
+        "caliente": _percentiles(caliente),
+        "memoria_pico_mb": round(pico / 2**20, 2),
+    }
+
+
+def comparar(resultados, anterior):
+    """Tabla de texto con el cambio de p50/p95 respecto a un resultado anterior."""
+    lineas = [f"{'sección':<14}{'modo':<10}{'p50 antes':>12}{'p50 ahora':>12}{'p95 antes':>12}{'p95 ahora':>12}"]
+    for seccion, datos in resultados["secciones"].items():
+        previo = anterior.get("secciones", {}).get(seccion)
+        if not previo:
+            continue
+        for modo in ("frio", "caliente"):
+            lineas.append(
+                f"{seccion:<14}{modo:<10}"
+                f"{previo[modo]['p50_ms']:>12.1f}{datos[modo]['p50_ms']:>12.1f}"
+                f"{previo[modo]['p95_ms']:>12.1f}{datos[modo]['p95_ms']:>12.1f}"
+            )
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latencia de rerun por sección del dashboard.")
+    parser.add_argument("--secciones", nargs="*", default=list(ESCENARIOS), choices=list(ESCENARIOS))
+    parser.add_argument("--frio", type=int, default=3, help="Repeticiones en frío por sección.")
+    parser.add_argument("--caliente", type=int, default=10, help="Repeticiones del escenario en caliente.")
+    parser.add_argument("--etiqueta", default=datetime.datetime.now().strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--salida", default=os.path.join(RAIZ, "benchmarks", "resultados"))
+    parser.add_argument("--comparar", help="Resultado JSON anterior para comparar.")
+    args = parser.parse_args(argv)
+
+    # La aplicación usa rutas relativas a la raíz del repositorio
+    os.chdir(RAIZ)
+    resultados = {
+        "etiqueta": args.etiqueta,
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "secciones": {},
+    }
+    for seccion in args.secciones:
+        resultados["secciones"][seccion] = medir_seccion(seccion, args.frio, args.caliente)
+        print(seccion, json.dumps(resultados["secciones"][seccion], ensure_ascii=False), flush=True)
+    resultados["rss_max_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    os.makedirs(args.salida, exist_ok=True)
+    ruta = os.path.join(args.salida, f"{args.etiqueta}.json")
+    with open(ruta, "w") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {ruta}")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            print(comparar(resultados, json.load(f)))
+
+
+if __name__ == "__main__":
+    main()
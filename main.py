@@ -3,45 +3,57 @@ import streamlit as st
 # Configuración inicial de Streamlit
 st.set_page_config(page_title="Dashboard Efecto Doña Florinda", layout="wide")
 
-from PIL import Image
 import base64
+import uuid
 
-from utils.helpers.data_loader import load_estado_data, load_municipio_data, load_nacional_data, load_summary_cluster_data
+# Solo módulos ligeros al arrancar: pandas, plotly y las visualizaciones se importan
+# dentro de las secciones que los usan (ver `python -m utils.helpers.perfil_importacion`)
 from utils.helpers.helper import load_css
-from utils.helpers.visualizations import graficar_deciles, graficar_percepciones, graficar_distribucion_gini, graficar_gini, graficar_ingresos_deciles, graficar_percepciones_economicas, graficar_consumo_ahorro
+from utils.helpers.registro import RegistroDatos, cargar_paquete_figuras
 from utils.helpers.introduccion import mostrar_intro
-from utils.helpers.dashboard import mostrar_dashboard_exploracion
-
-import plotly.express as px
+from utils.helpers.instrumentacion import finalizar_rerun, iniciar_rerun, medir, mostrar_figura, mostrar_panel
 
 # Cargar estilos CSS
 load_css("assets/styles.css")
 
-# Cachear la carga de datos globales
-@st.cache_data
-def cargar_datos():
-    return {
-        "estados": load_estado_data(),
-        "municipios": load_municipio_data(),
-        "nacional": load_nacional_data(),
-        "cluster": load_summary_cluster_data()
-    }
-
 # Clase principal para manejar la aplicación
 class DashboardApp:
     def __init__(self):
-        self.datos = cargar_datos()
         if "section" not in st.session_state:
             st.session_state["section"] = "Introducción"
         if "user_data" not in st.session_state:
             st.session_state["user_data"] = {}
+        # Cada sección declara los datos (y grupos de columnas) que necesita;
+        # se cargan al primer acceso desde self.datos. None = grupos del dashboard.
         self.secciones = {
-            "Introducción": self.mostrar_intro,
-            "Cuestionario": self.mostrar_cuestionario,
-            "Respuestas": self.mostrar_respuestas,
-            "Clusters": self.mostrar_cluster,
-            "Dashboard": self.mostrar_dashboard,
+            "Introducción": {"mostrar": self.mostrar_intro, "datos": {}},
+            "Cuestionario": {
+                "mostrar": self.mostrar_cuestionario,
+                "datos": {
+                    "estados": ("claves",), "municipios": ("claves",), "centroides_cluster": None,
+                    "indice_municipios": None, "distribuciones_ingreso": None,
+                },
+            },
+            "Respuestas": {
+                "mostrar": self.mostrar_respuestas,
+                "datos": {
+                    "municipios": None, "indice_municipios": None, "agregados_cluster": None,
+                    "centroides_cluster": None, "distribuciones_ingreso": None,
+                },
+            },
+            "Clusters": {"mostrar": self.mostrar_cluster, "datos": {"resumen_clusters": None}},
+            "Dashboard": {
+                "mostrar": self.mostrar_dashboard,
+                "datos": {
+                    "vista_municipios": None, "vista_estados": None,
+                    "indice_vista_municipios": None, "indice_vista_estados": None,
+                    "promedios_municipios": None, "promedios_estados": None,
+                    "sketches_municipios": None, "sketches_estados": None,
+                },
+            },
         }
+        seccion = self.secciones.get(st.session_state["section"], {})
+        self.datos = RegistroDatos(seccion.get("datos"))
 
     def navegacion_botones(self, seccion_actual):
         """Renderiza botones de navegación para moverse entre secciones."""
@@ -93,7 +105,7 @@ class DashboardApp:
         st.sidebar.markdown("---")
         st.sidebar.header("Navegación")
 
-        for section, func in self.secciones.items():
+        for section in self.secciones:
             disabled = False
             if section == "Respuestas" and not st.session_state.get("user_data"):
                 disabled = True
@@ -114,20 +126,23 @@ class DashboardApp:
             unsafe_allow_html=True
         )
 
+    @medir("render_seccion")
     def render_seccion(self):
         """Renderiza la sección seleccionada."""
         seccion_actual = self.secciones.get(st.session_state["section"])
         if seccion_actual:
-            seccion_actual()
+            seccion_actual["mostrar"]()
         else:
             st.error("Sección no encontrada.")
 
     # Secciones
+    @medir("mostrar_intro")
     def mostrar_intro(self):
         mostrar_intro()
         # Botones de navegación
         self.navegacion_botones("Introducción")
 
+    @medir("mostrar_cuestionario")
     def mostrar_cuestionario(self):
         estados = self.datos["estados"]
         municipios = self.datos["municipios"]
@@ -145,6 +160,7 @@ class DashboardApp:
         # Ingresos
         st.slider("Selecciona tus ingresos mensuales aproximados ($0 - $100,000)",
                 min_value=0, max_value=100000, step=1000, value=5000, key="ingresos_select")
+        self.mostrar_percentiles_en_vivo()
 
         # Percepciones Económicas
         st.markdown("### 💰 Percepciones Económicas")
@@ -165,6 +181,8 @@ class DashboardApp:
         st.radio("¿Cómo calificarías la estabilidad de la economía del país?", 
                 ["Muy estable", "Estable", "Inestable", "Muy inestable"], key="incertidumbre_nacional")
         
+        self.mostrar_perfil_en_vivo()
+
         # Al final de mostrar_respuestas
         # Al final de la sección del cuestionario
         st.markdown("---")  # Línea divisoria para separar visualmente
@@ -186,6 +204,64 @@ class DashboardApp:
 
         st.button("Enviar", on_click=self.enviar_respuestas)
 
+    def respuestas_actuales(self):
+        """Respuestas del cuestionario tal como están en los widgets (claves de user_data)."""
+        return {
+            "Nombre": st.session_state.get("nombre_input", ""),
+            "Estado": st.session_state.get("estado_select"),
+            "Municipio": st.session_state.get("municipio_select"),
+            "Ingresos": st.session_state.get("ingresos_select", 15000),
+            "Percepcion_Economica_Personal": st.session_state.get("percepcion_personal"),
+            "Mejora_Economica_Personal": st.session_state.get("mejora_personal"),
+            "Percepcion_Economica_Nacional": st.session_state.get("percepcion_nacional"),
+            "Mejora_Economica_Nacional": st.session_state.get("mejora_nacional"),
+            "Ahorro": st.session_state.get("ahorro_radio"),
+            "Consumo": st.session_state.get("consumo_radio"),
+            "Incertidumbre_Personal": st.session_state.get("incertidumbre_personal"),
+            "Incertidumbre_Nacional": st.session_state.get("incertidumbre_nacional"),
+        }
+
+    def mostrar_percentiles_en_vivo(self):
+        """Percentiles del ingreso seleccionado, recalculados al mover el slider."""
+        estado = st.session_state.get("estado_select")
+        municipio = st.session_state.get("municipio_select")
+        if not estado or not municipio:
+            return
+        distribuciones = self.datos["distribuciones_ingreso"]
+        year = int(distribuciones.years.max())
+        encontrado = self.datos["indice_municipios"].buscar(estado, municipio, year)
+        if encontrado is None:
+            return
+        percentiles = distribuciones.percentiles(st.session_state.get("ingresos_select", 5000), encontrado[0])
+        st.markdown(
+            f"""
+            <p><i>Con este ingreso estarías en el percentil <b>{percentiles["Municipio"]:.0f}</b> de tu municipio,
+            el <b>{percentiles["Estado"]:.0f}</b> de tu estado, el <b>{percentiles["Clúster"]:.0f}</b> de tu clúster
+            y el <b>{percentiles["Nacional"]:.0f}</b> del país ({year}).</i></p>
+            """,
+            unsafe_allow_html=True
+        )
+
+    def mostrar_perfil_en_vivo(self):
+        """Clúster más parecido al perfil personal, recalculado en cada cambio de respuesta."""
+        from utils.helpers.agregados import NOMBRES_CLUSTER
+
+        centroides = self.datos["centroides_cluster"]
+        year = max(centroides.years)
+        resultado = centroides.clasificar(self.respuestas_actuales(), year)
+        if resultado is None:
+            return
+
+        st.markdown("### 🧭 Tu Perfil en Tiempo Real")
+        st.markdown(
+            f"""
+            <p>Con tus respuestas actuales, tu perfil personal se parece más al clúster de
+            <b style="color: #FF5722;">{NOMBRES_CLUSTER.get(resultado["cluster"], "Desconocido")}</b> ({year}),
+            con una confianza de <b>{resultado["confianza"]:.0%}</b> (a {resultado["distancia"]:.2f} desviaciones estándar del centro del clúster).</p>
+            """,
+            unsafe_allow_html=True
+        )
+
     def enviar_respuestas(self):
         """Valida y procesa las respuestas del formulario con un spinner."""
         with st.spinner("Guardando tus respuestas..."):
@@ -203,24 +279,25 @@ class DashboardApp:
                 return
 
             # Guardar respuestas
-            st.session_state["user_data"] = {
-                "Nombre": st.session_state["nombre_input"],
-                "Estado": st.session_state["estado_select"],
-                "Municipio": st.session_state["municipio_select"],
-                "Ingresos": st.session_state.get("ingresos_select", 15000),
-                "Percepcion_Economica_Personal": st.session_state.get("percepcion_personal"),
-                "Mejora_Economica_Personal": st.session_state.get("mejora_personal"),
-                "Percepcion_Economica_Nacional": st.session_state.get("percepcion_nacional"),
-                "Mejora_Economica_Nacional": st.session_state.get("mejora_nacional"),
-                "Ahorro": st.session_state.get("ahorro_radio"),
-                "Consumo": st.session_state.get("consumo_radio"),
-                "Incertidumbre_Personal": st.session_state.get("incertidumbre_personal"),
-                "Incertidumbre_Nacional": st.session_state.get("incertidumbre_nacional"),
-            }
+            st.session_state["user_data"] = self.respuestas_actuales()
+
+            # Persistir sin bloquear: el almacén escribe por lotes en un hilo aparte
+            from utils.helpers.almacen import almacen_respuestas
+
+            st.session_state.setdefault("sesion_id", uuid.uuid4().hex)
+            almacen_respuestas().guardar(st.session_state["user_data"], sesion=st.session_state["sesion_id"])
             st.success("¡Formulario guardado exitosamente!")
             self.set_section("Respuestas")
 
+    @medir("mostrar_respuestas")
     def mostrar_respuestas(self):
+        from utils.helpers.agregados import medias
+        from utils.helpers.paquete_figuras import (
+            BINS_GINI, CATEGORIAS_CONSUMO_AHORRO, CATEGORIAS_PERCEPCION,
+            deciles_municipio, nivel_cluster, nivel_gini, titulo_deciles,
+        )
+        from utils.helpers.visualizations import graficar_deciles, graficar_distribucion_gini, graficar_percepciones
+
         if "user_data" not in st.session_state or not st.session_state["user_data"]:
             st.warning("Por favor, completa primero el cuestionario para ver los resultados.")
             return
@@ -240,25 +317,24 @@ class DashboardApp:
             unsafe_allow_html=True
         )
 
-        # Buscar el clúster del municipio seleccionado
+        # Buscar el clúster del municipio seleccionado en el índice precalculado
         municipio_data = self.datos["municipios"]
+        indice = self.datos["indice_municipios"]
         municipio = user_data["Municipio"]
         estado = user_data["Estado"]
 
-        municipio_cluster = municipio_data[
-            (municipio_data["nombre_municipio"].str.upper() == municipio) &
-            (municipio_data["estado"].str.upper() == estado) &
-            (municipio_data["year"] == int(year))
-        ]
-
-        if municipio_cluster.empty:
+        encontrado = indice.buscar(estado, municipio, year)
+        if encontrado is None:
             st.error(f"No se encontraron datos del clúster para tu municipio en el año {year}.")
             return
 
         # Extraer información del clúster y promedios
-        cluster = municipio_cluster["Cluster"].values[0]
-        cluster_data = municipio_data[(municipio_data["Cluster"] == cluster) & (municipio_data["year"] == int(year))]
-        promedio_cluster = cluster_data.mean(numeric_only=True).to_dict()
+        posicion, cluster = encontrado
+        municipio_cluster = municipio_data.iloc[posicion]
+        promedio_cluster = medias(self.datos["agregados_cluster"], cluster, year).to_dict()
+
+        # Las figuras precalculadas (si hay paquete vigente) se sirven desde la caché de figuras
+        cargar_paquete_figuras(self.datos.version)
 
         # Crear diccionario de deciles
         deciles = {
@@ -277,10 +353,10 @@ class DashboardApp:
         ingresos_usuario = user_data.get("Ingresos")
 
         # Mostrar datos del municipio
-        decil_1_municipio = municipio_cluster["decil_1"].values[0]
-        decil_5_municipio = municipio_cluster["decil_5"].values[0]
-        decil_10_municipio = municipio_cluster["decil_10"].values[0]
-        gini_municipio = municipio_cluster["gini"].values[0]
+        decil_1_municipio = municipio_cluster["decil_1"]
+        decil_5_municipio = municipio_cluster["decil_5"]
+        decil_10_municipio = municipio_cluster["decil_10"]
+        gini_municipio = municipio_cluster["gini"]
 
         # Resumen del municipio y clúster
         st.markdown(
@@ -304,6 +380,19 @@ class DashboardApp:
             unsafe_allow_html=True
         )
 
+        # Clúster más parecido a las respuestas personales (puede no ser el del municipio)
+        perfil_usuario = self.datos["centroides_cluster"].clasificar(user_data, year)
+        if perfil_usuario is not None:
+            coincide = perfil_usuario["cluster"] == cluster
+            st.markdown(
+                f"""
+                <p style="text-align: center;">Por tus propias respuestas, tu perfil personal se parece más a
+                <b style="color: #FF5722;">{analogias.get(perfil_usuario["cluster"], "Desconocido")}</b>
+                (confianza de <b>{perfil_usuario["confianza"]:.0%}</b>){", igual que tu municipio" if coincide else ", distinto al clúster de tu municipio"}.</p>
+                """,
+                unsafe_allow_html=True
+            )
+
         st.markdown("---")
 
         # Resumen económico del municipio
@@ -336,11 +425,14 @@ class DashboardApp:
         )
 
         st.markdown("### 📊 Comparativa Personalizada")
+        percentiles = self.datos["distribuciones_ingreso"].percentiles(ingresos_usuario, posicion)
 
         st.markdown(
             f"""
             <p>Tu ingreso mensual reportado es de <b>${ingresos_usuario:,}</b>.</p>
             <p>Comparado con el promedio del decil 5 en <b style="color: #FF9800;">{municipio}</b>, estás <b>{'por encima de la media' if ingresos_usuario > decil_5_municipio else 'por debajo de la media'}</b>.</p>
+            <p>Tu ingreso está en el percentil <b>{percentiles["Municipio"]:.0f}</b> de {municipio}, el <b>{percentiles["Estado"]:.0f}</b> de tu estado,
+            el <b>{percentiles["Clúster"]:.0f}</b> de tu clúster y el <b>{percentiles["Nacional"]:.0f}</b> del país: ese porcentaje de la población gana menos que tú.</p>
             <p>La siguiente gráfica muestra cómo se ubica tu ingreso en comparación con los diez deciles de ingresos registrados en <b style="color: #FF9800;">{municipio}</b>.</p>
             """,
             unsafe_allow_html=True
@@ -350,15 +442,12 @@ class DashboardApp:
         st.markdown("### 📈 Visualización de Comparación por Deciles")
 
         # Gráfica de deciles del municipio
-        deciles_municipio = {
-            f"Decil {i}": municipio_cluster[f"decil_{i}"].values[0] for i in range(1, 11)
-        }
         grafica_deciles = graficar_deciles(
-            deciles_municipio,
+            deciles_municipio(municipio_cluster),
             ingresos_usuario,
-            titulo=f"Comparación de tu Ingreso con los Deciles del Municipio ({year})"
+            titulo=titulo_deciles(year)
         )
-        st.plotly_chart(grafica_deciles, use_container_width=True)
+        mostrar_figura(grafica_deciles, use_container_width=True)
 
         with st.expander("¿Qué representan los deciles y la línea roja?"):
             st.markdown(
@@ -379,7 +468,7 @@ class DashboardApp:
 
 
         # Coeficiente GINI
-        gini_municipio = municipio_cluster["gini"].values[0]
+        gini_municipio = municipio_cluster["gini"]
 
         # Texto explicativo sobre el coeficiente GINI
         st.markdown("### 📉 Análisis del Coeficiente GINI")
@@ -425,12 +514,12 @@ class DashboardApp:
 
         # Gráfica de distribución del GINI
         st.markdown("### 📊 Distribución del Coeficiente GINI en Todos los Municipios")
-        graficar_distribucion_gini(
-            data=municipio_data[municipio_data["year"] == int(year)],
+        mostrar_figura(graficar_distribucion_gini(
+            data=municipio_data.iloc[indice.filas_year(year)],
             gini_municipio=gini_municipio,
-            nivel=f"Año {year}",
-            bins=20
-        )
+            nivel=nivel_gini(year),
+            bins=BINS_GINI
+        ))
 
         # Percepciones económicas
         percepcion_positiva_cluster = promedio_cluster.get("Percepcion_Economica_Personal_Positiva", 0)
@@ -469,18 +558,12 @@ class DashboardApp:
             )
 
         # Gráfico combinado para percepciones personales y nacionales
-        categorias_percepcion_combined = {
-            "Percepción Personal Positiva": "Percepcion_Economica_Personal_Positiva",
-            "Percepción Personal Negativa": "Percepcion_Economica_Personal_Negativa",
-            "Percepción Nacional Positiva": "Percepcion_Naciona_Positiva",
-            "Percepción Nacional Negativa": "Percepcion_Nacional_Negativa"
-        }
         st.markdown("### 📊 Distribución de Percepciones Económicas (Personales y Nacionales)")
-        graficar_percepciones(
-            categorias_percepcion=categorias_percepcion_combined,
-            data=cluster_data,
-            nivel=f"Clúster {cluster} ({year})"
-        )
+        mostrar_figura(graficar_percepciones(
+            categorias_percepcion=CATEGORIAS_PERCEPCION,
+            promedios=promedio_cluster,
+            nivel=nivel_cluster(cluster, year)
+        ))
 
         # Consumo y ahorro
         consumo_usuario = "positivo" if user_data.get("Ahorro") == "Sí" else "restringido"
@@ -497,16 +580,12 @@ class DashboardApp:
         st.markdown(html_consumo_ahorro, unsafe_allow_html=True)
 
         # Gráfico para consumo y ahorro
-        categorias_consumo_ahorro = {
-            "Ahorro Positivo": "Consumo_Ahorro_Positivo",
-            "Consumo Restringido": "Consumo_Ahorro_Negativo"
-        }
         st.markdown("### 📊 Distribución de Consumo y Ahorro")
-        graficar_percepciones(
-            categorias_percepcion=categorias_consumo_ahorro,
-            data=cluster_data,
-            nivel=f"Clúster {cluster} ({year})"
-        )
+        mostrar_figura(graficar_percepciones(
+            categorias_percepcion=CATEGORIAS_CONSUMO_AHORRO,
+            promedios=promedio_cluster,
+            nivel=nivel_cluster(cluster, year)
+        ))
 
         # Al final de mostrar_respuestas
         st.markdown("---")  # Línea divisoria para separar visualmente
@@ -528,8 +607,10 @@ class DashboardApp:
         # Botones de navegación
         self.navegacion_botones("Respuestas")
 
+    @medir("mostrar_cluster")
     def mostrar_cluster(self):
-        import pandas as pd
+        from utils.helpers.agregados import GINI_AGREGADO
+        from utils.helpers.visualizations import graficar_consumo_ahorro, graficar_gini, graficar_ingresos_deciles, graficar_percepciones_economicas
 
         st.title("📊 Análisis de Clústeres")
         st.markdown(
@@ -570,42 +651,14 @@ class DashboardApp:
                     <li>Percepciones económicas.</li>
                 </ul>
                 <p style="text-align:justify;font-size:16px;">
-                    También puedes comparar los datos de los clústeres seleccionados con el <b>promedio general de todos los clústeres</b>.
+                    También puedes comparar los datos de los clústeres seleccionados con el <b>promedio de todos los municipios</b>.
                 </p>
             </div>
             """,
             unsafe_allow_html=True
         )
-        # Load cluster data
-        cluster_data = self.datos["cluster"]
-
-        # Aggregate cluster data to summarize relevant KPIs
-        cluster_summary = cluster_data.groupby('Cluster').agg({
-            'gini': 'mean',
-            'decil_1': 'mean',
-            'decil_10': 'mean',
-            'Consumo_Ahorro_Negativo': 'mean',
-            'Consumo_Ahorro_Positivo': 'mean',
-            'Percepcion_Nacional_Negativa': 'mean',
-            'Percepcion_Naciona_Positiva': 'mean',
-            'Percepcion_Economica_Personal_Negativa': 'mean',
-            'Percepcion_Economica_Personal_Positiva': 'mean'
-        }).reset_index()
-
-        # Add "Promedio" cluster
-        promedio_row = cluster_summary.mean(numeric_only=True).to_dict()
-        promedio_row["Cluster"] = "Promedio"
-        cluster_summary = pd.concat([cluster_summary, pd.DataFrame([promedio_row])], ignore_index=True)
-
-        # Map cluster IDs to analogies
-        analogias = {
-            1: "Doña Florinda",
-            2: "Quico",
-            3: "Don Ramón",
-            4: "El Chavo",
-            "Promedio": "Promedio"
-        }
-        cluster_summary["Cluster_Nombre"] = cluster_summary["Cluster"].map(analogias)
+        # Resumen por clúster (con la fila "Promedio") materializado al cargar los datos
+        cluster_summary = self.datos["resumen_clusters"]
 
         # Select clusters
         clusters_seleccionados = st.multiselect(
@@ -635,14 +688,23 @@ class DashboardApp:
 
         col1, col2 = st.columns(2)
         with col1:
-            st.plotly_chart(graficar_ingresos_deciles(cluster_summary_filtered, clusters_seleccionados))
-            st.plotly_chart(graficar_gini(cluster_summary_filtered, clusters_seleccionados))
+            mostrar_figura(graficar_ingresos_deciles(cluster_summary_filtered, clusters_seleccionados))
+            mostrar_figura(graficar_gini(cluster_summary_filtered, clusters_seleccionados))
         with col2:
-            st.plotly_chart(graficar_consumo_ahorro(cluster_summary_filtered, clusters_seleccionados))
-            st.plotly_chart(graficar_percepciones_economicas(cluster_summary_filtered, clusters_seleccionados))
+            mostrar_figura(graficar_consumo_ahorro(cluster_summary_filtered, clusters_seleccionados))
+            mostrar_figura(graficar_percepciones_economicas(cluster_summary_filtered, clusters_seleccionados))
+        st.caption(
+            "Promedio: todos los municipios juntos. El GINI y los deciles de cada clúster y del promedio "
+            "son los de su población combinada, no el promedio de los valores municipales."
+        )
 
         st.markdown("## 🔍 Observaciones Resumidas por Clúster")
 
+        # GINI y deciles de la población combinada de cada clúster (los mismos de las gráficas)
+        por_cluster = cluster_summary.set_index("Cluster")
+        gini_cluster = por_cluster[GINI_AGREGADO]
+        deciles_cluster = {decil: por_cluster[f"decil_{decil}_agregado"] for decil in (1, 5, 10)}
+
         # Crear dos columnas para los expanders
         col1, col2 = st.columns(2)
 
@@ -653,11 +715,11 @@ class DashboardApp:
                     f"""
                     <p><b>Ingresos promedio mensuales:</b></p>
                     <ul>
-                        <li><b>Decil 1:</b> ${6_876:,.0f}</li>
-                        <li><b>Decil 5:</b> ${19_547:,.0f}</li>
-                        <li><b>Decil 10:</b> ${80_421:,.0f}</li>
+                        <li><b>Decil 1:</b> ${deciles_cluster[1][1]:,.0f}</li>
+                        <li><b>Decil 5:</b> ${deciles_cluster[5][1]:,.0f}</li>
+                        <li><b>Decil 10:</b> ${deciles_cluster[10][1]:,.0f}</li>
                     </ul>
-                    <p><b>Desigualdad:</b> Moderada (GINI: 0.3705)</p>
+                    <p><b>Desigualdad:</b> Moderada (GINI: {gini_cluster[1]:.4f})</p>
                     <p><b>Lo que se vive aquí:</b></p>
                     <ul>
                         <li>El 49.2% enfrenta consumo restringido, mientras que un 20.5% ahorra y gasta en cosas no esenciales.</li>
@@ -673,11 +735,11 @@ class DashboardApp:
                     f"""
                     <p><b>Ingresos promedio mensuales:</b></p>
                     <ul>
-                        <li><b>Decil 1:</b> ${8_820:,.0f}</li>
-                        <li><b>Decil 5:</b> ${29_865:,.0f}</li>
-                        <li><b>Decil 10:</b> ${465_308:,.0f}</li>
+                        <li><b>Decil 1:</b> ${deciles_cluster[1][2]:,.0f}</li>
+                        <li><b>Decil 5:</b> ${deciles_cluster[5][2]:,.0f}</li>
+                        <li><b>Decil 10:</b> ${deciles_cluster[10][2]:,.0f}</li>
                     </ul>
-                    <p><b>Desigualdad:</b> Alta (GINI: 0.5565)</p>
+                    <p><b>Desigualdad:</b> Alta (GINI: {gini_cluster[2]:.4f})</p>
                     <p><b>Lo que se vive aquí:</b></p>
                     <ul>
                         <li>43.1% enfrenta consumo restringido, aunque el 25.1% logra consumo positivo.</li>
@@ -695,11 +757,11 @@ class DashboardApp:
                     f"""
                     <p><b>Ingresos promedio mensuales:</b></p>
                     <ul>
-                        <li><b>Decil 1:</b> ${4_955:,.0f}</li>
-                        <li><b>Decil 5:</b> ${14_072:,.0f}</li>
-                        <li><b>Decil 10:</b> ${56_016:,.0f}</li>
+                        <li><b>Decil 1:</b> ${deciles_cluster[1][3]:,.0f}</li>
+                        <li><b>Decil 5:</b> ${deciles_cluster[5][3]:,.0f}</li>
+                        <li><b>Decil 10:</b> ${deciles_cluster[10][3]:,.0f}</li>
                     </ul>
-                    <p><b>Desigualdad:</b> Moderada (GINI: 0.3631)</p>
+                    <p><b>Desigualdad:</b> Moderada (GINI: {gini_cluster[3]:.4f})</p>
                     <p><b>Lo que se vive aquí:</b></p>
                     <ul>
                         <li>El 49.6% enfrenta consumo restringido, pero un 21.9% mejora su situación con ahorro.</li>
@@ -715,11 +777,11 @@ class DashboardApp:
                     f"""
                     <p><b>Ingresos promedio mensuales:</b></p>
                     <ul>
-                        <li><b>Decil 1:</b> ${3_704:,.0f}</li>
-                        <li><b>Decil 5:</b> ${10_377:,.0f}</li>
-                        <li><b>Decil 10:</b> ${36_104:,.0f}</li>
+                        <li><b>Decil 1:</b> ${deciles_cluster[1][4]:,.0f}</li>
+                        <li><b>Decil 5:</b> ${deciles_cluster[5][4]:,.0f}</li>
+                        <li><b>Decil 10:</b> ${deciles_cluster[10][4]:,.0f}</li>
                     </ul>
-                    <p><b>Desigualdad:</b> Baja (GINI: 0.3384)</p>
+                    <p><b>Desigualdad:</b> Baja (GINI: {gini_cluster[4]:.4f})</p>
                     <p><b>Lo que se vive aquí:</b></p>
                     <ul>
                         <li>El 63.0% enfrenta consumo restringido, mientras que el 21.7% logra ahorro positivo.</li>
@@ -767,9 +829,26 @@ class DashboardApp:
         self.navegacion_botones("Clusters")
 
 
+    @medir("mostrar_dashboard")
     def mostrar_dashboard(self):
-
-        mostrar_dashboard_exploracion(self.datos["municipios"], self.datos["estados"])
+        from utils.helpers.dashboard import mostrar_dashboard_exploracion
+
+        mostrar_dashboard_exploracion(
+            self.datos["vista_municipios"],
+            self.datos["vista_estados"],
+            promedios_globales={
+                "Municipal": self.datos["promedios_municipios"],
+                "Estatal": self.datos["promedios_estados"],
+            },
+            indices={
+                "Municipal": self.datos["indice_vista_municipios"],
+                "Estatal": self.datos["indice_vista_estados"],
+            },
+            sketches={
+                "Municipal": self.datos["sketches_municipios"],
+                "Estatal": self.datos["sketches_estados"],
+            },
+        )
         # Botón para la sección anterior
         col1, col2 = st.columns(2)
 
@@ -780,6 +859,8 @@ class DashboardApp:
             st.button("🏠 Volver al Inicio", on_click=self.set_section, args=("Introducción",))
 
 # Ejecución de la aplicación
+iniciar_rerun()
 app = DashboardApp()
 app.render_sidebar()
 app.render_seccion()
+mostrar_panel(finalizar_rerun(seccion=st.session_state["section"]))
@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.helpers.cuantiles import BORDES, RAZON_BINS, SketchesCuantiles, indice_bins
+from utils.helpers.desigualdad import gini_agregado
+from utils.helpers.schema import DECILES
+
+MUNICIPIOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "data", "processed", "resultados_municipales_cluster.csv")
+
+
+def _deciles(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.sort(rng.lognormal(8, 1, size=(filas, 10)), axis=1)
+
+
+def _deciles_exactos(deciles, filas, pesos=None):
+    """Deciles exactos de la unión de las filas (cada decil es un punto con la décima parte del peso)."""
+    pesos = np.ones(len(deciles)) if pesos is None else np.asarray(pesos, dtype=float)
+    valores = deciles[filas].ravel()
+    peso = np.repeat(pesos[filas] / 10, 10)
+    validos = ~np.isnan(valores)
+    orden = np.argsort(valores[validos])
+    valores, peso = valores[validos][orden], peso[validos][orden]
+    # Dentro de un punto el ingreso acumulado crece linealmente, así que interpolar es exacto
+    poblacion = np.concatenate(([0.0], np.cumsum(peso))) / peso.sum()
+    ingreso = np.concatenate(([0.0], np.cumsum(valores * peso)))
+    return np.diff(np.interp(np.linspace(0, 1, 11), poblacion, ingreso)) / (peso.sum() / 10)
+
+
+def _densos(deciles, pesos, grupos):
+    """Histogramas densos de cada grupo sumando punto por punto, sin pasar por CSR."""
+    poblacion = np.zeros((len(grupos), len(BORDES)))
+    ingreso = np.zeros((len(grupos), len(BORDES)))
+    for g, grupo in enumerate(grupos):
+        for fila in grupo:
+            validos = ~np.isnan(deciles[fila])
+            valores = deciles[fila][validos]
+            bins = indice_bins(valores)
+            np.add.at(poblacion[g], bins, pesos[fila] / 10)
+            np.add.at(ingreso[g], bins, pesos[fila] / 10 * valores)
+    return poblacion, ingreso
+
+
+def test_combinar_suma_los_bins_de_cada_grupo():
+    deciles = _deciles(8)
+    deciles[3] = np.nan
+    deciles[5, :4] = np.nan
+    # Dos filas con todos sus deciles en el mismo bin
+    deciles[6] = 1000.0
+    pesos = np.random.default_rng(1).uniform(1, 100, size=8)
+    grupos = [[0], [7, 2, 2, 0], [], [3], [3, 5, 6], list(range(8)), [6]]
+
+    sketches = SketchesCuantiles.desde_deciles(deciles, pesos)
+    assert np.diff(sketches.inicios)[3] == 0
+    assert np.diff(sketches.inicios)[6] == 1
+
+    poblacion, ingreso = sketches.combinar(grupos)
+    esperada_poblacion, esperado_ingreso = _densos(deciles, pesos, grupos)
+    assert poblacion.shape == (len(grupos), len(BORDES))
+    assert np.allclose(poblacion, esperada_poblacion)
+    assert np.allclose(ingreso, esperado_ingreso)
+
+    # Lo mismo después de guardar como tabla y desde los histogramas densos
+    for otros in (SketchesCuantiles.desde_tabla(sketches.a_tabla(), len(sketches)),
+                  SketchesCuantiles.desde_histogramas(*sketches.combinar([[i] for i in range(8)]))):
+        assert np.allclose(otros.combinar(grupos)[0], poblacion)
+        assert np.allclose(otros.combinar(grupos)[1], ingreso)
+
+
+def test_una_fila_recupera_sus_deciles_dentro_del_ancho_de_bin():
+    deciles = _deciles(200)
+    resumen = SketchesCuantiles.desde_deciles(deciles).resumir([[i] for i in range(len(deciles))])
+    error = np.abs(resumen[DECILES].to_numpy() / deciles - 1)
+    assert error.max() < RAZON_BINS - 1
+    assert np.allclose(resumen["ingreso_promedio_total"], deciles.mean(axis=1))
+
+
+def test_conjuntos_contra_deciles_exactos_y_gini_agregado():
+    deciles = _deciles(500)
+    pesos = np.random.default_rng(2).uniform(1, 100, size=len(deciles))
+    grupos = [np.arange(len(deciles)), np.arange(0, 500, 7), np.array([4, 4, 9])]
+
+    resumen = SketchesCuantiles.desde_deciles(deciles, pesos).resumir(grupos)
+    for g, grupo in enumerate(grupos):
+        exactos = _deciles_exactos(deciles, grupo, pesos)
+        assert np.abs(resumen.loc[g, DECILES].to_numpy(dtype=float) / exactos - 1).max() < RAZON_BINS - 1
+    assert np.abs(resumen.loc[0, DECILES].to_numpy(dtype=float) / _deciles_exactos(deciles, grupos[0], pesos) - 1).max() < 5e-4
+    assert np.allclose(resumen["gini"], gini_agregado(deciles, grupos, pesos), atol=1e-3)
+
+
+def test_grupo_vacio_da_nan():
+    deciles = _deciles(3)
+    deciles[1] = np.nan
+    resumen = SketchesCuantiles.desde_deciles(deciles).resumir([[], [1], [0, 1]])
+    assert resumen.loc[[0, 1]].isna().all().all()
+    assert resumen.loc[2].notna().all()
+
+
+@pytest.mark.skipif(not os.path.exists(MUNICIPIOS), reason="sin datos procesados")
+def test_municipios_nacional():
+    deciles = pd.read_csv(MUNICIPIOS)[DECILES].to_numpy(dtype=np.float64)
+    completas = np.flatnonzero(~np.isnan(deciles).any(axis=1))
+    sketches = SketchesCuantiles.desde_deciles(deciles)
+
+    filas = sketches.resumir([[i] for i in completas])[DECILES].to_numpy()
+    assert np.abs(filas / deciles[completas] - 1).max() < 0.0064
+
+    todos = np.arange(len(deciles))
+    nacional = sketches.resumir([todos])
+    assert np.abs(nacional[DECILES].to_numpy()[0] / _deciles_exactos(deciles, todos) - 1).max() < 3e-4
+    assert np.isclose(nacional["gini"][0], gini_agregado(deciles, [todos])[0], atol=1e-4)
@@ -0,0 +1,59 @@
+import numpy as np
+
+from utils.helpers.desigualdad import gini_agregado, grupos_por_etiqueta
+
+
+def _gini_lorenz(valores, pesos):
+    """GINI de la curva de Lorenz de puntos sueltos, calculado a mano con la regla del trapecio."""
+    orden = np.argsort(valores)
+    valores, pesos = np.asarray(valores, dtype=float)[orden], np.asarray(pesos, dtype=float)[orden]
+    p = pesos / pesos.sum()
+    lorenz = np.concatenate(([0.0], np.cumsum(valores * pesos) / (valores * pesos).sum()))
+    return 1.0 - np.sum(p * (lorenz[1:] + lorenz[:-1]))
+
+
+def _deciles(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.sort(rng.lognormal(8, 1, size=(filas, 10)), axis=1)
+
+
+def test_una_fila_reproduce_el_gini_de_lorenz():
+    # Deciles 1..10: L_i = i(i+1)/110, así que G = 1 - 0.1 * (2 * 4 - 1) = 0.3
+    assert np.allclose(gini_agregado(np.arange(1.0, 11.0)[None, :], [[0]]), [0.3])
+
+    deciles = _deciles(1)
+    assert np.allclose(gini_agregado(deciles, [[0]]), [_gini_lorenz(deciles[0], np.ones(10))])
+
+
+def test_grupos_que_comparten_filas_dan_lo_mismo_que_por_separado():
+    deciles = _deciles(12)
+    pesos = np.random.default_rng(1).uniform(1, 100, size=12)
+    grupos = [[0, 1, 2, 3], [2, 3, 4], [], [5], [11, 0, 7, 3, 2], list(range(12))]
+
+    juntos = gini_agregado(deciles, grupos, pesos)
+    separados = [gini_agregado(deciles, [grupo], pesos)[0] for grupo in grupos]
+    a_mano = [
+        _gini_lorenz(deciles[grupo].ravel(), np.repeat(pesos[grupo], 10)) if grupo else np.nan
+        for grupo in grupos
+    ]
+    assert np.allclose(juntos, separados, equal_nan=True)
+    assert np.allclose(juntos, a_mano, equal_nan=True)
+    assert np.isnan(juntos[2])
+
+
+def test_deciles_nan_se_descartan():
+    deciles = _deciles(3)
+    con_nan = deciles.copy()
+    con_nan[0, [0, 4]] = np.nan
+    con_nan[2] = np.nan
+
+    gini = gini_agregado(con_nan, [[0], [0, 1], [2]])
+    assert np.isclose(gini[0], gini_agregado(np.delete(deciles[:1], [0, 4], axis=1), [[0]])[0])
+    assert np.isclose(gini[1], _gini_lorenz(np.concatenate((np.delete(deciles[0], [0, 4]), deciles[1])), np.ones(18)))
+    assert np.isnan(gini[2])
+
+
+def test_grupos_por_etiqueta():
+    claves, grupos = grupos_por_etiqueta(["b", "a", "b", "c", "a"])
+    assert claves.tolist() == ["a", "b", "c"]
+    assert [grupo.tolist() for grupo in grupos] == [[1, 4], [0, 2], [3]]
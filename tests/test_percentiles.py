@@ -0,0 +1,83 @@
+import numpy as np
+
+from utils.helpers.percentiles import ANCHO_MINIMO, DistribucionesIngreso, nudos_desde_deciles
+
+
+def _distribuciones(deciles):
+    filas = len(deciles)
+    return DistribucionesIngreso(nudos_desde_deciles(deciles), np.full(filas, 2022), np.zeros(filas), np.ones(filas))
+
+
+def _deciles(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.sort(rng.lognormal(8, 1, size=(filas, 10)), axis=1)
+
+
+def _promedio(distribuciones, ingresos, filas):
+    """CDF promedio de las filas con deciles, evaluando cada fila por separado."""
+    valores = distribuciones.cdf(np.asarray(ingresos)[:, None], np.asarray(filas)[None, :])
+    return np.nanmean(valores, axis=1)
+
+
+def test_combinar_es_el_promedio_de_las_cdf():
+    deciles = _deciles(60)
+    deciles[7] = np.nan
+    distribuciones = _distribuciones(deciles)
+    grupos = [np.arange(60), np.array([3]), np.array([5, 7, 5, 1]), np.arange(0, 60, 4)[::-1]]
+    combinadas = distribuciones.combinar(grupos)
+
+    ingresos = np.random.default_rng(1).uniform(0, 1.2 * np.nanmax(distribuciones.nudos), size=500)
+    for g, grupo in enumerate(grupos):
+        assert np.allclose(combinadas.evaluar(ingresos, g), _promedio(distribuciones, ingresos, grupo), atol=1e-9)
+    # Un ingreso por grupo, por broadcasting
+    assert np.allclose(combinadas.evaluar(ingresos[:4], np.arange(4)),
+                       [_promedio(distribuciones, ingresos[[g]], grupo)[0] for g, grupo in enumerate(grupos)])
+
+
+def test_deciles_repetidos_se_vuelven_una_rampa_de_ancho_minimo():
+    deciles = _deciles(3)
+    repetido = deciles[1, 3]
+    deciles[1, 3:6] = repetido
+    # Deciles que decrecen se fuerzan a no decrecer (otro tramo sin ancho)
+    deciles[2, 8] = deciles[2, 7] - 10
+    distribuciones = _distribuciones(deciles)
+    grupo = np.arange(3)
+    combinadas = distribuciones.combinar([grupo])
+
+    # Fuera de las rampas la CDF combinada es la exacta
+    rampas = np.concatenate([[repetido], distribuciones.nudos[2, 8:9]])
+    ingresos = np.random.default_rng(2).uniform(0, 1.2 * distribuciones.nudos.max(), size=500)
+    ingresos = np.concatenate([ingresos, rampas - 1e-6, rampas + ANCHO_MINIMO])
+    lejos = np.abs(ingresos[:, None] - (rampas + ANCHO_MINIMO / 2)).min(axis=1) >= ANCHO_MINIMO / 2
+    assert np.allclose(combinadas.evaluar(ingresos[lejos], 0), _promedio(distribuciones, ingresos[lejos], grupo), atol=1e-9)
+
+    # Dentro de la rampa la CDF sube de forma continua del límite izquierdo al derecho
+    rampa = repetido + np.linspace(0, ANCHO_MINIMO, 11)
+    valores = combinadas.evaluar(rampa, 0)
+    assert np.all(np.diff(valores) > 0)
+    izquierdo, derecho = _promedio(distribuciones, np.array([repetido - 1e-9, repetido + ANCHO_MINIMO]), grupo)
+    assert np.isclose(valores[0], izquierdo, atol=1e-6)
+    assert np.isclose(valores[-1], derecho)
+
+
+def test_ingresos_fuera_de_los_nudos():
+    deciles = _deciles(20)
+    distribuciones = _distribuciones(deciles)
+    combinadas = distribuciones.combinar([np.arange(20), np.array([4])])
+
+    debajo = np.array([-1e6, -1.0, 0.0, distribuciones.nudos[:, 0].min() - 1e-6])
+    encima = np.array([distribuciones.nudos[:, -1].max(), combinadas.maximo + 0.5, 1e12, np.inf])
+    for g in range(2):
+        assert np.allclose(combinadas.evaluar(debajo, g), 0)
+        assert np.allclose(combinadas.evaluar(encima, g), 1)
+    assert np.isclose(combinadas.evaluar(distribuciones.nudos[4, -1], 1), 1)
+    assert np.isclose(combinadas.evaluar(distribuciones.nudos[4, 0], 1), 0)
+
+
+def test_grupos_vacios_dan_nan():
+    deciles = _deciles(3)
+    deciles[2] = np.nan
+    combinadas = _distribuciones(deciles).combinar([np.array([], dtype=np.int64), np.array([2]), np.array([0, 2])])
+    valores = combinadas.evaluar(np.array([[1000.0], [5000.0]]), np.arange(3)[None, :])
+    assert np.isnan(valores[:, :2]).all()
+    assert not np.isnan(valores[:, 2]).any()
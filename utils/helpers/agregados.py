@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+from utils.helpers.cuantiles import SketchesCuantiles
+from utils.helpers.desigualdad import gini_agregado
+
+# Claves que aparecen en el índice de la tabla de agregados
+PROMEDIO = "Promedio"
+TODOS = "Todos"
+
+# Nombre corto de cada clúster (analogías del Chavo del 8)
+NOMBRES_CLUSTER = {
+    1: "Doña Florinda",
+    2: "Quico",
+    3: "Don Ramón",
+    4: "El Chavo",
+    PROMEDIO: PROMEDIO,
+}
+
+# Columnas numéricas que identifican filas y no se agregan
+_NO_MEDIDAS = {"Cluster", "year", "municipio", "Unnamed: 0"}
+
+# Columnas numéricas de las vistas del dashboard que no son medidas
+_NO_MEDIDAS_VISTA = {"Año", "ID Municipio", "Cluster"}
+
+_ESTADISTICOS = {"mean": "media", "count": "conteo", "std": "desviacion"}
+
+# Medidas de la población combinada de cada grupo: GINI (ver utils.helpers.desigualdad)
+# y deciles (ver utils.helpers.cuantiles)
+GINI_AGREGADO = "gini_agregado"
+DECILES = [f"decil_{i}" for i in range(1, 11)]
+DECILES_AGREGADOS = [f"{decil}_agregado" for decil in DECILES]
+DECILES_VISTA = [f"Decil {i}" for i in range(1, 11)]
+
+
+def construir_agregados_cluster(data):
+    """
+    Construye la tabla materializada de agregados por clúster y año.
+
+    El índice es (Cluster, year), donde Cluster incluye "Promedio" y year incluye
+    "Todos" (todos los años juntos). Las columnas son (medida, estadístico) con los
+    estadísticos "media", "conteo" y "desviacion".
+
+    Las filas "Promedio" son todos los municipios juntos (de cada año o de todos
+    los años): la media es la de todos los municipios, el conteo es el total y la
+    desviación es la dispersión entre municipios. Así "Promedio" significa lo mismo
+    en todas las medidas, incluidas las de la población combinada.
+
+    Si los datos traen los deciles se añaden las medidas "gini_agregado" y
+    "decil_k_agregado": el GINI y los deciles de la población combinada de cada
+    grupo (en "Promedio", de todos los municipios), sin desviación.
+
+    Parameters:
+    - data (pd.DataFrame): Datos municipales con las columnas "Cluster" y "year".
+
+    Returns:
+    - pd.DataFrame: Tabla de agregados.
+    """
+    medidas = [col for col in data.select_dtypes("number").columns if col not in _NO_MEDIDAS]
+    valores = data[medidas].astype("float64")
+    valores["Cluster"] = data["Cluster"].astype(int).to_numpy()
+    valores["year"] = data["year"].astype(int).to_numpy()
+
+    por_year = valores.groupby(["Cluster", "year"])[medidas].agg(list(_ESTADISTICOS))
+    todos = valores.groupby("Cluster")[medidas].agg(list(_ESTADISTICOS))
+    todos.index = pd.MultiIndex.from_product([todos.index, [TODOS]], names=["Cluster", "year"])
+    por_cluster = pd.concat([por_year, todos])
+
+    # Promedio: todos los municipios de cada año (y de todos los años)
+    promedio = pd.concat([valores.groupby("year")[medidas].agg(list(_ESTADISTICOS)), valores[medidas].agg(list(_ESTADISTICOS)).unstack().to_frame(TODOS).T])
+    promedio.index = pd.MultiIndex.from_product([[PROMEDIO], promedio.index], names=["Cluster", "year"])
+
+    agregados = pd.concat([por_cluster, promedio[por_cluster.columns]]).rename(columns=_ESTADISTICOS, level=1)
+    if all(col in data.columns for col in DECILES):
+        agregados = _agregar_medidas_combinadas(agregados, data)
+    return agregados
+
+
+def _agregar_medidas_combinadas(agregados, data):
+    """
+    Añade GINI_AGREGADO y DECILES_AGREGADOS con todos los grupos de la tabla
+    resueltos en una sola llamada a cada motor.
+    """
+    clusters = data["Cluster"].astype(int).to_numpy()
+    years = data["year"].astype(int).to_numpy()
+
+    grupos = []
+    for cluster, year in agregados.index:
+        seleccion = np.ones(len(data), dtype=bool)
+        if cluster != PROMEDIO:
+            seleccion &= clusters == cluster
+        if year != TODOS:
+            seleccion &= years == year
+        grupos.append(np.flatnonzero(seleccion))
+
+    deciles = data[DECILES].to_numpy()
+    medidas = {GINI_AGREGADO: gini_agregado(deciles, grupos)}
+    combinados = SketchesCuantiles.desde_deciles(deciles).resumir(grupos)
+    medidas.update(zip(DECILES_AGREGADOS, combinados[DECILES].to_numpy().T))
+
+    agregados = agregados.copy()
+    conteos = np.array([len(grupo) for grupo in grupos], dtype="float64")
+    for medida, valores in medidas.items():
+        agregados[(medida, "media")] = valores
+        agregados[(medida, "conteo")] = conteos
+        agregados[(medida, "desviacion")] = np.nan
+    return agregados
+
+
+def medias(agregados, cluster, year):
+    """
+    Medias de todas las medidas para un clúster y año.
+
+    Parameters:
+    - cluster (int | str): Número de clúster o "Promedio".
+    - year (int | str): Año o "Todos".
+
+    Returns:
+    - pd.Series: Medida -> media.
+    """
+    if year != TODOS:
+        year = int(year)
+    if cluster != PROMEDIO:
+        cluster = int(cluster)
+    return agregados.loc[(cluster, year)].xs("media", level=1)
+
+
+def construir_resumen_clusters(agregados, year=TODOS):
+    """
+    Resumen por clúster (incluida la fila "Promedio") listo para la sección Clusters.
+
+    Returns:
+    - pd.DataFrame: Una fila por clúster con las medias y la columna "Cluster_Nombre".
+    """
+    resumen = agregados.xs(year, level="year").xs("media", axis=1, level=1).reset_index()
+    resumen["Cluster_Nombre"] = resumen["Cluster"].map(NOMBRES_CLUSTER)
+    return resumen
+
+
+def aplanar_agregados(agregados):
+    """
+    Tabla de agregados en forma plana para guardarla en Parquet: las claves del
+    índice pasan a columnas de texto y las columnas se nombran "medida|estadístico".
+    """
+    plana = agregados.copy()
+    plana.columns = [f"{medida}|{estadistico}" for medida, estadistico in plana.columns]
+    plana = plana.reset_index()
+    plana["Cluster"] = plana["Cluster"].astype(str)
+    plana["year"] = plana["year"].astype(str)
+    return plana
+
+
+def restaurar_agregados(plana):
+    """Inverso de `aplanar_agregados`."""
+    def clave(valor):
+        return int(valor) if valor.isdigit() else valor
+
+    agregados = plana.copy()
+    agregados["Cluster"] = agregados["Cluster"].map(clave).astype(object)
+    agregados["year"] = agregados["year"].map(clave).astype(object)
+    agregados = agregados.set_index(["Cluster", "year"])
+    agregados.columns = pd.MultiIndex.from_tuples([tuple(col.split("|")) for col in agregados.columns])
+    return agregados
+
+
+def construir_promedios_globales(vista):
+    """
+    Promedios globales de todas las medidas numéricas de una vista del dashboard,
+    por año y para todos los años juntos. Si la vista trae los deciles se añade la
+    columna "GINI Agregado" (GINI de la población combinada de cada año y del total).
+
+    Parameters:
+    - vista (pd.DataFrame): Vista del dashboard (municipal o estatal), con la columna "Año".
+
+    Returns:
+    - pd.DataFrame: Índice con el año como texto ("2018", ..., "Todos"); una columna por medida.
+    """
+    medidas = [col for col in vista.select_dtypes("number").columns if col not in _NO_MEDIDAS_VISTA]
+    valores = vista[medidas].astype("float64")
+    por_year = valores.groupby(vista["Año"].astype(int).astype(str).to_numpy()).mean()
+    todos = valores.mean().to_frame(TODOS).T
+    promedios = pd.concat([por_year, todos])
+    promedios.index.name = "year"
+
+    if all(col in vista.columns for col in DECILES_VISTA):
+        years = vista["Año"].astype(int).astype(str).to_numpy()
+        grupos = [np.flatnonzero(years == year) for year in por_year.index] + [np.arange(len(vista))]
+        promedios["GINI Agregado"] = gini_agregado(vista[DECILES_VISTA].to_numpy(), grupos)
+    return promedios
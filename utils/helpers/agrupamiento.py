@@ -0,0 +1,235 @@
+"""
+Agrupamiento de municipios (columna "Cluster" de resultados_municipales_cluster.csv).
+
+Construye una matriz de características estandarizada (z-score) con los
+deciles y el GINI de cada municipio × año, y la agrupa con k-means vectorizado
+(inicialización k-means++, semilla fija y varios reinicios). Todos los años se
+agrupan juntos, así que un mismo centroide describe su clúster en todos los
+años; después los clústeres nuevos se reetiquetan con la asignación que más se
+parece a las etiquetas actuales, para que el clúster 1 siga siendo "Doña
+Florinda" aunque se agregue una ola nueva (las filas de la ola nueva, sin
+Cluster todavía, no cuentan para la referencia).
+
+Con estas características la partición coincide en ~80% con las etiquetas
+actuales (el azar, con 4 clústeres, daría ~25%); agregar los índices de
+percepción o tomar el logaritmo de los deciles la aleja (26% y 56%). Los textos
+de cada clúster en main.py describen la partición actual, así que --escribir se
+niega a reescribir si la coincidencia queda por debajo de COINCIDENCIA_MINIMA
+(salvo con --forzar).
+
+Uso:
+    python -m utils.helpers.agrupamiento              # compara con las etiquetas actuales
+    python -m utils.helpers.agrupamiento --escribir   # reescribe Cluster y el resumen por clúster
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.helpers.data_loader import DATA_DIR, rutas_archivo
+from utils.helpers.schema import DECILES
+
+CLUSTERS = 4
+SEMILLA = 0
+REINICIOS = 8
+ITERACIONES = 300
+
+CARACTERISTICAS = DECILES + ["gini"]
+
+# Proporción mínima de filas que conservan su etiqueta para que --escribir reescriba Cluster
+COINCIDENCIA_MINIMA = 0.7
+
+# Columnas que no entran al resumen por clúster
+_NO_RESUMEN = {"Unnamed: 0"}
+
+
+class Estandarizacion:
+    """Transformación z-score ajustada sobre los municipios."""
+
+    def __init__(self, data, columnas=CARACTERISTICAS):
+        self.columnas = [col for col in columnas if col in data.columns]
+        crudos = self._crudos(data)
+        self.media = np.nanmean(crudos, axis=0)
+        self.escala = np.nanstd(crudos, axis=0)
+        self.escala[~(self.escala > 0)] = 1.0
+
+    def _crudos(self, data):
+        return data[self.columnas].to_numpy(dtype=np.float64)
+
+    def transformar(self, data):
+        """Matriz (filas, características) estandarizada; los faltantes quedan en 0 (la media)."""
+        return np.nan_to_num((self._crudos(data) - self.media) / self.escala)
+
+
+def _distancias(x, centroides):
+    """Distancias euclidianas al cuadrado (filas, clústeres)."""
+    cuadrados = (x**2).sum(axis=1)[:, None] - 2 * x @ centroides.T + (centroides**2).sum(axis=1)[None, :]
+    return np.maximum(cuadrados, 0)
+
+
+def _kmeans_pp(x, k, rng):
+    centroides = [x[rng.integers(len(x))]]
+    minimas = _distancias(x, np.array(centroides))[:, 0]
+    for _ in range(1, k):
+        total = minimas.sum()
+        elegido = rng.choice(len(x), p=minimas / total) if total > 0 else rng.integers(len(x))
+        centroides.append(x[elegido])
+        minimas = np.minimum(minimas, _distancias(x, x[elegido][None, :])[:, 0])
+    return np.array(centroides)
+
+
+def kmeans(x, k=CLUSTERS, semilla=SEMILLA, reinicios=REINICIOS, iteraciones=ITERACIONES):
+    """
+    k-means de Lloyd vectorizado; se queda con el reinicio de menor inercia.
+
+    Returns:
+    - tuple: (etiquetas 0..k-1, centroides (k, características), inercia).
+    """
+    rng = np.random.default_rng(semilla)
+    mejor = None
+    for _ in range(reinicios):
+        centroides = _kmeans_pp(x, k, rng)
+        for _ in range(iteraciones):
+            distancias = _distancias(x, centroides)
+            etiquetas = distancias.argmin(axis=1)
+            conteos = np.bincount(etiquetas, minlength=k)
+            sumas = np.zeros_like(centroides)
+            np.add.at(sumas, etiquetas, x)
+            nuevos = sumas / np.maximum(conteos, 1)[:, None]
+            # Un clúster vacío se reinicia en el punto peor representado
+            for vacio in np.flatnonzero(conteos == 0):
+                nuevos[vacio] = x[distancias.min(axis=1).argmax()]
+            if np.allclose(nuevos, centroides):
+                break
+            centroides = nuevos
+        distancias = _distancias(x, centroides)
+        etiquetas = distancias.argmin(axis=1)
+        inercia = distancias[np.arange(len(x)), etiquetas].sum()
+        if mejor is None or inercia < mejor[2]:
+            mejor = (etiquetas, centroides, inercia)
+    return mejor
+
+
+def reetiquetar(centroides, referencia):
+    """
+    Asigna a cada centroide nuevo la etiqueta del centroide de referencia más
+    parecido. La asignación es voraz: se recorren los pares (centroide,
+    referencia) de menor a mayor distancia y se toma cada par cuyos dos lados
+    sigan libres (O(k² log k)); los centroides sin pareja reciben etiquetas
+    nuevas a continuación de las de referencia.
+
+    Parameters:
+    - centroides (np.ndarray): Centroides nuevos (k, características).
+    - referencia (dict): Etiqueta -> centroide de referencia en el mismo espacio.
+
+    Returns:
+    - np.ndarray: Etiqueta para cada centroide nuevo.
+    """
+    etiquetas = sorted(referencia)
+    k = len(centroides)
+    if not etiquetas:
+        return np.arange(1, k + 1)
+
+    costos = _distancias(centroides, np.array([referencia[etiqueta] for etiqueta in etiquetas]))
+    asignadas = np.zeros(k, dtype=np.int64)
+    usadas = set()
+    for plano in np.argsort(costos, axis=None, kind="stable"):
+        fila, columna = divmod(int(plano), len(etiquetas))
+        if asignadas[fila] == 0 and columna not in usadas:
+            asignadas[fila] = etiquetas[columna]
+            usadas.add(columna)
+    sin_pareja = np.flatnonzero(asignadas == 0)
+    asignadas[sin_pareja] = max(etiquetas) + 1 + np.arange(len(sin_pareja))
+    return asignadas
+
+
+def agrupar(data, k=CLUSTERS, semilla=SEMILLA, referencia=None):
+    """
+    Agrupa los municipios × año.
+
+    Parameters:
+    - data (pd.DataFrame): Municipios con las columnas de CARACTERISTICAS.
+    - referencia (pd.Series | None): Etiquetas actuales (p. ej. data["Cluster"]) para
+      reetiquetar; las filas sin etiqueta (NaN) no cuentan.
+
+    Returns:
+    - tuple: (etiquetas por fila como np.ndarray, Estandarizacion usada).
+    """
+    estandarizacion = Estandarizacion(data)
+    x = estandarizacion.transformar(data)
+    etiquetas, centroides, _ = kmeans(x, k, semilla)
+
+    centroides_referencia = {}
+    if referencia is not None:
+        actuales = pd.to_numeric(pd.Series(np.asarray(referencia)), errors="coerce").to_numpy(dtype=np.float64)
+        con_etiqueta = ~np.isnan(actuales)
+        centroides_referencia = {
+            int(etiqueta): x[actuales == etiqueta].mean(axis=0) for etiqueta in np.unique(actuales[con_etiqueta])
+        }
+    return reetiquetar(centroides, centroides_referencia)[etiquetas], estandarizacion
+
+
+def resumen_por_cluster(municipios, columnas):
+    """Promedio por clúster de las columnas numéricas de los municipios (esquema de summary_municipales_cluster.csv)."""
+    numericas = [col for col in municipios.select_dtypes("number").columns if col not in _NO_RESUMEN]
+    return municipios[numericas].groupby("Cluster").mean().reset_index()[list(columnas)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agrupa los municipios y regenera la columna Cluster.")
+    parser.add_argument("--clusters", type=int, default=CLUSTERS)
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--datos", default=DATA_DIR, help="Directorio con los CSV procesados.")
+    parser.add_argument("--escribir", action="store_true", help="Reescribir Cluster y summary_municipales_cluster.csv.")
+    parser.add_argument("--forzar", action="store_true",
+                        help=f"Escribir aunque menos de {COINCIDENCIA_MINIMA:.0%} de las filas conserve su etiqueta.")
+    args = parser.parse_args(argv)
+
+    ruta_municipios = rutas_archivo("municipios", args.datos)[0]
+    municipios = pd.read_csv(ruta_municipios, index_col=0)
+
+    inicio = time.perf_counter()
+    etiquetas, _ = agrupar(municipios, args.clusters, args.semilla, municipios.get("Cluster"))
+    print(f"{len(municipios)} filas agrupadas en {time.perf_counter() - inicio:.2f} s")
+
+    coincidencia_total = None
+    mismas_etiquetas = True
+    if "Cluster" in municipios.columns and municipios["Cluster"].notna().any():
+        con_etiqueta = municipios["Cluster"].notna().to_numpy()
+        iguales = pd.Series(etiquetas[con_etiqueta] == municipios["Cluster"].to_numpy()[con_etiqueta])
+        coincidencia = iguales.groupby(municipios["year"].to_numpy()[con_etiqueta]).mean()
+        for year, proporcion in coincidencia.items():
+            print(f"{year}: {proporcion:.1%} de coincidencia con las etiquetas actuales")
+        coincidencia_total = iguales.mean()
+        print(f"Total: {coincidencia_total:.1%} de coincidencia")
+        mismas_etiquetas = set(np.unique(etiquetas).tolist()) == set(municipios["Cluster"].dropna().astype(int).unique().tolist())
+    print(pd.Series(etiquetas).value_counts().sort_index().to_string())
+
+    if args.escribir:
+        if coincidencia_total is not None and coincidencia_total < COINCIDENCIA_MINIMA and not args.forzar:
+            print(
+                f"No se escribió nada: la coincidencia ({coincidencia_total:.1%}) es menor que {COINCIDENCIA_MINIMA:.0%} "
+                "y los textos de cada clúster dejarían de describir a sus municipios (usa --forzar para escribir de todos modos).",
+                file=sys.stderr,
+            )
+            return 1
+        if not mismas_etiquetas and not args.forzar:
+            print(
+                "No se escribió nada: las etiquetas nuevas no son las mismas que las actuales "
+                "y main.py describe cada clúster actual (usa --forzar para escribir de todos modos).",
+                file=sys.stderr,
+            )
+            return 1
+        municipios["Cluster"] = etiquetas
+        municipios.to_csv(ruta_municipios)
+        ruta_resumen = rutas_archivo("cluster", args.datos)[0]
+        columnas = pd.read_csv(ruta_resumen, nrows=0).columns
+        resumen_por_cluster(municipios, columnas).to_csv(ruta_resumen, index=False)
+        print(f"Escritos {ruta_municipios} y {ruta_resumen}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Almacén local de las respuestas del cuestionario (SQLite en modo WAL).
+
+`enviar_respuestas` solo encola la respuesta (no toca el disco): un hilo
+escritor por proceso vacía la cola por lotes, cada lote en una sola
+transacción. Todas las sesiones de un proceso comparten ese único escritor, así
+que no compiten por el candado de escritura de SQLite; con WAL las lecturas no
+bloquean al escritor, y si varios procesos escriben al mismo archivo el
+busy_timeout serializa sus lotes. Si un lote falla se reintenta (junto con lo
+que haya llegado mientras tanto) y al terminar el proceso se escribe lo que
+quede en la cola.
+
+La ruta del archivo se puede cambiar con la variable de entorno
+DASHBOARD_RESPUESTAS.
+
+Uso:
+    python -m utils.helpers.almacen                          # cuántas respuestas hay
+    python -m utils.helpers.almacen --exportar respuestas.csv  # para utils.helpers.puntuacion
+"""
+import argparse
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+VARIABLE_ENTORNO = "DASHBOARD_RESPUESTAS"
+RUTA_PREDETERMINADA = os.path.join("data", "respuestas", "respuestas.sqlite3")
+
+# Un lote se escribe al juntar TAMANO_LOTE respuestas o INTERVALO_LOTE segundos
+# después de la primera, lo que ocurra antes
+TAMANO_LOTE = 500
+INTERVALO_LOTE = 0.2
+ESPERA_REINTENTO = 1.0
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS respuestas (
+    id INTEGER PRIMARY KEY,
+    recibido TEXT NOT NULL,
+    sesion TEXT,
+    estado TEXT,
+    municipio TEXT,
+    ingresos REAL,
+    respuestas TEXT NOT NULL
+)
+"""
+INSERTAR = "INSERT INTO respuestas (recibido, sesion, estado, municipio, ingresos, respuestas) VALUES (?, ?, ?, ?, ?, ?)"
+
+logger = logging.getLogger("dashboard.respuestas")
+
+# Marca de fin para el hilo escritor
+_FIN = object()
+
+
+def ruta_almacen():
+    return os.environ.get(VARIABLE_ENTORNO) or RUTA_PREDETERMINADA
+
+
+def conectar(ruta):
+    """Conexión con WAL, escrituras sin fsync por transacción (synchronous=NORMAL) y la tabla creada."""
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    conexion = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    conexion.execute(ESQUEMA)
+    conexion.commit()
+    return conexion
+
+
+class _Vaciado:
+    """Marca en la cola: se activa cuando todo lo encolado antes ya está escrito."""
+
+    def __init__(self):
+        self.listo = threading.Event()
+
+
+class AlmacenRespuestas:
+    """Cola de respuestas con un hilo escritor por lotes (se inicia con la primera respuesta)."""
+
+    def __init__(self, ruta=None, tamano_lote=TAMANO_LOTE, intervalo=INTERVALO_LOTE):
+        self.ruta = ruta or ruta_almacen()
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.escritas = 0
+        self._cola = queue.SimpleQueue()
+        self._hilo = None
+        self._candado = threading.Lock()
+        atexit.register(self.cerrar)
+
+    def guardar(self, respuestas, sesion=None):
+        """
+        Encola una respuesta; no espera a que se escriba.
+
+        Parameters:
+        - respuestas (dict): Respuestas con las claves de st.session_state["user_data"].
+        - sesion (str | None): Identificador de la sesión que envía.
+        """
+        recibido = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds")
+        ingresos = respuestas.get("Ingresos")
+        self._cola.put((
+            recibido, sesion, respuestas.get("Estado"), respuestas.get("Municipio"),
+            None if ingresos is None else float(ingresos), json.dumps(respuestas, ensure_ascii=False, default=str),
+        ))
+        self._iniciar()
+
+    def vaciar(self, timeout=30):
+        """
+        Espera a que todo lo encolado hasta ahora esté escrito.
+
+        Returns:
+        - bool: False si venció el timeout (p. ej. porque las escrituras siguen fallando).
+        """
+        marca = _Vaciado()
+        self._cola.put(marca)
+        self._iniciar()
+        return marca.listo.wait(timeout)
+
+    def cerrar(self, timeout=10):
+        """Escribe lo pendiente y detiene el hilo escritor."""
+        with self._candado:
+            hilo = self._hilo
+            self._hilo = None
+        if hilo is not None and hilo.is_alive():
+            self._cola.put(_FIN)
+            hilo.join(timeout)
+
+    def _iniciar(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._candado:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._escribir, name="almacen-respuestas", daemon=True)
+                self._hilo.start()
+
+    def _siguiente_lote(self, pendientes):
+        """Junta elementos de la cola hasta llenar el lote o agotar el intervalo."""
+        lote = []
+        limite = None
+        while len(pendientes) + len(lote) < self.tamano_lote:
+            if limite is None:
+                # Con filas pendientes de un intento fallido no se espera indefinidamente
+                espera = ESPERA_REINTENTO if pendientes else None
+            else:
+                espera = limite - time.monotonic()
+                if espera <= 0:
+                    break
+            try:
+                elemento = self._cola.get(timeout=espera)
+            except queue.Empty:
+                break
+            lote.append(elemento)
+            if limite is None:
+                limite = time.monotonic() + self.intervalo
+            if elemento is _FIN:
+                break
+        return lote
+
+    def _escribir(self):
+        # La conexión se abre (y se reabre) dentro del ciclo: si el directorio no
+        # se puede escribir o el disco está lleno, el hilo sigue vivo, conserva lo
+        # pendiente y lo reintenta
+        conexion = None
+        pendientes = []
+        marcas = []
+        terminar = False
+        try:
+            while not terminar or pendientes:
+                if not terminar:
+                    for elemento in self._siguiente_lote(pendientes):
+                        if elemento is _FIN:
+                            terminar = True
+                        elif isinstance(elemento, _Vaciado):
+                            marcas.append(elemento)
+                        else:
+                            pendientes.append(elemento)
+                if pendientes:
+                    try:
+                        if conexion is None:
+                            conexion = conectar(self.ruta)
+                        with conexion:
+                            conexion.executemany(INSERTAR, pendientes)
+                    except (sqlite3.Error, OSError):
+                        logger.exception("No se pudieron guardar %d respuestas; se reintentará", len(pendientes))
+                        if conexion is not None:
+                            conexion.close()
+                            conexion = None
+                        # Mientras no termine, la espera del reintento la hace _siguiente_lote
+                        if terminar:
+                            time.sleep(ESPERA_REINTENTO)
+                        continue
+                    self.escritas += len(pendientes)
+                    pendientes = []
+                for marca in marcas:
+                    marca.listo.set()
+                marcas = []
+        finally:
+            if conexion is not None:
+                conexion.close()
+
+
+_ALMACEN = None
+_CANDADO_ALMACEN = threading.Lock()
+
+
+def almacen_respuestas():
+    """Almacén compartido por todas las sesiones del proceso."""
+    global _ALMACEN
+    with _CANDADO_ALMACEN:
+        if _ALMACEN is None:
+            _ALMACEN = AlmacenRespuestas()
+        return _ALMACEN
+
+
+def leer_respuestas(ruta=None):
+    """
+    Respuestas guardadas, una fila por envío.
+
+    Returns:
+    - pd.DataFrame: id, recibido, sesion y una columna por clave de user_data.
+    """
+    import pandas as pd
+
+    conexion = conectar(ruta or ruta_almacen())
+    try:
+        filas = conexion.execute("SELECT id, recibido, sesion, respuestas FROM respuestas ORDER BY id").fetchall()
+    finally:
+        conexion.close()
+    data = pd.DataFrame(filas, columns=["id", "recibido", "sesion", "respuestas"])
+    respuestas = pd.DataFrame([json.loads(texto) for texto in data.pop("respuestas")], index=data.index)
+    return pd.concat([data, respuestas], axis=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta el almacén de respuestas del cuestionario.")
+    parser.add_argument("--ruta", default=None, help=f"Archivo SQLite (por defecto, ${VARIABLE_ENTORNO} o {RUTA_PREDETERMINADA}).")
+    parser.add_argument("--exportar", metavar="CSV", help="Exportar las respuestas (columnas de user_data) a CSV.")
+    args = parser.parse_args(argv)
+
+    respuestas = leer_respuestas(args.ruta)
+    print(f"{len(respuestas)} respuestas en {args.ruta or ruta_almacen()}")
+    if args.exportar:
+        respuestas.to_csv(args.exportar, index=False)
+        print(f"Exportadas a {args.exportar}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import functools
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from utils.helpers.instrumentacion import tramo
+
+
+class CacheFiguras:
+    """
+    Caché LRU de figuras de Plotly compartida por todas las sesiones del proceso.
+
+    Las figuras se guardan serializadas en JSON (inmutables) bajo una clave
+    semántica barata (tipo de gráfica, clúster, año, municipio...), así que no se
+    hashean DataFrames. Cada acierto devuelve una figura nueva, por lo que una
+    sesión puede modificarla sin afectar a las demás.
+
+    Como la clave no mira los datos, se le antepone la versión de los datos con
+    que trabaja el rerun (la fija el registro de datos con `usar_version`, la
+    misma con la que carga las tablas): las figuras de otra versión no coinciden,
+    y al aparecer una versión nueva se desalojan las anteriores.
+    """
+
+    def __init__(self, max_entradas=512, max_bytes=64 * 2**20):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._figuras = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Versión de los datos de cada hilo (cada rerun corre en su hilo) y
+        # versiones ya vistas, la más reciente al final
+        self._local = threading.local()
+        self._versiones = []
+        self.aciertos = 0
+        self.fallos = 0
+        # Figuras precalculadas fuera de línea (solo lectura), por clave serializada,
+        # y versión de los datos con que se construyeron
+        self._paquete = {}
+        self._version_paquete = None
+        self.aciertos_paquete = 0
+
+    def __len__(self):
+        return len(self._figuras)
+
+    def usar_version(self, version):
+        """Fija la versión de los datos para las figuras del hilo actual (el rerun en curso)."""
+        self._local.version = version
+
+    def version_actual(self):
+        return getattr(self._local, "version", None)
+
+    def obtener_json(self, clave, construir):
+        """Devuelve el JSON de la figura para `clave`, construyéndola si no está en caché."""
+        # La versión se toma una sola vez: la figura se guarda con la versión de
+        # los datos con que se construyó, aunque otro rerun ya use una más nueva
+        version = self.version_actual()
+        with self._lock:
+            if version not in self._versiones:
+                self._nueva_version(version)
+            serializada = self._figuras.get((version, clave))
+            if serializada is not None:
+                self._figuras.move_to_end((version, clave))
+                self.aciertos += 1
+                return serializada
+            if self._paquete and self._version_paquete == version:
+                serializada = self._paquete.get(clave_paquete(clave))
+                if serializada is not None:
+                    self.aciertos_paquete += 1
+                    return serializada
+            self.fallos += 1
+
+        # La figura se construye fuera del candado para no bloquear otras sesiones
+        with tramo("figura.construir", tipo=clave[0]):
+            serializada = construir().to_json()
+        self._guardar((version, clave), serializada)
+        return serializada
+
+    def obtener(self, clave, construir):
+        """Devuelve una figura nueva para `clave`, construyéndola si no está en caché."""
+        serializada = self.obtener_json(clave, construir)
+        with tramo("figura.deserializar", tipo=clave[0]):
+            return pio.from_json(serializada)
+
+    def guardar(self, clave, serializada, version=None):
+        """Guarda una figura serializada construida con la versión `version` de los datos."""
+        self._guardar((version, clave), serializada)
+
+    def _nueva_version(self, version):
+        """
+        Registra una versión de los datos y quita las figuras de las anteriores (se
+        llama con el candado tomado). Los reruns que todavía usan una versión
+        anterior siguen funcionando: sus figuras se guardan y desalojan como las demás.
+        """
+        for clave in [clave for clave in self._figuras if clave[0] != version]:
+            self._bytes -= len(self._figuras.pop(clave))
+        self._versiones = self._versiones[-7:] + [version]
+
+    def _guardar(self, clave, serializada):
+        """Guarda bajo (versión, clave) y desaloja las menos usadas si se exceden los límites."""
+        with self._lock:
+            anterior = self._figuras.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior)
+            self._figuras[clave] = serializada
+            self._bytes += len(serializada)
+            while self._figuras and (len(self._figuras) > self.max_entradas or self._bytes > self.max_bytes):
+                _, desalojada = self._figuras.popitem(last=False)
+                self._bytes -= len(desalojada)
+
+    def cargar_paquete(self, figuras, version=None):
+        """
+        Registra un paquete de figuras precalculadas (clave_paquete(clave) -> JSON)
+        construido con la versión `version` de los datos. Se consulta antes de
+        construir una figura que no está en la caché, solo mientras los datos
+        sigan en esa versión.
+        """
+        with self._lock:
+            self._paquete = dict(figuras)
+            self._version_paquete = version
+
+    def limpiar(self):
+        with self._lock:
+            self._figuras.clear()
+            self._paquete = {}
+            self._version_paquete = None
+            self._versiones = []
+            self._bytes = 0
+            self.aciertos = 0
+            self.fallos = 0
+            self.aciertos_paquete = 0
+
+    def estadisticas(self):
+        """Entradas, tamaño y tasa de aciertos de la caché."""
+        with self._lock:
+            consultas = self.aciertos + self.aciertos_paquete + self.fallos
+            return {
+                "paquete": len(self._paquete),
+                "entradas": len(self._figuras),
+                "bytes": self._bytes,
+                "aciertos": self.aciertos,
+                "aciertos_paquete": self.aciertos_paquete,
+                "fallos": self.fallos,
+                "tasa_aciertos": (self.aciertos + self.aciertos_paquete) / consultas if consultas else 0.0,
+            }
+
+
+def clave_paquete(clave):
+    """Clave de una figura serializada como texto (las tuplas anidadas pasan a listas)."""
+    return json.dumps(list(clave), ensure_ascii=False)
+
+
+# Caché única por proceso (los módulos importados sobreviven entre reruns)
+CACHE_FIGURAS = CacheFiguras()
+
+
+def figura_cacheada(tipo, clave):
+    """
+    Decorador para funciones que construyen figuras.
+
+    Parameters:
+    - tipo (str): Tipo de gráfica; forma parte de la clave.
+    - clave (callable): Recibe los mismos argumentos que la función y devuelve una
+      tupla hashable que identifica la figura.
+
+    La función decorada expone `.sin_cache` (la función original), `.clave` (la
+    clave completa de la figura) y `.json` (el JSON de la figura, desde la caché).
+    """
+    def decorador(funcion):
+        def clave_figura(*args, **kwargs):
+            return (tipo,) + tuple(clave(*args, **kwargs))
+
+        def obtener_json(*args, **kwargs):
+            return CACHE_FIGURAS.obtener_json(clave_figura(*args, **kwargs), lambda: funcion(*args, **kwargs))
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            return CACHE_FIGURAS.obtener(clave_figura(*args, **kwargs), lambda: funcion(*args, **kwargs))
+
+        envoltura.sin_cache = funcion
+        envoltura.clave = clave_figura
+        envoltura.json = obtener_json
+        return envoltura
+
+    return decorador
@@ -0,0 +1,214 @@
+"""
+Clasificación de una persona encuestada en el clúster más parecido.
+
+El perfil de una persona tiene las mismas medidas que describen a los
+municipios: el logaritmo de su ingreso mensual y los ocho índices de
+percepción, que para una sola persona valen 0 o 100 (o un punto intermedio si
+el índice combina varias preguntas). Los centroides de cada clúster y año se
+precalculan con los municipios (ver el artefacto "centroides_cluster" de
+utils.helpers.pipeline), junto con la escala de cada medida entre personas: la
+dispersión de los deciles dentro de los municipios para el ingreso y la de una
+proporción (sqrt(p(1 - p))) para los índices.
+
+Clasificar es una resta y una suma sobre una matriz (clústeres, medidas): la
+distancia es euclidiana en unidades estandarizadas y la confianza es la
+probabilidad del clúster elegido suponiendo ruido normal alrededor de cada
+centroide (softmax de -distancia² / 2).
+"""
+import numpy as np
+import pandas as pd
+
+from utils.helpers.schema import DECILES, GRUPOS_COLUMNAS
+
+INGRESO = "log_ingreso"
+PERCEPCIONES = GRUPOS_COLUMNAS["percepciones"]
+MEDIDAS = [INGRESO] + PERCEPCIONES
+
+# Preguntas del cuestionario (claves de user_data) y respuestas que cuentan para
+# cada índice de percepción; el índice es el porcentaje de preguntas que cuentan
+RESPUESTAS_PERCEPCION = {
+    "Percepcion_Economica_Personal_Positiva": {"Percepcion_Economica_Personal": {"Positiva"}, "Mejora_Economica_Personal": {"Sí"}},
+    "Percepcion_Economica_Personal_Negativa": {"Percepcion_Economica_Personal": {"Negativa"}, "Mejora_Economica_Personal": {"No"}},
+    "Percepcion_Naciona_Positiva": {"Percepcion_Economica_Nacional": {"Positiva"}, "Mejora_Economica_Nacional": {"Sí"}},
+    "Percepcion_Nacional_Negativa": {"Percepcion_Economica_Nacional": {"Negativa"}, "Mejora_Economica_Nacional": {"No"}},
+    "Consumo_Ahorro_Positivo": {"Ahorro": {"Sí"}, "Consumo": {"No"}},
+    "Consumo_Ahorro_Negativo": {"Ahorro": {"No"}, "Consumo": {"Sí"}},
+    "Incertidumbre_Economica_Personal": {"Incertidumbre_Personal": {"Inestable", "Muy inestable"}},
+    "Incertidumbre_Economica_Nacional": {"Incertidumbre_Nacional": {"Inestable", "Muy inestable"}},
+}
+
+# Escala mínima de un índice (puntos porcentuales), para los índices casi constantes
+ESCALA_MINIMA = 5.0
+
+
+def perfil(respuestas):
+    """
+    Perfil (medidas de MEDIDAS) de una persona a partir de sus respuestas.
+
+    Parameters:
+    - respuestas (dict): Respuestas con las claves de st.session_state["user_data"].
+
+    Returns:
+    - np.ndarray: Vector de medidas; las preguntas sin respuesta quedan en NaN.
+    """
+    valores = np.full(len(MEDIDAS), np.nan)
+    ingresos = respuestas.get("Ingresos")
+    if ingresos is not None:
+        valores[0] = np.log(max(float(ingresos), 1.0))
+    for j, preguntas in enumerate(RESPUESTAS_PERCEPCION.values(), start=1):
+        contestadas = [respuestas[pregunta] in cuentan for pregunta, cuentan in preguntas.items() if respuestas.get(pregunta) is not None]
+        if contestadas:
+            valores[j] = 100.0 * sum(contestadas) / len(contestadas)
+    return valores
+
+
+def perfiles(respuestas):
+    """
+    Perfiles de muchas personas a la vez (versión vectorizada de `perfil`).
+
+    Parameters:
+    - respuestas (pd.DataFrame): Una fila por persona, columnas con las claves de user_data.
+
+    Returns:
+    - np.ndarray: Matriz (personas, medidas); las preguntas sin respuesta quedan en NaN.
+    """
+    valores = np.full((len(respuestas), len(MEDIDAS)), np.nan)
+    if "Ingresos" in respuestas.columns:
+        valores[:, 0] = np.log(np.clip(pd.to_numeric(respuestas["Ingresos"], errors="coerce").to_numpy(dtype=np.float64), 1.0, None))
+    for j, preguntas in enumerate(RESPUESTAS_PERCEPCION.values(), start=1):
+        cuentan = np.zeros(len(respuestas))
+        contestadas = np.zeros(len(respuestas))
+        for pregunta, opciones in preguntas.items():
+            if pregunta in respuestas.columns:
+                columna = respuestas[pregunta]
+                cuentan += columna.isin(opciones).to_numpy()
+                contestadas += columna.notna().to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            valores[:, j] = np.where(contestadas > 0, 100.0 * cuentan / contestadas, np.nan)
+    return valores
+
+
+class CentroidesCluster:
+    """
+    Centroides (años, clústeres, medidas) y escalas (años, medidas) de los
+    clústeres; los clústeres sin municipios en un año quedan en NaN.
+    """
+
+    def __init__(self, years, clusters, centroides, escalas):
+        self.years = [str(year) for year in years]
+        self.clusters = np.asarray(clusters, dtype=np.int64)
+        self.centroides = np.asarray(centroides, dtype=np.float64)
+        self.escalas = np.asarray(escalas, dtype=np.float64)
+        self._posicion_year = {year: i for i, year in enumerate(self.years)}
+
+    @classmethod
+    def construir(cls, municipios):
+        """
+        Centroides por año a partir de los municipios (ingresos mensuales, ver aplicar_esquema).
+        """
+        log_deciles = np.log(np.clip(municipios[DECILES].to_numpy(dtype=np.float64), 1.0, None))
+        medidas = np.column_stack([log_deciles.mean(axis=1), municipios[PERCEPCIONES].to_numpy(dtype=np.float64)])
+        years_filas = municipios["year"].to_numpy()
+        clusters_filas = municipios["Cluster"].to_numpy()
+
+        years = np.unique(years_filas)
+        clusters = np.unique(clusters_filas)
+        centroides = np.full((len(years), len(clusters), len(MEDIDAS)), np.nan)
+        escalas = np.ones((len(years), len(MEDIDAS)))
+        for i, year in enumerate(years):
+            en_year = years_filas == year
+            for k, cluster in enumerate(clusters):
+                miembros = en_year & (clusters_filas == cluster)
+                if miembros.any():
+                    centroides[i, k] = np.nanmean(medidas[miembros], axis=0)
+
+            # Ingreso: dispersión de los deciles dentro de cada municipio; índices: la de una proporción
+            escalas[i, 0] = np.sqrt(np.nanmean(log_deciles[en_year].var(axis=1)))
+            proporciones = np.clip(np.nanmean(medidas[en_year, 1:], axis=0) / 100, 0, 1)
+            escalas[i, 1:] = np.maximum(100 * np.sqrt(proporciones * (1 - proporciones)), ESCALA_MINIMA)
+        return cls(years, clusters, centroides, escalas)
+
+    def clasificar(self, respuestas, year):
+        """
+        Clúster más cercano al perfil de una persona en un año.
+
+        Parameters:
+        - respuestas (dict | np.ndarray): Respuestas (ver `perfil`) o un perfil ya calculado.
+        - year (str | int): Año de los centroides.
+
+        Returns:
+        - dict | None: cluster, distancia, confianza y distancias (clúster -> distancia),
+          o None si no hay centroides para ese año.
+        """
+        i = self._posicion_year.get(str(year))
+        if i is None:
+            return None
+        x = perfil(respuestas) if isinstance(respuestas, dict) else np.asarray(respuestas, dtype=np.float64)
+        cuadrados = self._cuadrados(x[None, :], np.array([i]))[0]
+        cercano = int(cuadrados.argmin())
+        distancias = np.sqrt(cuadrados)
+        return {
+            "cluster": int(self.clusters[cercano]),
+            "distancia": float(distancias[cercano]),
+            "confianza": float(self._confianza(cuadrados[None, :], np.array([cercano]))[0]),
+            "distancias": dict(zip(self.clusters.tolist(), distancias.tolist())),
+        }
+
+    def clasificar_lote(self, perfiles, years):
+        """
+        Clúster más cercano de muchas personas (perfiles de `perfiles`), cada una con su año.
+
+        Returns:
+        - pd.DataFrame: Columnas cluster, distancia y confianza (NaN si no hay centroides del año).
+        """
+        posiciones = pd.Index(self.years).get_indexer(np.asarray(years).astype(str))
+        con_year = posiciones >= 0
+        cuadrados = self._cuadrados(np.asarray(perfiles, dtype=np.float64), np.where(con_year, posiciones, 0))
+        cercanos = cuadrados.argmin(axis=1)
+        filas = np.arange(len(cercanos))
+        return pd.DataFrame({
+            "cluster": np.where(con_year, self.clusters[cercanos], -1),
+            "distancia": np.where(con_year, np.sqrt(cuadrados[filas, cercanos]), np.nan),
+            "confianza": np.where(con_year, self._confianza(cuadrados, cercanos), np.nan),
+        })
+
+    def _cuadrados(self, x, years):
+        """Distancias estandarizadas al cuadrado (personas, clústeres) a los centroides de su año."""
+        centroides = self.centroides[years]
+        # Las medidas sin respuesta no cuentan; los clústeres sin centroide quedan fuera
+        diferencias = np.nan_to_num((x[:, None, :] - centroides) / self.escalas[years][:, None, :])
+        cuadrados = (diferencias**2).sum(axis=2)
+        cuadrados[np.isnan(centroides).all(axis=2)] = np.inf
+        return cuadrados
+
+    @staticmethod
+    def _confianza(cuadrados, cercanos):
+        filas = np.arange(len(cercanos))
+        verosimilitud = np.exp(-(cuadrados - cuadrados[filas, cercanos][:, None]) / 2)
+        return verosimilitud[filas, cercanos] / verosimilitud.sum(axis=1)
+
+    def a_tabla(self):
+        """Tabla plana (year, Cluster, medidas) para guardar en Parquet; Cluster 0 = escalas."""
+        filas = []
+        for i, year in enumerate(self.years):
+            filas.append(pd.DataFrame(self.centroides[i], columns=MEDIDAS).assign(year=year, Cluster=self.clusters))
+            filas.append(pd.DataFrame(self.escalas[i][None, :], columns=MEDIDAS).assign(year=year, Cluster=0))
+        return pd.concat(filas, ignore_index=True)[["year", "Cluster"] + MEDIDAS]
+
+    @classmethod
+    def desde_tabla(cls, tabla):
+        """Inverso de `a_tabla`."""
+        years = list(dict.fromkeys(tabla["year"].astype(str)))
+        es_escala = tabla["Cluster"].to_numpy() == 0
+        clusters = np.unique(tabla.loc[~es_escala, "Cluster"].to_numpy())
+        centroides = np.full((len(years), len(clusters), len(MEDIDAS)), np.nan)
+        escalas = np.ones((len(years), len(MEDIDAS)))
+        posicion_cluster = {cluster: k for k, cluster in enumerate(clusters.tolist())}
+        for fila in tabla.itertuples(index=False):
+            i = years.index(str(fila.year))
+            valores = np.array(fila[2:], dtype=np.float64)
+            if fila.Cluster == 0:
+                escalas[i] = valores
+            else:
+                centroides[i, posicion_cluster[fila.Cluster]] = valores
+        return cls(years, clusters, centroides, escalas)
@@ -0,0 +1,149 @@
+"""
+Modo de datos compartidos entre procesos de Streamlit.
+
+Los conjuntos de datos se publican una sola vez como archivos Arrow IPC sin
+comprimir y cada proceso los abre con memory-map. Las columnas numéricas se
+guardan sin nulos (los NaN se conservan como valores) para que `to_pandas`
+las exponga sin copiar: todos los procesos comparten las mismas páginas del
+archivo en la caché del sistema operativo.
+
+Se activa definiendo la variable de entorno DASHBOARD_ARROW_DIR con el
+directorio donde se publican los archivos.
+"""
+import fcntl
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from utils.helpers.data_loader import ARCHIVOS, DATA_DIR, GRUPOS_DASHBOARD, leer_tabla, rutas_archivo
+from utils.helpers.schema import aplicar_esquema
+
+VARIABLE_ENTORNO = "DASHBOARD_ARROW_DIR"
+MANIFIESTO = "manifiesto.json"
+
+
+def directorio_compartido():
+    """Directorio de publicación, o None si el modo compartido está desactivado."""
+    return os.environ.get(VARIABLE_ENTORNO) or None
+
+
+def _tabla_arrow(data):
+    """Convierte un DataFrame a Arrow conservando los NaN como valores (sin nulos)."""
+    columnas = []
+    for col in data.columns:
+        serie = data[col]
+        if serie.dtype.kind in "fiub":
+            columnas.append(pa.array(serie.to_numpy(), from_pandas=False))
+        else:
+            columnas.append(pa.array(serie))
+    return pa.table(columnas, names=[str(col) for col in data.columns])
+
+
+def _firma_origen(directorio_datos=DATA_DIR):
+    """Tamaño y fecha de modificación de los archivos de origen de cada conjunto de datos."""
+    firma = {}
+    for nombre in ARCHIVOS:
+        for ruta in rutas_archivo(nombre, directorio_datos):
+            if os.path.exists(ruta):
+                estado = os.stat(ruta)
+                firma[ruta] = [estado.st_size, estado.st_mtime_ns]
+    return firma
+
+
+def _escribir_atomico(ruta, tabla):
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with pa.OSFile(temporal, "wb") as destino:
+        with ipc.new_file(destino, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+    # Los procesos que ya tienen el archivo anterior mapeado conservan su inodo
+    os.replace(temporal, ruta)
+
+
+def publicar_datos(directorio, grupos=GRUPOS_DASHBOARD, directorio_datos=DATA_DIR):
+    """
+    Publica los cuatro conjuntos de datos (con el esquema compacto ya aplicado)
+    como archivos Arrow IPC en `directorio`.
+
+    Returns:
+    - list: Rutas de los archivos publicados.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    publicados = []
+    for nombre in ARCHIVOS:
+        data = aplicar_esquema(leer_tabla(nombre, grupos, directorio_datos))
+        ruta = os.path.join(directorio, f"{nombre}.arrow")
+        _escribir_atomico(ruta, _tabla_arrow(data))
+        publicados.append(ruta)
+
+    manifiesto = {"grupos": list(grupos), "origen": _firma_origen(directorio_datos)}
+    temporal = os.path.join(directorio, f"{MANIFIESTO}.{os.getpid()}.tmp")
+    with open(temporal, "w") as f:
+        json.dump(manifiesto, f)
+    os.replace(temporal, os.path.join(directorio, MANIFIESTO))
+    return publicados
+
+
+def publicacion_vigente(directorio, grupos=GRUPOS_DASHBOARD, directorio_datos=DATA_DIR):
+    """True si los archivos publicados corresponden a los datos de origen actuales."""
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return False
+    with open(ruta) as f:
+        manifiesto = json.load(f)
+    if manifiesto.get("grupos") != list(grupos):
+        return False
+    if manifiesto.get("origen") != _firma_origen(directorio_datos):
+        return False
+    return all(os.path.exists(os.path.join(directorio, f"{nombre}.arrow")) for nombre in ARCHIVOS)
+
+
+def asegurar_publicacion(directorio, grupos=GRUPOS_DASHBOARD, directorio_datos=DATA_DIR, forzar=False):
+    """
+    Publica los datos si hace falta (o siempre, con `forzar`). Un candado de
+    archivo garantiza que, cuando varios procesos arrancan a la vez (o alguien
+    publica a mano), solo uno de ellos escribe.
+
+    Returns:
+    - list: Rutas de los archivos publicados (vacía si la publicación ya estaba vigente).
+    """
+    os.makedirs(directorio, exist_ok=True)
+    with open(os.path.join(directorio, ".lock"), "w") as candado:
+        fcntl.flock(candado, fcntl.LOCK_EX)
+        try:
+            if forzar or not publicacion_vigente(directorio, grupos, directorio_datos):
+                return publicar_datos(directorio, grupos, directorio_datos)
+            return []
+        finally:
+            fcntl.flock(candado, fcntl.LOCK_UN)
+
+
+def adjuntar_tabla(ruta):
+    """
+    Abre un archivo Arrow publicado con memory-map y lo expone como DataFrame.
+    Las columnas numéricas son vistas de solo lectura sobre el archivo mapeado.
+    """
+    tabla = ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+    return tabla.to_pandas(split_blocks=True)
+
+
+def adjuntar_datos(directorio):
+    """
+    Asegura la publicación y devuelve los conjuntos de datos mapeados en memoria.
+
+    Returns:
+    - dict: Nombre del conjunto de datos -> DataFrame.
+    """
+    asegurar_publicacion(directorio)
+    return {nombre: adjuntar_tabla(os.path.join(directorio, f"{nombre}.arrow")) for nombre in ARCHIVOS}
+
+
+if __name__ == "__main__":
+    # DASHBOARD_ARROW_DIR=/dev/shm/dashboard python -m utils.helpers.compartido
+    destino = directorio_compartido()
+    if destino is None:
+        raise SystemExit(f"Define {VARIABLE_ENTORNO} con el directorio de publicación.")
+    # Con el mismo candado que la publicación desde la aplicación
+    for ruta in asegurar_publicacion(destino, forzar=True):
+        print(f"Publicado {ruta}")
@@ -0,0 +1,186 @@
+"""
+Sketches de cuantiles ponderados y combinables por municipio × año.
+
+Cada sketch es un histograma sobre bordes logarítmicos fijos (como DDSketch):
+por bin guarda la población y el ingreso total. Como todos los sketches usan
+los mismos bordes, combinar los de cualquier conjunto de filas es sumar sus
+bins, y de la suma salen los deciles (ingreso promedio de cada décimo de la
+población), el ingreso promedio y el GINI del conjunto. El único error es el
+reparto, dentro de un bin, de la población que cruza un corte de decil: queda
+acotado por el ancho relativo de los bins (RAZON_BINS).
+
+Los sketches se guardan dispersos (solo los bins ocupados, en formato CSR) y
+se pueden construir desde los deciles de data/processed (cada fila aporta diez
+puntos de igual peso, como en utils.helpers.desigualdad) o desde los
+histogramas de microdatos de utils.helpers.microdatos (ponderados por el
+factor de expansión).
+"""
+import numpy as np
+import pandas as pd
+
+from utils.helpers.schema import DECILES
+
+# Bins: [0, 1) y bordes logarítmicos de 1 a 1e9 con razón RAZON_BINS
+RAZON_BINS = 1.02
+BORDES = np.concatenate(([0.0], np.geomspace(1.0, 1e9, int(np.ceil(np.log(1e9) / np.log(RAZON_BINS))) + 1)))
+
+
+def indice_bins(valores, bordes=BORDES):
+    """Bin de cada valor (los negativos van al primero y los mayores a 1e9 al último)."""
+    return np.clip(np.searchsorted(bordes, valores, side="right") - 1, 0, len(bordes) - 1)
+
+
+def resumir_histogramas(poblacion, ingreso):
+    """
+    Deciles, ingreso promedio y GINI de cada fila de histogramas.
+
+    Parameters:
+    - poblacion (np.ndarray): Matriz (grupos, bins) de población ponderada.
+    - ingreso (np.ndarray): Matriz (grupos, bins) de ingreso total ponderado.
+
+    Returns:
+    - pd.DataFrame: Columnas gini, decil_1..decil_10 e ingreso_promedio_total.
+    """
+    grupos = len(poblacion)
+    ceros = np.zeros((grupos, 1))
+    acum_poblacion = np.hstack([ceros, np.cumsum(poblacion, axis=1)])
+    acum_ingreso = np.hstack([ceros, np.cumsum(ingreso, axis=1)])
+    poblacion_total = acum_poblacion[:, -1]
+    ingreso_total = acum_ingreso[:, -1]
+
+    vacios = poblacion_total <= 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Los grupos vacíos quedan en 0 para no romper la interpolación conjunta
+        p = np.nan_to_num(acum_poblacion / poblacion_total[:, None])
+        lorenz = np.nan_to_num(acum_ingreso / ingreso_total[:, None])
+        gini = 1 - np.sum(np.diff(p, axis=1) * (lorenz[:, 1:] + lorenz[:, :-1]), axis=1)
+
+        # Ingreso acumulado en cada corte de decil: una sola interpolación para todos
+        # los grupos, cada uno desplazado a su intervalo [2g, 2g + 1]
+        desplazamiento = 2 * np.arange(grupos)[:, None]
+        cortes = np.linspace(0, 1, len(DECILES) + 1)[None, :] + desplazamiento
+        en_cortes = np.interp(cortes.ravel(), (p + desplazamiento).ravel(), lorenz.ravel()).reshape(grupos, -1)
+        deciles = np.diff(en_cortes, axis=1) * (ingreso_total / (poblacion_total / len(DECILES)))[:, None]
+        promedio = ingreso_total / poblacion_total
+
+    gini[vacios] = np.nan
+    deciles[vacios] = np.nan
+    resumen = pd.DataFrame(deciles, columns=DECILES)
+    resumen.insert(0, "gini", gini)
+    resumen["ingreso_promedio_total"] = promedio
+    return resumen
+
+
+class SketchesCuantiles:
+    """
+    Un sketch por fila de una tabla (municipio × año), guardados en formato CSR:
+    los bins ocupados de la fila i están en [inicios[i], inicios[i + 1]).
+    """
+
+    def __init__(self, inicios, bins, poblacion, ingreso, bordes=BORDES):
+        self.inicios = np.asarray(inicios, dtype=np.int64)
+        self.bins = np.asarray(bins, dtype=np.int32)
+        self.poblacion = np.asarray(poblacion, dtype=np.float64)
+        self.ingreso = np.asarray(ingreso, dtype=np.float64)
+        self.bordes = np.asarray(bordes, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.inicios) - 1
+
+    @classmethod
+    def desde_deciles(cls, deciles, pesos=None, bordes=BORDES):
+        """
+        Sketches a partir de una matriz (filas, deciles) de ingresos promedio:
+        cada decil es un punto con la décima parte del peso de la fila.
+        Los deciles con NaN se descartan.
+        """
+        deciles = np.asarray(deciles, dtype=np.float64)
+        filas, k = deciles.shape
+        pesos = np.ones(filas) if pesos is None else np.asarray(pesos, dtype=np.float64)
+
+        fila = np.repeat(np.arange(filas), k)
+        valores = deciles.ravel()
+        peso = np.repeat(pesos / k, k)
+        validos = ~np.isnan(valores)
+        fila, valores, peso = fila[validos], valores[validos], peso[validos]
+
+        # Puntos de una misma fila que caen en el mismo bin se suman
+        celdas, inversa = np.unique(fila * len(bordes) + indice_bins(valores, bordes), return_inverse=True)
+        poblacion = np.bincount(inversa, peso)
+        ingreso = np.bincount(inversa, peso * valores)
+        inicios = np.concatenate(([0], np.cumsum(np.bincount(celdas // len(bordes), minlength=filas))))
+        return cls(inicios, celdas % len(bordes), poblacion, ingreso, bordes)
+
+    @classmethod
+    def desde_histogramas(cls, poblacion, ingreso, bordes=BORDES):
+        """Sketches a partir de histogramas densos (filas, bins), p. ej. de AcumuladorIngresos."""
+        poblacion = np.asarray(poblacion, dtype=np.float64)
+        fila, bins = np.nonzero(poblacion)
+        inicios = np.concatenate(([0], np.cumsum(np.bincount(fila, minlength=len(poblacion)))))
+        return cls(inicios, bins, poblacion[fila, bins], np.asarray(ingreso)[fila, bins], bordes)
+
+    def combinar(self, grupos):
+        """
+        Suma los sketches de cada grupo de filas.
+
+        Parameters:
+        - grupos (list): Arrays de posiciones de filas, uno por grupo.
+
+        Returns:
+        - tuple: Matrices densas (grupos, bins) de población e ingreso.
+        """
+        grupos = [np.asarray(grupo, dtype=np.int64) for grupo in grupos]
+        filas = np.concatenate(grupos) if grupos else np.empty(0, dtype=np.int64)
+        grupo_fila = np.repeat(np.arange(len(grupos)), [len(grupo) for grupo in grupos])
+
+        # Posiciones de todos los bins ocupados de las filas, sin recorrerlas en Python
+        largos = self.inicios[filas + 1] - self.inicios[filas]
+        desplazamientos = np.repeat(self.inicios[filas] - np.cumsum(largos) + largos, largos)
+        entradas = desplazamientos + np.arange(largos.sum())
+        celdas = np.repeat(grupo_fila, largos) * len(self.bordes) + self.bins[entradas]
+
+        tamano = len(grupos) * len(self.bordes)
+        poblacion = np.bincount(celdas, self.poblacion[entradas], minlength=tamano)
+        ingreso = np.bincount(celdas, self.ingreso[entradas], minlength=tamano)
+        return poblacion.reshape(len(grupos), -1), ingreso.reshape(len(grupos), -1)
+
+    def resumir(self, grupos):
+        """
+        Deciles, ingreso promedio y GINI de la unión de las filas de cada grupo.
+
+        Returns:
+        - pd.DataFrame: Una fila por grupo (ver resumir_histogramas).
+        """
+        return resumir_histogramas(*self.combinar(grupos))
+
+    def a_tabla(self):
+        """Tabla plana (fila, bin, poblacion, ingreso) para guardar en Parquet."""
+        return pd.DataFrame({
+            "fila": np.repeat(np.arange(len(self)), np.diff(self.inicios)).astype(np.int32),
+            "bin": self.bins.astype(np.int16),
+            "poblacion": self.poblacion,
+            "ingreso": self.ingreso,
+        })
+
+    @classmethod
+    def desde_tabla(cls, tabla, filas, bordes=BORDES):
+        """Inverso de `a_tabla` (filas = número de filas de la tabla original)."""
+        inicios = np.concatenate(([0], np.cumsum(np.bincount(tabla["fila"].to_numpy(), minlength=filas))))
+        return cls(inicios, tabla["bin"].to_numpy(), tabla["poblacion"].to_numpy(), tabla["ingreso"].to_numpy(), bordes)
+
+
+def escribir_sketches(sketches, ruta):
+    """Escribe los sketches como Parquet (zstd), con el número de filas en los metadatos."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tabla = pa.Table.from_pandas(sketches.a_tabla(), preserve_index=False)
+    tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), b"filas": str(len(sketches)).encode()})
+    pq.write_table(tabla, ruta, compression="zstd")
+
+
+def leer_sketches(ruta):
+    import pyarrow.parquet as pq
+
+    tabla = pq.read_table(ruta)
+    return SketchesCuantiles.desde_tabla(tabla.to_pandas(), int(tabla.schema.metadata[b"filas"]))
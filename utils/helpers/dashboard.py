@@ -1,7 +1,15 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 
+from utils.helpers.agregados import DECILES_VISTA, TODOS
+from utils.helpers.cuantiles import SketchesCuantiles
+from utils.helpers.desigualdad import gini_agregado
+from utils.helpers.indices import IndiceVista
+from utils.helpers.instrumentacion import medir, mostrar_figura, tramo
+from utils.helpers.schema import DECILES
+
 # Función para normalizar las columnas
 def normalizar_columnas(data):
     columnas_renombradas = {
@@ -29,16 +37,81 @@ def normalizar_columnas(data):
     }
     return data.rename(columns=columnas_renombradas)
 
-# Función para mostrar el dashboard de exploración
-def mostrar_dashboard_exploracion(municipios_data, estados_data):
-    # Normalizar columnas
-    municipios_data = normalizar_columnas(municipios_data)
-    estados_data = normalizar_columnas(estados_data)
-
-    # Eliminar columnas irrelevantes
+# Vista del dashboard: columnas normalizadas y solo las columnas que se muestran.
+# La construye el pipeline de artefactos (o el registro de datos, una vez por proceso).
+def construir_vista(data):
     columnas_eliminar = ["ingreso_promedio_total", "Unnamed: 0"]
-    municipios_data = municipios_data.drop(columns=[col for col in columnas_eliminar if col in municipios_data.columns], errors="ignore")
-    estados_data = estados_data.drop(columns=[col for col in columnas_eliminar if col in estados_data.columns], errors="ignore")
+    data = normalizar_columnas(data.drop(columns=[col for col in columnas_eliminar if col in data.columns]))
+
+    # Filtro de columnas relevantes (antes se hacía en cada rerun)
+    columnas_relevantes = [
+        col for col in data.columns
+        if not any(p in col.lower() for p in ["respuesta", "id municipio", "region", "cluster"])
+    ]
+    return data[columnas_relevantes]
+
+# Opciones de la tabla paginada de "Información Seleccionada"
+SIN_ORDEN = "(Orden original)"
+TAMANOS_PAGINA = [25, 50, 100, 250]
+
+
+def mostrar_tabla_paginada(vista, indice, filas, columnas):
+    """
+    Muestra las filas seleccionadas de una vista como tabla paginada en el servidor.
+
+    El orden se toma de los órdenes precalculados del índice y solo la página
+    visible (con las columnas seleccionadas) se envía al navegador.
+
+    Parameters:
+    - vista (pd.DataFrame): Vista del dashboard.
+    - indice (IndiceVista): Índice de la vista.
+    - filas (np.ndarray): Posiciones de las filas seleccionadas.
+    - columnas (list): Columnas a mostrar.
+    """
+    col_orden, col_direccion, col_tamano = st.columns([2, 1, 1])
+    orden = col_orden.selectbox("Ordenar por", [SIN_ORDEN] + list(columnas), key="tabla_orden")
+    descendente = col_direccion.toggle("Descendente", key="tabla_descendente")
+    tamano = col_tamano.selectbox("Filas por página", TAMANOS_PAGINA, index=1, key="tabla_tamano")
+
+    paginas = max(1, -(-len(filas) // tamano))
+    pagina = 1
+    if paginas > 1:
+        # La selección pudo reducirse desde el rerun anterior
+        if st.session_state.get("tabla_pagina", 1) > paginas:
+            st.session_state["tabla_pagina"] = paginas
+        pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key="tabla_pagina")
+
+    with tramo("dashboard.tabla"):
+        posiciones = indice.ordenar(filas, None if orden == SIN_ORDEN else orden, descendente)
+        inicio = (pagina - 1) * tamano
+        datos_pagina = vista.iloc[posiciones[inicio:inicio + tamano]][columnas]
+    st.dataframe(datos_pagina)
+    st.caption(f"Filas {inicio + 1}–{inicio + len(datos_pagina)} de {len(filas)} (página {pagina} de {paginas})")
+
+
+# Función para mostrar el dashboard de exploración
+@medir("mostrar_dashboard_exploracion")
+def mostrar_dashboard_exploracion(municipios_data, estados_data, promedios_globales=None, indices=None, sketches=None):
+    # municipios_data y estados_data son las vistas de construir_vista (compartidas
+    # entre sesiones: no se modifican). Por nivel de análisis:
+    # - promedios_globales: tabla de construir_promedios_globales
+    # - indices: IndiceVista de la vista
+    # - sketches: SketchesCuantiles alineados con las filas de la vista
+    # Si no se reciben precalculados, se construyen aquí.
+    if promedios_globales is None:
+        from utils.helpers.agregados import construir_promedios_globales
+
+        promedios_globales = {
+            "Municipal": construir_promedios_globales(municipios_data),
+            "Estatal": construir_promedios_globales(estados_data),
+        }
+    if indices is None:
+        indices = {"Municipal": IndiceVista(municipios_data), "Estatal": IndiceVista(estados_data)}
+    if sketches is None:
+        sketches = {
+            "Municipal": SketchesCuantiles.desde_deciles(municipios_data[DECILES_VISTA].to_numpy()),
+            "Estatal": SketchesCuantiles.desde_deciles(estados_data[DECILES_VISTA].to_numpy()),
+        }
 
     st.title("📊 Dashboard Exploración de Datos")
     st.markdown("""
@@ -66,7 +139,7 @@ def mostrar_dashboard_exploracion(municipios_data, estados_data):
     # Selección del año
     year_seleccionado = st.selectbox(
         "Selecciona el Año",
-        [2018, 2020, 2022],
+        sorted(set(indices["Estatal"].years) | set(indices["Municipal"].years)),
         key="year_seleccionado"
     )
 
@@ -74,47 +147,39 @@ def mostrar_dashboard_exploracion(municipios_data, estados_data):
         # Selección múltiple de estados
         estados_seleccionados = st.multiselect(
             "Selecciona Estados",
-            estados_data["Estado"].unique(),
+            indices["Estatal"].estados,
             key="estados_seleccionados"
         )
 
-        # Filtrar datos para los estados seleccionados
-        data_filtrada = estados_data[
-            (estados_data["Estado"].isin(estados_seleccionados)) &
-            (estados_data["Año"] == year_seleccionado)
-        ]
+        # Filtrar datos para los estados seleccionados (solo sus filas)
+        with tramo("dashboard.filtrado"):
+            filas = indices["Estatal"].filas(estados_seleccionados, year_seleccionado)
+            data_filtrada = estados_data.iloc[filas]
         agrupador = "Estado"
 
     elif nivel_analisis == "Municipal":
         # Selección múltiple de estados
         estados_seleccionados = st.multiselect(
             "Selecciona Estados",
-            municipios_data["Estado"].unique(),
+            indices["Municipal"].estados,
             key="estados_seleccionados"
         )
 
-        # Filtrar municipios disponibles
-        municipios_disponibles = municipios_data[municipios_data["Estado"].isin(estados_seleccionados)]
+        # Municipios disponibles en los estados seleccionados
+        with tramo("dashboard.filtrado"):
+            municipios_disponibles = indices["Municipal"].municipios(estados_seleccionados)
         municipios_seleccionados = st.multiselect(
             "Selecciona Municipios",
-            municipios_disponibles["Municipio"].unique(),
+            municipios_disponibles,
             key="municipios_seleccionados"
         )
 
-        # Filtrar datos para los municipios seleccionados
-        data_filtrada = municipios_disponibles[
-            (municipios_disponibles["Municipio"].isin(municipios_seleccionados)) &
-            (municipios_disponibles["Año"] == year_seleccionado)
-        ]
+        # Filtrar datos para los municipios seleccionados (solo filas de sus estados)
+        with tramo("dashboard.filtrado"):
+            filas = indices["Municipal"].filas(estados_seleccionados, year_seleccionado, municipios_seleccionados)
+            data_filtrada = municipios_data.iloc[filas]
         agrupador = "Municipio"
 
-    # Filtro de columnas relevantes automáticamente
-    columnas_relevantes = [
-        col for col in data_filtrada.columns
-        if not any(p in col.lower() for p in ["respuesta", "id municipio", "region", "cluster"])
-    ]
-    data_filtrada = data_filtrada[columnas_relevantes]
-
     # Filtro de columnas para la tabla
     st.subheader("📋 Información Seleccionada")
     columnas_disponibles = list(data_filtrada.columns)
@@ -123,7 +188,8 @@ def mostrar_dashboard_exploracion(municipios_data, estados_data):
     # Mostrar tabla filtrada
     if not data_filtrada.empty:
         st.write(f"**Datos filtrados para el nivel seleccionado ({year_seleccionado}):**")
-        st.dataframe(data_filtrada[columnas_seleccionadas])
+        vista = municipios_data if nivel_analisis == "Municipal" else estados_data
+        mostrar_tabla_paginada(vista, indices[nivel_analisis], filas, columnas_seleccionadas)
     else:
         st.warning("No hay datos disponibles para mostrar en la tabla.")
 
@@ -133,101 +199,102 @@ def mostrar_dashboard_exploracion(municipios_data, estados_data):
         El coeficiente GINI mide la desigualdad en los ingresos. 
         Un valor de GINI más alto indica mayor desigualdad. 
         Este gráfico compara el coeficiente GINI de los municipios o estados seleccionados.
+        Las líneas muestran el GINI de la población combinada (a partir de los deciles)
+        de los datos filtrados y de todos los municipios o estados del año.
     """)
 
     if not data_filtrada.empty:
-        data_gini = data_filtrada.groupby(agrupador, as_index=False).agg({"Coeficiente GINI": "mean"})
-        promedio_seleccionados = data_gini["Coeficiente GINI"].mean()
-        promedio_global = estados_data["Coeficiente GINI"].mean() if nivel_analisis == "Estatal" else municipios_data["Coeficiente GINI"].mean()
-
-        # Ordenar con los seleccionados al final y los promedios al inicio
-        data_gini["Grupo"] = data_gini[agrupador].apply(lambda x: "Seleccionado" if x in (estados_seleccionados if nivel_analisis == "Estatal" else municipios_seleccionados) else "Otros")
-        data_gini = data_gini.sort_values(by=["Grupo", "Coeficiente GINI"], ascending=[False, True]).reset_index(drop=True)
-
-        fig_gini = px.bar(
-            data_gini,
-            x=agrupador,
-            y="Coeficiente GINI",
-            color="Grupo",
-            color_discrete_map={"Seleccionado": "#636EFA", "Otros": "lightgray"},
-            title=f"Coeficiente GINI por {agrupador} ({year_seleccionado})",
-            labels={agrupador: nivel_analisis, "Coeficiente GINI": "GINI"}
-        )
-        fig_gini.add_hline(y=promedio_global, line_dash="dot", annotation_text=f"Promedio Global: {promedio_global:.2f}", line_color="red")
-        fig_gini.add_hline(y=promedio_seleccionados, line_dash="dot", annotation_text=f"Promedio Seleccionados: {promedio_seleccionados:.2f}", line_color="green")
-        fig_gini.update_layout(showlegend=False, xaxis_title=None)
-        st.plotly_chart(fig_gini, use_container_width=True)
+        with tramo("dashboard.agregacion", grafica="gini"):
+            data_gini = data_filtrada.groupby(agrupador, as_index=False, observed=True).agg({"Coeficiente GINI": "mean"})
+            gini_seleccionados = gini_agregado(data_filtrada[DECILES_VISTA].to_numpy(), [np.arange(len(data_filtrada))])[0]
+            gini_global = promedios_globales[nivel_analisis].at[str(year_seleccionado), "GINI Agregado"]
+
+            # Ordenar con los seleccionados al final y los promedios al inicio
+            data_gini["Grupo"] = data_gini[agrupador].apply(lambda x: "Seleccionado" if x in (estados_seleccionados if nivel_analisis == "Estatal" else municipios_seleccionados) else "Otros")
+            data_gini = data_gini.sort_values(by=["Grupo", "Coeficiente GINI"], ascending=[False, True]).reset_index(drop=True)
+
+        with tramo("dashboard.figura", grafica="gini"):
+            fig_gini = px.bar(
+                data_gini,
+                x=agrupador,
+                y="Coeficiente GINI",
+                color="Grupo",
+                color_discrete_map={"Seleccionado": "#636EFA", "Otros": "lightgray"},
+                title=f"Coeficiente GINI por {agrupador} ({year_seleccionado})",
+                labels={agrupador: nivel_analisis, "Coeficiente GINI": "GINI"}
+            )
+            fig_gini.add_hline(y=gini_global, line_dash="dot", annotation_text=f"GINI Global: {gini_global:.2f}", line_color="red")
+            fig_gini.add_hline(y=gini_seleccionados, line_dash="dot", annotation_text=f"GINI Seleccionados: {gini_seleccionados:.2f}", line_color="green")
+            fig_gini.update_layout(showlegend=False, xaxis_title=None)
+        mostrar_figura(fig_gini, use_container_width=True)
 
     # Gráfico 2: Distribución de Deciles
     st.subheader("📊 Distribución de Deciles")
     st.markdown("""
         Este gráfico muestra la distribución de los ingresos promedio divididos en deciles.
         - **Municipios o Estados Seleccionados**: Representados con líneas azules.
-        - **Promedio Global**: Representado en rojo.
-        - **Promedio Seleccionado**: Representado en verde.
+        - **Deciles Globales**: Deciles de la población combinada de todos los municipios o estados del año, en rojo.
+        - **Deciles Seleccionados**: Deciles de la población combinada de los seleccionados, en verde.
     """)
 
     deciles = [f"Decil {i}" for i in range(1, 11)]
     if all(col in data_filtrada.columns for col in deciles):
         # Datos de los seleccionados
-        seleccionados_data = data_filtrada.melt(
-            id_vars=[agrupador],
-            value_vars=deciles,
-            var_name="Decil",
-            value_name="Ingreso Promedio"
-        )
-        seleccionados_data["Grupo"] = seleccionados_data[agrupador]
-
-        # Calcular los promedios seleccionados
-        promedio_seleccionados = data_filtrada[deciles].mean().reset_index()
-        promedio_seleccionados.columns = ["Decil", "Promedio Seleccionado"]
-
-        # Calcular los promedios globales
-        if nivel_analisis == "Municipal":
-            promedio_global = municipios_data[municipios_data["Año"] == year_seleccionado][deciles].mean().reset_index()
-        else:
-            promedio_global = estados_data[estados_data["Año"] == year_seleccionado][deciles].mean().reset_index()
-        promedio_global.columns = ["Decil", "Promedio Global"]
+        with tramo("dashboard.agregacion", grafica="deciles"):
+            seleccionados_data = data_filtrada.melt(
+                id_vars=[agrupador],
+                value_vars=deciles,
+                var_name="Decil",
+                value_name="Ingreso Promedio"
+            )
+            seleccionados_data["Grupo"] = seleccionados_data[agrupador]
+
+            # Deciles de la población combinada: seleccionados y todo el año, en una sola combinación de sketches
+            filas_year = indices[nivel_analisis].seleccionar({"Año": [int(year_seleccionado)]})
+            combinados = sketches[nivel_analisis].resumir([filas, filas_year])[DECILES].to_numpy()
+            deciles_seleccionados = pd.DataFrame({"Decil": deciles, "Deciles Seleccionados": combinados[0]})
+            deciles_globales = pd.DataFrame({"Decil": deciles, "Deciles Globales": combinados[1]})
 
         # Graficar las líneas de los seleccionados
-        fig_deciles = px.line(
-            seleccionados_data,
-            x="Decil",
-            y="Ingreso Promedio",
-            color="Grupo",
-            title=f"Distribución de Deciles por {agrupador} ({year_seleccionado})",
-            labels={"Ingreso Promedio": "Ingreso Promedio", "Grupo": "Seleccionado"},
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
-
-        # Añadir línea para el promedio seleccionado
-        fig_deciles.add_scatter(
-            x=promedio_seleccionados["Decil"],
-            y=promedio_seleccionados["Promedio Seleccionado"],
-            mode="lines+markers",
-            line=dict(color="green", dash="solid"),
-            name="Promedio Seleccionado"
-        )
-
-        # Añadir línea para el promedio global
-        fig_deciles.add_scatter(
-            x=promedio_global["Decil"],
-            y=promedio_global["Promedio Global"],
-            mode="lines+markers",
-            line=dict(color="red", dash="solid"),
-            name="Promedio Global"
-        )
-
-        # Ajustar diseño
-        fig_deciles.update_layout(
-            showlegend=True,
-            xaxis_title="Decil",
-            yaxis_title="Ingreso Promedio",
-            hovermode="x unified"
-        )
+        with tramo("dashboard.figura", grafica="deciles"):
+            fig_deciles = px.line(
+                seleccionados_data,
+                x="Decil",
+                y="Ingreso Promedio",
+                color="Grupo",
+                title=f"Distribución de Deciles por {agrupador} ({year_seleccionado})",
+                labels={"Ingreso Promedio": "Ingreso Promedio", "Grupo": "Seleccionado"},
+                color_discrete_sequence=px.colors.qualitative.Set2
+            )
+
+            # Añadir línea para los deciles de los seleccionados
+            fig_deciles.add_scatter(
+                x=deciles_seleccionados["Decil"],
+                y=deciles_seleccionados["Deciles Seleccionados"],
+                mode="lines+markers",
+                line=dict(color="green", dash="solid"),
+                name="Deciles Seleccionados"
+            )
+
+            # Añadir línea para los deciles globales
+            fig_deciles.add_scatter(
+                x=deciles_globales["Decil"],
+                y=deciles_globales["Deciles Globales"],
+                mode="lines+markers",
+                line=dict(color="red", dash="solid"),
+                name="Deciles Globales"
+            )
+
+            # Ajustar diseño
+            fig_deciles.update_layout(
+                showlegend=True,
+                xaxis_title="Decil",
+                yaxis_title="Ingreso Promedio",
+                hovermode="x unified"
+            )
 
         # Mostrar el gráfico
-        st.plotly_chart(fig_deciles, use_container_width=True)
+        mostrar_figura(fig_deciles, use_container_width=True)
     else:
         st.warning("No hay datos disponibles para la distribución de deciles.")
 
@@ -251,73 +318,65 @@ def mostrar_dashboard_exploracion(municipios_data, estados_data):
 
     if categorias_disponibles:
         # Preparar los datos para las barras
-        data_categorias = data_filtrada.melt(
-            id_vars=[agrupador],
-            value_vars=categorias_disponibles,
-            var_name="Categoría",
-            value_name="Porcentaje"
-        )
-
-        # Calcular los promedios seleccionados (solo los datos seleccionados)
-        promedio_seleccionados = data_categorias.groupby("Categoría")["Porcentaje"].mean().reset_index(name="Promedio Seleccionados")
-
-        # Calcular los promedios globales (todos los datos del DataFrame original)
-        if nivel_analisis == "Municipal":
-            promedio_global = municipios_data.melt(
-                id_vars=["Municipio"],
+        with tramo("dashboard.agregacion", grafica="categorias"):
+            data_categorias = data_filtrada.melt(
+                id_vars=[agrupador],
                 value_vars=categorias_disponibles,
                 var_name="Categoría",
                 value_name="Porcentaje"
-            ).groupby("Categoría")["Porcentaje"].mean().reset_index(name="Promedio Global")
-        else:
-            promedio_global = estados_data.melt(
-                id_vars=["Estado"],
-                value_vars=categorias_disponibles,
-                var_name="Categoría",
-                value_name="Porcentaje"
-            ).groupby("Categoría")["Porcentaje"].mean().reset_index(name="Promedio Global")
+            )
 
-        # Unir los promedios para graficar las líneas
-        lineas_promedio = promedio_seleccionados.merge(promedio_global, on="Categoría")
+            # Calcular los promedios seleccionados (solo los datos seleccionados)
+            promedio_seleccionados = data_categorias.groupby("Categoría")["Porcentaje"].mean().reset_index(name="Promedio Seleccionados")
 
-        # Graficar las barras de los valores individuales
-        fig_categorias = px.bar(
-            data_categorias,
-            x="Categoría",
-            y="Porcentaje",
-            color=agrupador,
-            barmode="group",
-            title=f"Categorías Económicas por {agrupador} ({year_seleccionado})",
-            color_discrete_map={"Seleccionado": "#636EFA", "Otros": "lightgray"}
-        )
+            # Promedios globales de todos los años (precalculados)
+            promedio_global = (
+                promedios_globales[nivel_analisis].loc[TODOS, categorias_disponibles]
+                .rename_axis("Categoría").reset_index(name="Promedio Global")
+            )
 
-        # Añadir línea para el promedio seleccionado
-        fig_categorias.add_scatter(
-            x=lineas_promedio["Categoría"],
-            y=lineas_promedio["Promedio Seleccionados"],
-            mode="lines+markers",
-            line=dict(color="green", dash="solid"),
-            name="Promedio Seleccionado"
-        )
+            # Unir los promedios para graficar las líneas
+            lineas_promedio = promedio_seleccionados.merge(promedio_global, on="Categoría")
 
-        # Añadir línea para el promedio global
-        fig_categorias.add_scatter(
-            x=lineas_promedio["Categoría"],
-            y=lineas_promedio["Promedio Global"],
-            mode="lines+markers",
-            line=dict(color="red", dash="solid"),
-            name="Promedio Global"
-        )
-
-        # Ajustar diseño
-        fig_categorias.update_layout(
-            showlegend=True,
-            xaxis_title=None,
-            yaxis_title="Porcentaje (%)"
-        )
+        # Graficar las barras de los valores individuales
+        with tramo("dashboard.figura", grafica="categorias"):
+            fig_categorias = px.bar(
+                data_categorias,
+                x="Categoría",
+                y="Porcentaje",
+                color=agrupador,
+                barmode="group",
+                title=f"Categorías Económicas por {agrupador} ({year_seleccionado})",
+                color_discrete_map={"Seleccionado": "#636EFA", "Otros": "lightgray"}
+            )
+
+            # Añadir línea para el promedio seleccionado
+            fig_categorias.add_scatter(
+                x=lineas_promedio["Categoría"],
+                y=lineas_promedio["Promedio Seleccionados"],
+                mode="lines+markers",
+                line=dict(color="green", dash="solid"),
+                name="Promedio Seleccionado"
+            )
+
+            # Añadir línea para el promedio global
+            fig_categorias.add_scatter(
+                x=lineas_promedio["Categoría"],
+                y=lineas_promedio["Promedio Global"],
+                mode="lines+markers",
+                line=dict(color="red", dash="solid"),
+                name="Promedio Global"
+            )
+
+            # Ajustar diseño
+            fig_categorias.update_layout(
+                showlegend=True,
+                xaxis_title=None,
+                yaxis_title="Porcentaje (%)"
+            )
 
         # Mostrar gráfico
-        st.plotly_chart(fig_categorias, use_container_width=True)
+        mostrar_figura(fig_categorias, use_container_width=True)
     else:
         st.warning("No hay datos disponibles para las categorías económicas.")
 
@@ -1,71 +1,132 @@
+import os
+
 import pandas as pd
 import streamlit as st
 
-@st.cache_data
-def load_municipio_data():
-    """Cargar datos de clusters de municipios y convertir ingresos a valores mensuales."""
-    # Cargar los datos
-    data = pd.read_csv('data/processed/resultados_municipales_cluster.csv')
-    
-    # Generar la lista de columnas de deciles del 1 al 10
-    decile_columns = [f"decil_{i}" for i in range(1, 11)]
-    
-    # Agregar la columna de ingreso promedio total a la lista
-    columns_to_convert = decile_columns + ["ingreso_promedio_total"]
-    
-    # Convertir las columnas seleccionadas a valores mensuales
-    data[columns_to_convert] = data[columns_to_convert] / 3
-    
-    # Renombrar las columnas para reflejar que son mensuales
-    #data.rename(columns={col: col for col in columns_to_convert}, inplace=True)
-    
-    return data
-
-@st.cache_data
-def load_estado_data():
-    # Cargar los datos
-    data = pd.read_csv('data/processed/resultados_estatales_merged.csv')
-    
-    # Generar la lista de columnas de deciles del 1 al 10
-    decile_columns = [f"decil_{i}" for i in range(1, 11)]
-    
-    # Agregar la columna de ingreso promedio total a la lista
-    columns_to_convert = decile_columns + ["ingreso_promedio_total"]
-    
-    # Convertir las columnas seleccionadas a valores mensuales
-    data[columns_to_convert] = data[columns_to_convert] / 3
-    return data
-
-@st.cache_data
-def load_nacional_data():
-    """Cargar datos de ENIGH nacionales y ajustar nombres de columnas."""
-    # Cargar datos
-    df = pd.read_csv('data/processed/resultados_nacionales_merged.csv')
-    
-    # Generar la lista de columnas de deciles del 1 al 10
-    decile_columns = [f"decil_{i}" for i in range(1, 11)]
-    
-    # Agregar la columna de ingreso promedio total a la lista
-    columns_to_convert = decile_columns + ["ingreso_promedio_total"]
-    
-    # Convertir las columnas seleccionadas a valores mensuales
-    df[columns_to_convert] = df[columns_to_convert] / 3
-    
-    return df
-
-@st.cache_data
-def load_summary_cluster_data():
-    """Cargar datos de ENIGH nacionales y ajustar nombres de columnas."""
-    # Cargar datos
-    df = pd.read_csv('data/processed/summary_municipales_cluster.csv')
-    
-    # Generar la lista de columnas de deciles del 1 al 10
-    decile_columns = [f"decil_{i}" for i in range(1, 11)]
-    
-    # Agregar la columna de ingreso promedio total a la lista
-    columns_to_convert = decile_columns + ["ingreso_promedio_total"]
-    
-    # Convertir las columnas seleccionadas a valores mensuales
-    df[columns_to_convert] = df[columns_to_convert] / 3
-    
-    return df
+from utils.helpers.schema import GRUPOS_COLUMNAS, PATRON_RESPUESTAS, aplicar_esquema, reporte_memoria
+
+# Directorio con los datos procesados (DASHBOARD_DATOS permite usar otro, p. ej. datos sintéticos)
+DATA_DIR = os.environ.get("DASHBOARD_DATOS") or "data/processed"
+
+# Archivos base (sin extensión) de cada conjunto de datos
+ARCHIVOS = {
+    "municipios": "resultados_municipales_cluster",
+    "estados": "resultados_estatales_merged",
+    "nacional": "resultados_nacionales_merged",
+    "cluster": "summary_municipales_cluster",
+}
+
+# Grupos que usan las secciones del dashboard (ninguna usa las respuestas individuales)
+GRUPOS_DASHBOARD = ("claves", "ingresos", "percepciones")
+
+# Entradas de cada loader en la caché de Streamlit. Los loaders reciben la versión
+# de los datos (ver utils.helpers.registro.version_datos) solo como parte de la
+# clave: cada versión es una entrada nueva y las viejas se desalojan.
+ENTRADAS_CACHE = 8
+
+
+def resolver_columnas(disponibles, grupos=None):
+    """
+    Traduce una lista de grupos de columnas a los nombres presentes en un archivo.
+
+    Parameters:
+    - disponibles (list): Columnas del archivo, en su orden original.
+    - grupos (iterable | None): Grupos de GRUPOS_COLUMNAS o "respuestas". None lee todo.
+
+    Returns:
+    - list | None: Columnas a leer, respetando el orden del archivo.
+    """
+    if grupos is None:
+        return None
+    solicitadas = set()
+    for grupo in grupos:
+        if grupo == "respuestas":
+            solicitadas.update(col for col in disponibles if PATRON_RESPUESTAS.match(col))
+        elif grupo in GRUPOS_COLUMNAS:
+            solicitadas.update(GRUPOS_COLUMNAS[grupo])
+        else:
+            raise ValueError(f"Grupo de columnas desconocido: {grupo}")
+    return [col for col in disponibles if col in solicitadas]
+
+
+def rutas_archivo(nombre, directorio=DATA_DIR):
+    base = os.path.join(directorio, ARCHIVOS[nombre])
+    return base + ".csv", base + ".parquet"
+
+
+def _parquet_vigente(ruta_csv, ruta_parquet):
+    """El Parquet solo se usa si existe y no es más antiguo que su CSV."""
+    if not os.path.exists(ruta_parquet):
+        return False
+    if not os.path.exists(ruta_csv):
+        return True
+    return os.path.getmtime(ruta_parquet) >= os.path.getmtime(ruta_csv)
+
+
+def leer_tabla(nombre, grupos=None, directorio=DATA_DIR):
+    """
+    Lee un conjunto de datos desde Parquet (si está vigente) o desde CSV,
+    cargando solo las columnas de los grupos solicitados.
+    """
+    ruta_csv, ruta_parquet = rutas_archivo(nombre, directorio)
+    if _parquet_vigente(ruta_csv, ruta_parquet):
+        import pyarrow.parquet as pq
+
+        columnas = resolver_columnas(pq.read_schema(ruta_parquet).names, grupos)
+        return pd.read_parquet(ruta_parquet, columns=columnas)
+
+    columnas = resolver_columnas(list(pd.read_csv(ruta_csv, nrows=0).columns), grupos)
+    return pd.read_csv(ruta_csv, usecols=columnas)
+
+
+def convertir_a_parquet(directorio=DATA_DIR):
+    """
+    Convierte todos los CSV de `directorio` a Parquet (zstd) junto al archivo original.
+    Los valores se guardan sin transformar; el esquema compacto lo aplican los loaders.
+
+    Returns:
+    - list: Rutas de los archivos Parquet escritos.
+    """
+    escritos = []
+    for archivo in sorted(os.listdir(directorio)):
+        if not archivo.endswith(".csv"):
+            continue
+        ruta_csv = os.path.join(directorio, archivo)
+        ruta_parquet = ruta_csv[:-len(".csv")] + ".parquet"
+        pd.read_csv(ruta_csv).to_parquet(ruta_parquet, engine="pyarrow", compression="zstd", index=False)
+        escritos.append(ruta_parquet)
+    return escritos
+
+
+@st.cache_data(max_entries=ENTRADAS_CACHE)
+def load_municipio_data(grupos=None, version=None):
+    """Cargar datos de clusters de municipios con el esquema compacto (ingresos mensuales)."""
+    return aplicar_esquema(leer_tabla("municipios", grupos))
+
+@st.cache_data(max_entries=ENTRADAS_CACHE)
+def load_estado_data(grupos=None, version=None):
+    """Cargar datos estatales con el esquema compacto (ingresos mensuales)."""
+    return aplicar_esquema(leer_tabla("estados", grupos))
+
+@st.cache_data(max_entries=ENTRADAS_CACHE)
+def load_nacional_data(grupos=None, version=None):
+    """Cargar datos de ENIGH nacionales con el esquema compacto (ingresos mensuales)."""
+    return aplicar_esquema(leer_tabla("nacional", grupos))
+
+@st.cache_data(max_entries=ENTRADAS_CACHE)
+def load_summary_cluster_data(grupos=None, version=None):
+    """Cargar el resumen por clúster con el esquema compacto (ingresos mensuales)."""
+    return aplicar_esquema(leer_tabla("cluster", grupos))
+
+if __name__ == "__main__":
+    # python -m utils.helpers.data_loader  ->  genera los Parquet de data/processed
+    for ruta in convertir_a_parquet():
+        print(f"Escrito {ruta}")
+
+    # Memoria por conjunto de datos con las columnas que usa el dashboard
+    print(reporte_memoria({
+        "municipios": load_municipio_data(GRUPOS_DASHBOARD),
+        "estados": load_estado_data(GRUPOS_DASHBOARD),
+        "nacional": load_nacional_data(GRUPOS_DASHBOARD),
+        "cluster": load_summary_cluster_data(GRUPOS_DASHBOARD),
+    }))
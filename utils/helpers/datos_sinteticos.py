@@ -0,0 +1,352 @@
+"""
+Generador de datos sintéticos a escala con el mismo esquema que data/processed.
+
+Escribe versiones sintéticas de los cuatro CSV que usa la aplicación
+(municipios, estados, nacional y resumen por clúster) con el número de
+municipios y de años que se pida, para probar carga, filtros y gráficas a
+cobertura nacional antes de tener los datos reales.
+
+Los municipios se reparten entre los estados según su número real (Censo 2020;
+con el total predeterminado, el mismo número que en el país) y los nuevos toman
+claves libres de su estado entre 1 y 999, como en ubica_geo.
+
+Cada municipio sintético parte de un municipio real de su estado (plantilla) y
+se perturba de forma coherente:
+- Deciles: factor de nivel propio del municipio, ruido por año, crecimiento
+  nominal para los años fuera de los datos reales y un ligero cambio de pendiente
+  (más o menos desigualdad). El GINI se recalcula desde los deciles conservando
+  la diferencia de la plantilla entre su GINI y el de sus deciles, y
+  ingreso_promedio_total es el promedio de los deciles, como en los datos reales.
+- Respuestas: proporciones de Dirichlet alrededor de las de la plantilla, de
+  modo que cada pregunta sigue sumando 100 y las respuestas sin casos siguen vacías.
+- Índices de percepción: valor de la plantilla con ruido, acotado a [0, 100].
+
+Estados y nación se agregan desde los municipios sintéticos (promedio de las
+medidas y GINI agregado de los deciles) y el resumen por clúster es el promedio
+por clúster de los municipios, igual que el archivo real.
+
+Con --hogares también se escriben microdatos de hogares tipo ENIGH
+(hogares_{año}.csv: ubica_geo, factor, ing_cor) para cada municipio sintético,
+con ingresos lognormales que reproducen su ingreso promedio y su GINI, para
+probar la ingesta de utils.helpers.microdatos.
+
+Uso:
+    python -m utils.helpers.datos_sinteticos --destino /tmp/escala
+    python -m utils.helpers.datos_sinteticos --destino /tmp/escala --hogares 400
+    python -m utils.helpers.datos_sinteticos --destino /tmp/escala --municipios 2469 --years 2016 2018 2020 2022 2024
+    DASHBOARD_DATOS=/tmp/escala streamlit run main.py
+"""
+import argparse
+import os
+import sys
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from utils.helpers.agrupamiento import resumen_por_cluster
+from utils.helpers.data_loader import ARCHIVOS, DATA_DIR, rutas_archivo
+from utils.helpers.desigualdad import gini_agregado
+from utils.helpers.microdatos import ENTIDADES
+from utils.helpers.schema import DECILES, GRUPOS_COLUMNAS, PATRON_RESPUESTAS
+
+# Municipios de cada entidad (clave INEGI) según el Censo de Población y Vivienda 2020
+MUNICIPIOS_POR_ENTIDAD = {
+    1: 11, 2: 5, 3: 5, 4: 13, 5: 38, 6: 10, 7: 124, 8: 67,
+    9: 16, 10: 39, 11: 46, 12: 81, 13: 84, 14: 125, 15: 125, 16: 113,
+    17: 36, 18: 20, 19: 51, 20: 570, 21: 217, 22: 18, 23: 11, 24: 58,
+    25: 18, 26: 72, 27: 17, 28: 43, 29: 60, 30: 212, 31: 106, 32: 58,
+}
+
+# Municipios de México (cobertura nacional)
+MUNICIPIOS_NACIONAL = sum(MUNICIPIOS_POR_ENTIDAD.values())
+
+# Clave de municipio más alta: ubica_geo usa tres dígitos para el municipio
+CLAVE_MAXIMA = 999
+
+# Crecimiento nominal anual de los ingresos para años fuera de los datos reales
+CRECIMIENTO_ANUAL = 0.04
+
+# Dispersión de las perturbaciones
+DISPERSION_NIVEL = 0.15
+DISPERSION_YEAR = 0.05
+DISPERSION_PENDIENTE = 0.05
+DISPERSION_INDICES = 0.10
+CONCENTRACION_RESPUESTAS = 200
+
+_INDICES = GRUPOS_COLUMNAS["percepciones"]
+
+
+def _leer_plantillas(origen):
+    return {nombre: pd.read_csv(rutas_archivo(nombre, origen)[0]) for nombre in ARCHIVOS}
+
+
+def _repartir(total, pesos):
+    """
+    Reparte `total` en enteros proporcionales a `pesos` (restos mayores, al menos 1
+    por elemento); si `total` es la suma de `pesos`, devuelve `pesos`.
+    """
+    pesos = np.asarray(pesos, dtype=np.float64)
+    if total < len(pesos):
+        raise ValueError(f"Se necesitan al menos {len(pesos)} municipios (uno por estado).")
+    cuotas = total * pesos / pesos.sum()
+    enteros = np.floor(cuotas).astype(int)
+    faltantes = total - enteros.sum()
+    enteros[np.argsort(enteros - cuotas, kind="stable")[:faltantes]] += 1
+    # Los elementos sin municipios toman uno de los que más tienen
+    for vacio in np.flatnonzero(enteros == 0):
+        enteros[enteros.argmax()] -= 1
+        enteros[vacio] = 1
+    return enteros
+
+
+def _catalogo(plantilla, total, rng):
+    """
+    Municipios sintéticos: estado, nombre, clave, región, clúster y municipio plantilla.
+
+    El total se reparte entre los estados en proporción a su número real de
+    municipios (MUNICIPIOS_POR_ENTIDAD; con el total nacional, exactamente ese
+    número). Se conservan los municipios reales de cada estado y se completan con
+    nuevos, que toman las claves libres del estado entre 1 y CLAVE_MAXIMA.
+    """
+    reales = plantilla.drop_duplicates(["estado", "municipio"])
+    estados = reales["estado"].drop_duplicates().sort_values().to_numpy()
+    claves_entidad = {nombre: clave for clave, nombre in ENTIDADES.items()}
+    # Los estados fuera del catálogo del INEGI pesan lo que pesan en la plantilla
+    muestra = reales.groupby("estado").size()
+    cuentas = _repartir(total, [MUNICIPIOS_POR_ENTIDAD.get(claves_entidad.get(estado), muestra[estado]) for estado in estados])
+
+    filas = []
+    for estado, cuenta in zip(estados, cuentas):
+        del_estado = reales[reales["estado"] == estado]
+        if cuenta > CLAVE_MAXIMA:
+            raise ValueError(
+                f"{estado} necesitaría {cuenta} municipios, pero las claves de municipio van de 1 a {CLAVE_MAXIMA}; "
+                "pide menos municipios."
+            )
+        usadas = set(del_estado["municipio"].astype(int))
+        libres = iter(clave for clave in range(1, CLAVE_MAXIMA + 1) if clave not in usadas)
+        for k in range(cuenta):
+            if k < len(del_estado):
+                base = del_estado.iloc[k]
+                nombre, clave = base["nombre_municipio"], int(base["municipio"])
+            else:
+                base = del_estado.iloc[rng.integers(len(del_estado))]
+                clave = next(libres)
+                nombre = f"Municipio Sintético {clave}"
+            filas.append({
+                "estado": estado,
+                "nombre_municipio": nombre,
+                "municipio": clave,
+                "Region": base["Region"],
+                "Cluster": int(base["Cluster"]),
+                "plantilla": (estado, int(base["municipio"])),
+            })
+    return pd.DataFrame(filas)
+
+
+def _filas_plantilla(plantilla, catalogo, years):
+    """
+    Fila de la plantilla para cada municipio × año (el año real más cercano del
+    municipio plantilla) y años de diferencia con ese año.
+    """
+    por_municipio = {clave: grupo for clave, grupo in plantilla.groupby(["estado", "municipio"])}
+    posiciones, diferencias = [], []
+    for clave in catalogo["plantilla"]:
+        grupo = por_municipio[clave]
+        disponibles = grupo["year"].to_numpy()
+        for year in years:
+            cercano = np.abs(disponibles - year).argmin()
+            posiciones.append(grupo.index[cercano])
+            diferencias.append(year - disponibles[cercano])
+    return plantilla.loc[posiciones].reset_index(drop=True), np.array(diferencias)
+
+
+def _respuestas(base, rng):
+    """Proporciones de Dirichlet alrededor de las de la plantilla, pregunta por pregunta."""
+    columnas = [col for col in base.columns if PATRON_RESPUESTAS.match(col)]
+    resultado = pd.DataFrame(index=base.index)
+    for pregunta in dict.fromkeys(col.split("_")[0] for col in columnas):
+        grupo = [col for col in columnas if col.split("_")[0] == pregunta]
+        proporciones = base[grupo].fillna(0).to_numpy() / 100
+        presentes = proporciones > 0
+        muestras = np.where(presentes, rng.gamma(np.where(presentes, CONCENTRACION_RESPUESTAS * proporciones, 1.0)), 0.0)
+        totales = muestras.sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            porcentajes = 100 * muestras / totales
+        resultado[grupo] = np.where(presentes, porcentajes, np.nan)
+    return resultado
+
+
+def generar_municipios(plantilla, total=MUNICIPIOS_NACIONAL, years=None, semilla=0):
+    """
+    Municipios sintéticos con el esquema de resultados_municipales_cluster.csv.
+
+    Parameters:
+    - plantilla (pd.DataFrame): resultados_municipales_cluster.csv real (sin aplicar esquema).
+    - total (int): Número de municipios.
+    - years (list | None): Años a generar (por defecto, los de la plantilla).
+    - semilla (int): Semilla del generador aleatorio.
+
+    Returns:
+    - pd.DataFrame: Una fila por municipio × año, con las columnas de la plantilla.
+    """
+    rng = np.random.default_rng(semilla)
+    plantilla = plantilla.drop(columns=["Unnamed: 0"], errors="ignore")
+    years = sorted(int(year) for year in (years or plantilla["year"].unique()))
+    catalogo = _catalogo(plantilla, total, rng)
+    base, diferencias = _filas_plantilla(plantilla, catalogo, years)
+    filas = len(base)
+
+    data = base.copy()
+    data["year"] = np.tile(years, len(catalogo))
+    for col in ("estado", "nombre_municipio", "municipio", "Region", "Cluster"):
+        data[col] = np.repeat(catalogo[col].to_numpy(), len(years))
+
+    # Deciles: nivel del municipio, ruido del año, crecimiento y pendiente
+    deciles = base[DECILES].to_numpy(dtype=np.float64)
+    nivel = np.repeat(rng.lognormal(0, DISPERSION_NIVEL, len(catalogo)), len(years))
+    ruido = rng.lognormal(0, DISPERSION_YEAR, filas)
+    crecimiento = (1 + CRECIMIENTO_ANUAL) ** diferencias
+    pendiente = rng.normal(0, DISPERSION_PENDIENTE, filas)[:, None] * np.linspace(-1, 1, len(DECILES))
+    nuevos = np.sort(deciles * (nivel * ruido * crecimiento)[:, None] * np.exp(pendiente), axis=1)
+    data[DECILES] = nuevos
+
+    # GINI: el de los deciles nuevos más la diferencia de la plantilla
+    filas_individuales = [np.array([i]) for i in range(filas)]
+    sesgo = base["gini"].to_numpy() - gini_agregado(deciles, filas_individuales)
+    data["gini"] = gini_agregado(nuevos, filas_individuales) + sesgo
+    if "ingreso_promedio_total" in data.columns:
+        data["ingreso_promedio_total"] = nuevos.mean(axis=1)
+
+    respuestas = _respuestas(base, rng)
+    data[respuestas.columns] = respuestas
+    indices = [col for col in _INDICES if col in data.columns]
+    data[indices] = np.clip(base[indices].to_numpy() * rng.lognormal(0, DISPERSION_INDICES, (filas, len(indices))), 0, 100)
+
+    data = data.sort_values(["year", "estado", "municipio"], kind="stable").reset_index(drop=True)
+    return data[list(plantilla.columns)]
+
+
+def _agregar(data, claves, columnas):
+    """
+    Promedio de las medidas por grupo y GINI agregado de los deciles de cada grupo.
+    Las respuestas vacías cuentan como 0 % para que cada pregunta siga sumando 100.
+    """
+    medidas = [col for col in columnas if col not in claves and col != "gini"]
+    respuestas = [col for col in medidas if PATRON_RESPUESTAS.match(col)]
+    valores = data[claves + medidas].copy()
+    valores[respuestas] = valores[respuestas].fillna(0)
+
+    grupos = valores.groupby(claves, sort=True)
+    resultado = grupos[medidas].mean()
+    resultado[respuestas] = resultado[respuestas].replace(0, np.nan)
+    if "gini" in columnas:
+        posiciones = [grupos.indices[clave] for clave in resultado.index]
+        resultado["gini"] = gini_agregado(data[DECILES].to_numpy(), posiciones)
+    return resultado.reset_index()[columnas]
+
+
+def generar_estados(municipios, plantilla):
+    """Estados sintéticos (esquema de resultados_estatales_merged.csv) agregados de los municipios."""
+    return _agregar(municipios, ["year", "estado"], list(plantilla.columns))
+
+
+def generar_nacional(estados, plantilla):
+    """Nación sintética (esquema de resultados_nacionales_merged.csv) agregada de los estados."""
+    return _agregar(estados, ["year"], list(plantilla.columns))
+
+
+def generar_resumen_clusters(municipios, plantilla):
+    """Resumen por clúster (esquema de summary_municipales_cluster.csv): promedio de los municipios."""
+    return resumen_por_cluster(municipios, plantilla.columns)
+
+
+def generar_hogares(municipios, ruta, hogares_por_municipio, semilla=0, municipios_por_bloque=200):
+    """
+    Escribe microdatos de hogares tipo ENIGH para las filas de `municipios` (un año).
+
+    Los ingresos (trimestrales, como ing_cor) son lognormales con el ingreso
+    promedio y el GINI de cada municipio; los factores de expansión son uniformes.
+    Se escriben por bloques de municipios para no tener todo el archivo en memoria.
+
+    Returns:
+    - int: Número de hogares escritos.
+    """
+    rng = np.random.default_rng(semilla)
+    claves_entidad = {nombre: clave for clave, nombre in ENTIDADES.items()}
+    normal = NormalDist()
+    escritos = 0
+    with open(ruta, "w") as archivo:
+        for inicio in range(0, len(municipios), municipios_por_bloque):
+            bloque = municipios.iloc[inicio:inicio + municipios_por_bloque]
+            # Lognormal: GINI = 2 Φ(σ / √2) - 1 y media = exp(μ + σ² / 2)
+            gini = np.clip(bloque["gini"].to_numpy(), 0.01, 0.95)
+            sigma = np.sqrt(2) * np.array([normal.inv_cdf((g + 1) / 2) for g in gini])
+            mu = np.log(bloque["ingreso_promedio_total"].to_numpy()) - sigma**2 / 2
+            ubicacion = np.array([
+                claves_entidad[estado] * 1000 + int(municipio)
+                for estado, municipio in zip(bloque["estado"], bloque["municipio"])
+            ])
+
+            cuantos = len(bloque) * hogares_por_municipio
+            hogares = pd.DataFrame({
+                "folioviv": np.arange(escritos, escritos + cuantos) + 1,
+                "foliohog": 1,
+                "ubica_geo": [f"{clave:05d}" for clave in np.repeat(ubicacion, hogares_por_municipio)],
+                "factor": rng.integers(50, 500, cuantos),
+                "ing_cor": rng.lognormal(np.repeat(mu, hogares_por_municipio), np.repeat(sigma, hogares_por_municipio)),
+            })
+            hogares.to_csv(archivo, index=False, header=escritos == 0)
+            escritos += cuantos
+    return escritos
+
+
+def generar(destino, total=MUNICIPIOS_NACIONAL, years=None, semilla=0, origen=DATA_DIR, hogares=0):
+    """
+    Genera y escribe los cuatro conjuntos de datos sintéticos en `destino`.
+
+    Returns:
+    - dict: Nombre del conjunto de datos -> número de filas escritas.
+    """
+    plantillas = _leer_plantillas(origen)
+    municipios = generar_municipios(plantillas["municipios"], total, years, semilla)
+    estados = generar_estados(municipios, plantillas["estados"])
+    conjuntos = {
+        "municipios": municipios,
+        "estados": estados,
+        "nacional": generar_nacional(estados, plantillas["nacional"]),
+        "cluster": generar_resumen_clusters(municipios, plantillas["cluster"]),
+    }
+
+    os.makedirs(destino, exist_ok=True)
+    for nombre, data in conjuntos.items():
+        # El archivo municipal real incluye el índice como primera columna sin nombre
+        data.to_csv(rutas_archivo(nombre, destino)[0], index=nombre == "municipios")
+    filas = {nombre: len(data) for nombre, data in conjuntos.items()}
+
+    if hogares:
+        for year, municipios_year in municipios.groupby("year"):
+            ruta = os.path.join(destino, f"hogares_{year}.csv")
+            filas[f"hogares_{year}"] = generar_hogares(municipios_year, ruta, hogares, semilla + int(year))
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos con el esquema de data/processed.")
+    parser.add_argument("--destino", required=True, help="Directorio donde se escriben los CSV.")
+    parser.add_argument("--municipios", type=int, default=MUNICIPIOS_NACIONAL, help="Número de municipios.")
+    parser.add_argument("--years", type=int, nargs="*", help="Años a generar (por defecto, los de los datos reales).")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del generador aleatorio.")
+    parser.add_argument("--origen", default=DATA_DIR, help="Directorio con los CSV reales que sirven de plantilla.")
+    parser.add_argument("--hogares", type=int, default=0, help="Hogares por municipio en los microdatos (0 = no generar).")
+    args = parser.parse_args(argv)
+
+    filas = generar(args.destino, args.municipios, args.years, args.semilla, args.origen, args.hogares)
+    for nombre, cuenta in filas.items():
+        print(f"{ARCHIVOS.get(nombre, nombre):<36}{cuenta} filas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Motor vectorizado del GINI agregado a partir de los deciles.
+
+Cada fila (municipio o estado) aporta sus diez deciles como diez grupos del mismo
+tamaño (peso de la fila / 10) con su ingreso promedio. El GINI agregado de un
+conjunto de filas se calcula sobre la curva de Lorenz de todos esos puntos juntos,
+es decir, es el GINI de la población combinada y no el promedio de los GINI.
+Como no hay dispersión dentro de cada decil es una cota inferior del GINI de
+microdatos (con los datos actuales, la diferencia media por municipio es ~0.0043).
+
+Todas las funciones reciben muchos grupos (posiciones de filas, que pueden
+repetirse entre grupos) y los resuelven en una sola pasada ordenada.
+"""
+import numpy as np
+
+
+def grupos_por_etiqueta(etiquetas):
+    """
+    Posiciones de las filas de cada etiqueta.
+
+    Returns:
+    - tuple: (etiquetas únicas, lista de arrays de posiciones).
+    """
+    etiquetas = np.asarray(etiquetas)
+    claves, inversa = np.unique(etiquetas, return_inverse=True)
+    orden = np.argsort(inversa, kind="stable")
+    cortes = np.cumsum(np.bincount(inversa, minlength=len(claves)))[:-1]
+    return claves, np.split(orden, cortes)
+
+
+def _puntos(deciles, grupos, pesos):
+    """
+    Puntos (ingreso, peso, grupo) de todos los grupos, ordenados por grupo e ingreso.
+    Los deciles con NaN se descartan.
+    """
+    deciles = np.asarray(deciles, dtype=np.float64)
+    if deciles.ndim != 2:
+        raise ValueError("deciles debe ser una matriz (filas, deciles).")
+    n, k = deciles.shape
+    pesos = np.ones(n) if pesos is None else np.asarray(pesos, dtype=np.float64)
+
+    grupos = [np.asarray(grupo, dtype=np.intp) for grupo in grupos]
+    tamanos = np.array([len(grupo) for grupo in grupos], dtype=np.intp)
+    filas = np.concatenate(grupos) if grupos else np.empty(0, dtype=np.intp)
+
+    valores = deciles[filas].ravel()
+    peso = np.repeat(pesos[filas] / k, k)
+    grupo = np.repeat(np.repeat(np.arange(len(grupos)), tamanos), k)
+
+    validos = ~np.isnan(valores)
+    valores, peso, grupo = valores[validos], peso[validos], grupo[validos]
+    orden = np.lexsort((valores, grupo))
+    return valores[orden], peso[orden], grupo[orden]
+
+
+def _acumulados(valores, peso, grupo, total_grupos):
+    """Ingreso acumulado dentro de cada grupo, como proporción del total del grupo."""
+    ingreso = valores * peso
+    poblacion_total = np.bincount(grupo, peso, minlength=total_grupos)
+    ingreso_total = np.bincount(grupo, ingreso, minlength=total_grupos)
+
+    # Sumas acumuladas globales menos lo acumulado antes del inicio de cada grupo
+    inicios = np.searchsorted(grupo, np.arange(total_grupos))
+    acum_ingreso = np.cumsum(ingreso)
+    previo_ingreso = np.concatenate(([0.0], acum_ingreso))[inicios]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lorenz = (acum_ingreso - previo_ingreso[grupo]) / ingreso_total[grupo]
+        participacion = ingreso / ingreso_total[grupo]
+    return lorenz, participacion, poblacion_total
+
+
+def gini_agregado(deciles, grupos, pesos=None):
+    """
+    GINI agregado de cada grupo de filas.
+
+    Parameters:
+    - deciles (array): Matriz (filas, deciles) de ingresos promedio por decil.
+    - grupos (list): Arrays de posiciones de filas, uno por grupo.
+    - pesos (array | None): Peso (población) de cada fila; por defecto, iguales.
+
+    Returns:
+    - np.ndarray: GINI de cada grupo (NaN para grupos vacíos).
+    """
+    total_grupos = len(grupos)
+    valores, peso, grupo = _puntos(deciles, grupos, pesos)
+    lorenz, participacion, poblacion_total = _acumulados(valores, peso, grupo, total_grupos)
+
+    # Regla del trapecio: G = 1 - sum(Δp * (L_i + L_{i-1})), con L_{i-1} = L_i - participación_i
+    with np.errstate(invalid="ignore", divide="ignore"):
+        delta_p = peso / poblacion_total[grupo]
+        area = np.bincount(grupo, delta_p * (2 * lorenz - participacion), minlength=total_grupos)
+    # Sin puntos válidos bincount devuelve enteros; NaN necesita flotantes
+    gini = 1.0 - area.astype(np.float64)
+    gini[poblacion_total == 0] = np.nan
+    return gini
+
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+
+
+def normalizar_clave(texto):
+    """Normaliza un nombre de estado o municipio para usarlo como clave de búsqueda."""
+    return str(texto).strip().upper()
+
+
+class IndiceMunicipios:
+    """
+    Índice construido una sola vez al cargar los datos municipales.
+
+    Resuelve en O(1) la fila de un municipio para un año y las filas de cada
+    clúster y año, sin recorrer el DataFrame completo en cada rerun.
+    Las posiciones son posicionales (para usar con `.iloc`).
+    """
+
+    def __init__(self, data):
+        estados = data["estado"].astype(str).str.strip().str.upper().to_numpy()
+        municipios = data["nombre_municipio"].astype(str).str.strip().str.upper().to_numpy()
+        years = data["year"].to_numpy()
+        clusters = data["Cluster"].to_numpy()
+
+        # (ESTADO, MUNICIPIO, año) -> (posición, clúster); se conserva la primera coincidencia
+        self._filas = {}
+        for posicion, clave in enumerate(zip(estados, municipios, years.tolist(), clusters.tolist())):
+            estado, municipio, year, cluster = clave
+            self._filas.setdefault((estado, municipio, year), (posicion, cluster))
+
+        # (clúster, año) -> posiciones de sus municipios
+        self._miembros = {
+            (int(cluster), int(year)): np.flatnonzero((clusters == cluster) & (years == year))
+            for cluster, year in set(zip(clusters.tolist(), years.tolist()))
+        }
+
+        # año -> posiciones de todos los municipios de ese año
+        self._por_year = {int(year): np.flatnonzero(years == year) for year in np.unique(years)}
+
+    def __len__(self):
+        return len(self._filas)
+
+    def buscar(self, estado, municipio, year):
+        """
+        Busca un municipio.
+
+        Returns:
+        - tuple | None: (posición, clúster) o None si no hay datos para ese año.
+        """
+        return self._filas.get((normalizar_clave(estado), normalizar_clave(municipio), int(year)))
+
+    def miembros_cluster(self, cluster, year):
+        """Posiciones de los municipios de un clúster en un año."""
+        return self._miembros.get((int(cluster), int(year)), np.empty(0, dtype=np.intp))
+
+    def filas_year(self, year):
+        """Posiciones de todos los municipios de un año."""
+        return self._por_year.get(int(year), np.empty(0, dtype=np.intp))
+
+
+def _bitset(posiciones, total):
+    """Bitset empaquetado (un bit por fila) con las posiciones indicadas."""
+    mascara = np.zeros(total, dtype=bool)
+    mascara[posiciones] = True
+    return np.packbits(mascara)
+
+
+class IndiceVista:
+    """
+    Índice de bitsets de una vista del dashboard.
+
+    Para cada valor de Estado, Municipio, Año y Cluster (las columnas que existan
+    en la vista) guarda un bitset empaquetado con sus filas. Un filtro combina con
+    OR los valores seleccionados de una misma columna y con AND las columnas entre
+    sí, sin recorrer la vista. Las opciones en cascada (municipios de los estados
+    seleccionados) también salen del índice. Las posiciones se devuelven ordenadas,
+    así que conservan el orden de la vista.
+
+    También guarda, calculado la primera vez que se pide, el orden de toda la vista
+    por cada columna y el rango de cada fila en ese orden: ordenar una selección
+    es ordenar los rangos de sus filas, con costo que depende solo de la selección.
+    """
+
+    COLUMNAS = ("Estado", "Municipio", "Año", "Cluster")
+
+    def __init__(self, vista):
+        self._vista = vista
+        self._total = len(vista)
+        self._ordenes = {}
+        self._rangos = {}
+        self.estados = vista["Estado"].unique()
+        self.years = sorted(int(year) for year in vista["Año"].unique())
+        self._bitsets = {
+            columna: {
+                valor: _bitset(posiciones, self._total)
+                for valor, posiciones in vista.groupby(columna, observed=True).indices.items()
+            }
+            for columna in self.COLUMNAS
+            if columna in vista.columns
+        }
+
+        # Estado -> municipios con la posición de su primera fila en la vista
+        self._municipios = {}
+        if "Municipio" in vista.columns:
+            primeras = vista[["Estado", "Municipio"]].reset_index(drop=True).drop_duplicates()
+            for estado, grupo in primeras.groupby("Estado", observed=True):
+                self._municipios[estado] = (grupo.index.to_numpy(), grupo["Municipio"].to_numpy())
+
+    def bitset(self, columna, valores):
+        """OR de los bitsets de los valores de una columna (los valores desconocidos se ignoran)."""
+        resultado = np.zeros((self._total + 7) // 8, dtype=np.uint8)
+        bitsets = self._bitsets[columna]
+        for valor in valores:
+            if valor in bitsets:
+                resultado |= bitsets[valor]
+        return resultado
+
+    def seleccionar(self, filtros):
+        """
+        Posiciones de las filas que cumplen todos los filtros.
+
+        Parameters:
+        - filtros (dict): Columna -> valores aceptados (None = sin restricción).
+
+        Returns:
+        - np.ndarray: Posiciones ordenadas.
+        """
+        resultado = np.full((self._total + 7) // 8, 0xFF, dtype=np.uint8)
+        for columna, valores in filtros.items():
+            if valores is not None:
+                resultado &= self.bitset(columna, valores)
+        return np.flatnonzero(np.unpackbits(resultado, count=self._total))
+
+    def filas_estados(self, estados):
+        """Posiciones de las filas de los estados seleccionados (todos los años)."""
+        return self.seleccionar({"Estado": estados})
+
+    def municipios(self, estados):
+        """Municipios de los estados seleccionados, en el orden de la vista."""
+        grupos = [self._municipios[estado] for estado in estados if estado in self._municipios]
+        if not grupos:
+            return np.empty(0, dtype=object)
+        posiciones = np.concatenate([grupo[0] for grupo in grupos])
+        nombres = np.concatenate([grupo[1] for grupo in grupos])
+        return pd.unique(nombres[np.argsort(posiciones, kind="stable")])
+
+    def filas(self, estados, year, municipios=None):
+        """
+        Posiciones de las filas de los estados seleccionados en un año, opcionalmente
+        restringidas a los municipios seleccionados.
+        """
+        return self.seleccionar({"Estado": estados, "Año": [int(year)], "Municipio": municipios})
+
+    def orden(self, columna, descendente=False):
+        """Posiciones de toda la vista ordenada por una columna (los NaN van al final)."""
+        clave = (columna, descendente)
+        if clave not in self._ordenes:
+            self._ordenes[clave] = (
+                self._vista[columna]
+                .reset_index(drop=True)
+                .sort_values(ascending=not descendente, kind="stable", na_position="last")
+                .index.to_numpy()
+            )
+        return self._ordenes[clave]
+
+    def rango(self, columna, descendente=False):
+        """Posición de cada fila de la vista en `orden(columna, descendente)` (los NaN, al final)."""
+        clave = (columna, descendente)
+        if clave not in self._rangos:
+            orden = self.orden(columna, descendente)
+            rango = np.empty(self._total, dtype=np.intp)
+            rango[orden] = np.arange(self._total)
+            self._rangos[clave] = rango
+        return self._rangos[clave]
+
+    def ordenar(self, filas, columna=None, descendente=False):
+        """
+        Posiciones `filas` en el orden de una columna (sin columna, en el orden de
+        la vista). Los rangos son únicos, así que el resultado es el mismo que
+        recorrer el orden de toda la vista, con costo O(k log k) para k filas.
+        """
+        if columna is None:
+            return filas
+        filas = np.asarray(filas)
+        return filas[np.argsort(self.rango(columna, descendente)[filas], kind="stable")]
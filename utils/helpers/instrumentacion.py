@@ -0,0 +1,138 @@
+"""
+Tramos de tiempo del rerun (carga de datos, filtrado, agregación, construcción de
+figuras y serialización con st.plotly_chart).
+
+Se activa con la variable de entorno DASHBOARD_PERFIL=1. Cada rerun emite una
+línea JSON en el logger "dashboard.perfil" y, en la barra lateral, un panel para
+desarrolladores con los tramos. Desactivado, `medir` devuelve la función original
+y `tramo` un contexto nulo compartido, así que el costo es prácticamente cero.
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+import streamlit as st
+
+VARIABLE_ENTORNO = "DASHBOARD_PERFIL"
+HABILITADO = os.environ.get(VARIABLE_ENTORNO, "").strip().lower() in ("1", "true", "si", "sí")
+
+logger = logging.getLogger("dashboard.perfil")
+if HABILITADO and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Cada sesión ejecuta su script en su propio hilo
+_local = threading.local()
+_NULO = contextlib.nullcontext()
+
+
+class _Tramo:
+    __slots__ = ("nombre", "atributos", "inicio")
+
+    def __init__(self, nombre, atributos):
+        self.nombre = nombre
+        self.atributos = atributos
+
+    def __enter__(self):
+        _local.nivel = getattr(_local, "nivel", 0) + 1
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        fin = time.perf_counter()
+        _local.nivel -= 1
+        origen = getattr(_local, "origen", self.inicio)
+        registro = {
+            "tramo": self.nombre,
+            "inicio_ms": round((self.inicio - origen) * 1000, 3),
+            "ms": round((fin - self.inicio) * 1000, 3),
+            "nivel": _local.nivel,
+        }
+        if self.atributos:
+            registro.update(self.atributos)
+        if not hasattr(_local, "tramos"):
+            _local.tramos = []
+        _local.tramos.append(registro)
+        return False
+
+
+def tramo(nombre, **atributos):
+    """Contexto que mide un tramo del rerun (no hace nada si el perfil está desactivado)."""
+    if not HABILITADO:
+        return _NULO
+    return _Tramo(nombre, atributos)
+
+
+def medir(nombre=None):
+    """Decorador que mide cada llamada a la función como un tramo."""
+    def decorador(funcion):
+        if not HABILITADO:
+            return funcion
+        etiqueta = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with _Tramo(etiqueta, None):
+                return funcion(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
+
+
+def mostrar_figura(fig, **kwargs):
+    """st.plotly_chart dentro de un tramo (la serialización de la figura ocurre aquí)."""
+    with tramo("st.plotly_chart"):
+        st.plotly_chart(fig, **kwargs)
+
+
+def iniciar_rerun():
+    """Reinicia los tramos del hilo actual al comenzar un rerun."""
+    if HABILITADO:
+        _local.tramos = []
+        _local.nivel = 0
+        _local.origen = time.perf_counter()
+
+
+def finalizar_rerun(**contexto):
+    """
+    Cierra el rerun: emite una línea JSON con todos los tramos.
+
+    Returns:
+    - list: Tramos del rerun ordenados por inicio (vacía si el perfil está desactivado).
+    """
+    if not HABILITADO:
+        return []
+    tramos = sorted(getattr(_local, "tramos", []), key=lambda registro: registro["inicio_ms"])
+    total_ms = (time.perf_counter() - getattr(_local, "origen", time.perf_counter())) * 1000
+    logger.info(json.dumps(
+        {"evento": "rerun", "total_ms": round(total_ms, 3), **contexto, "tramos": tramos},
+        ensure_ascii=False,
+    ))
+    _local.tramos = []
+    return tramos
+
+
+def mostrar_panel(tramos):
+    """Panel para desarrolladores en la barra lateral con los tramos del último rerun."""
+    if not HABILITADO:
+        return
+    from utils.helpers.cache_figuras import CACHE_FIGURAS
+
+    with st.sidebar.expander("⏱️ Perfil del rerun", expanded=False):
+        st.dataframe(
+            [{"tramo": "  " * t["nivel"] + t["tramo"], "inicio (ms)": t["inicio_ms"], "ms": t["ms"]} for t in tramos],
+            hide_index=True,
+        )
+        estadisticas = CACHE_FIGURAS.estadisticas()
+        st.caption(
+            f"Caché de figuras: {estadisticas['entradas']} entradas, "
+            f"{estadisticas['bytes'] / 2**20:.1f} MB, aciertos {estadisticas['tasa_aciertos']:.0%}"
+        )
@@ -0,0 +1,275 @@
+"""
+Ingesta en streaming de microdatos de hogares (tipo ENIGH, concentradohogar).
+
+Lee los archivos por bloques y acumula, para cada municipio, un histograma
+ponderado (factor de expansión) del ingreso corriente del hogar sobre bordes
+logarítmicos fijos (los de utils.helpers.cuantiles): en cada bin se guardan la
+población y el ingreso total exactos. La memoria depende solo del número de municipios y de bins, no del
+tamaño de los archivos. Los histogramas se suman para obtener estados y nación.
+
+Con los histogramas se calculan, por grupo:
+- Deciles de hogares: ingreso promedio de cada décimo de la población ordenada
+  por ingreso (los bins que cruzan un corte se reparten en proporción).
+- Ingreso promedio total y GINI (curva de Lorenz por bins).
+Dentro de un bin se supone que todos los hogares tienen el ingreso promedio del
+bin, así que el error relativo queda acotado por el ancho de los bins
+(cuantiles.RAZON_BINS).
+
+Los resultados usan las columnas de data/processed (ingresos trimestrales,
+como en ENIGH; la aplicación los convierte a mensuales al cargar).
+
+Uso:
+    python -m utils.helpers.microdatos --year 2024 --entrada concentradohogar_2024.csv --destino /tmp/ingresos
+    python -m utils.helpers.microdatos --year 2024 --entrada concentradohogar_2024.csv --combinar data/processed
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.helpers.cuantiles import BORDES, indice_bins, resumir_histogramas
+from utils.helpers.data_loader import DATA_DIR, rutas_archivo
+from utils.helpers.schema import DECILES
+
+# Columnas de los microdatos (nombres de ENIGH)
+COLUMNA_INGRESO = "ing_cor"
+COLUMNA_FACTOR = "factor"
+COLUMNA_UBICACION = "ubica_geo"
+
+FILAS_POR_BLOQUE = 500_000
+
+# Filas reservadas al empezar (el orden de magnitud de los municipios de una entidad)
+CAPACIDAD_INICIAL = 256
+
+# Clave INEGI de la entidad -> nombre en data/processed
+ENTIDADES = {
+    1: "AGUASCALIENTES", 2: "BAJA CALIFORNIA", 3: "BAJA CALIFORNIA SUR", 4: "CAMPECHE",
+    5: "COAHUILA DE ZARAGOZA", 6: "COLIMA", 7: "CHIAPAS", 8: "CHIHUAHUA",
+    9: "DISTRITO FEDERAL", 10: "DURANGO", 11: "GUANAJUATO", 12: "GUERRERO",
+    13: "HIDALGO", 14: "JALISCO", 15: "MEXICO", 16: "MICHOACAN DE OCAMPO",
+    17: "MORELOS", 18: "NAYARIT", 19: "NUEVO LEON", 20: "OAXACA",
+    21: "PUEBLA", 22: "QUERETARO DE ARTEAGA", 23: "QUINTANA ROO", 24: "SAN LUIS POTOSI",
+    25: "SINALOA", 26: "SONORA", 27: "TABASCO", 28: "TAMAULIPAS",
+    29: "TLAXCALA", 30: "VERACRUZ DE IGNACIO DE LA LLAVE", 31: "YUCATAN", 32: "ZACATECAS",
+}
+
+COLUMNAS_INGRESO = ["gini"] + DECILES + ["ingreso_promedio_total"]
+
+# Archivo procesado y claves de cada nivel
+NIVELES = {
+    "municipios": ["year", "estado", "municipio"],
+    "estados": ["year", "estado"],
+    "nacional": ["year"],
+}
+
+
+class AcumuladorIngresos:
+    """
+    Histogramas ponderados del ingreso por municipio (entidad, municipio) de un año.
+    Las filas crecen a medida que aparecen municipios nuevos: la capacidad se
+    duplica al llenarse, así que cada fila se copia O(1) veces en promedio.
+    """
+
+    def __init__(self, bordes=BORDES, capacidad=CAPACIDAD_INICIAL):
+        self.bordes = np.asarray(bordes, dtype=np.float64)
+        self._bins = len(self.bordes)
+        self._filas = {}
+        self._poblacion = np.zeros((capacidad, self._bins))
+        self._ingreso = np.zeros((capacidad, self._bins))
+        self.hogares = 0
+
+    @property
+    def poblacion(self):
+        """Matriz (municipios, bins) de población ponderada (vista de las filas usadas)."""
+        return self._poblacion[:len(self._filas)]
+
+    @property
+    def ingreso(self):
+        """Matriz (municipios, bins) de ingreso total ponderado (vista de las filas usadas)."""
+        return self._ingreso[:len(self._filas)]
+
+    def _crecer(self, filas):
+        capacidad = max(filas, 2 * len(self._poblacion))
+        for nombre in ("_poblacion", "_ingreso"):
+            actual = getattr(self, nombre)
+            nueva = np.zeros((capacidad, self._bins))
+            nueva[:len(self._filas)] = actual[:len(self._filas)]
+            setattr(self, nombre, nueva)
+
+    def _fila(self, claves):
+        nuevas = [clave for clave in claves if clave not in self._filas]
+        if nuevas:
+            if len(self._filas) + len(nuevas) > len(self._poblacion):
+                self._crecer(len(self._filas) + len(nuevas))
+            for clave in nuevas:
+                self._filas[clave] = len(self._filas)
+        return np.array([self._filas[clave] for clave in claves], dtype=np.intp)
+
+    def agregar(self, ingreso, factor, entidad, municipio):
+        """Acumula un bloque de hogares (arrays del mismo largo)."""
+        ingreso = np.clip(np.asarray(ingreso, dtype=np.float64), 0, None)
+        factor = np.asarray(factor, dtype=np.float64)
+        validos = ~(np.isnan(ingreso) | np.isnan(factor))
+        ingreso, factor = ingreso[validos], factor[validos]
+        claves_hogar = np.asarray(entidad)[validos].astype(np.int64) * 1000 + np.asarray(municipio)[validos].astype(np.int64)
+
+        unicas, inversa = np.unique(claves_hogar, return_inverse=True)
+        filas = self._fila([(int(clave // 1000), int(clave % 1000)) for clave in unicas])[inversa]
+        bins = indice_bins(ingreso, self.bordes)
+
+        # Solo se tocan las celdas (municipio, bin) presentes en el bloque
+        celdas, inversa = np.unique(filas * self._bins + bins, return_inverse=True)
+        self._poblacion.ravel()[celdas] += np.bincount(inversa, factor)
+        self._ingreso.ravel()[celdas] += np.bincount(inversa, factor * ingreso)
+        self.hogares += int(validos.sum())
+
+    def claves(self):
+        """(entidad, municipio) de cada fila de los histogramas."""
+        return list(self._filas)
+
+
+def _bloques(ruta, filas_por_bloque):
+    """Bloques (DataFrame) de un archivo CSV o Parquet con las columnas necesarias."""
+    columnas = [COLUMNA_UBICACION, COLUMNA_FACTOR, COLUMNA_INGRESO]
+    if ruta.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for lote in pq.ParquetFile(ruta).iter_batches(batch_size=filas_por_bloque, columns=columnas):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(ruta, usecols=columnas, dtype={COLUMNA_UBICACION: str}, chunksize=filas_por_bloque)
+
+
+def acumular(rutas, filas_por_bloque=FILAS_POR_BLOQUE, bordes=BORDES):
+    """
+    Lee los archivos de hogares de un año por bloques.
+
+    Returns:
+    - AcumuladorIngresos: Histogramas por municipio.
+    """
+    acumulador = AcumuladorIngresos(bordes)
+    for ruta in rutas:
+        for bloque in _bloques(ruta, filas_por_bloque):
+            # ubica_geo: 2 dígitos de entidad y 3 de municipio (a veces sin el cero inicial)
+            ubicacion = pd.to_numeric(bloque[COLUMNA_UBICACION], errors="coerce").fillna(-1).astype(np.int64).to_numpy()
+            validos = ubicacion >= 0
+            acumulador.agregar(
+                bloque[COLUMNA_INGRESO].to_numpy()[validos],
+                bloque[COLUMNA_FACTOR].to_numpy()[validos],
+                ubicacion[validos] // 1000,
+                ubicacion[validos] % 1000,
+            )
+    return acumulador
+
+
+def _nombres_municipios(directorio_datos):
+    """(ESTADO, municipio) -> nombre del municipio según los datos procesados (si existen)."""
+    ruta = rutas_archivo("municipios", directorio_datos)[0]
+    if not os.path.exists(ruta):
+        return {}
+    catalogo = pd.read_csv(ruta, usecols=["estado", "municipio", "nombre_municipio"]).drop_duplicates(["estado", "municipio"])
+    return {
+        (estado, int(municipio)): nombre
+        for estado, municipio, nombre in catalogo[["estado", "municipio", "nombre_municipio"]].itertuples(index=False)
+    }
+
+
+def calcular_niveles(acumulador, year, directorio_datos=DATA_DIR):
+    """
+    Ingresos por municipio, estado y nación de un año con las columnas de data/processed.
+
+    Returns:
+    - dict: "municipios", "estados" y "nacional" -> pd.DataFrame.
+    """
+    claves = acumulador.claves()
+    entidades = np.array([entidad for entidad, _ in claves], dtype=np.int64)
+    estados = np.array([ENTIDADES.get(entidad, f"ENTIDAD {entidad}") for entidad in entidades], dtype=object)
+    nombres = _nombres_municipios(directorio_datos)
+
+    municipios = resumir_histogramas(acumulador.poblacion, acumulador.ingreso)
+    municipios.insert(0, "year", year)
+    municipios.insert(1, "estado", estados)
+    municipios.insert(2, "nombre_municipio", [
+        nombres.get((estado, municipio), f"Municipio {municipio}")
+        for estado, (_, municipio) in zip(estados, claves)
+    ])
+    municipios.insert(3, "municipio", [municipio for _, municipio in claves])
+
+    # Estados y nación: suma de los histogramas de sus municipios
+    unicos, inversa = np.unique(estados, return_inverse=True)
+    poblacion_estados = np.zeros((len(unicos), acumulador.poblacion.shape[1]))
+    ingreso_estados = np.zeros_like(poblacion_estados)
+    np.add.at(poblacion_estados, inversa, acumulador.poblacion)
+    np.add.at(ingreso_estados, inversa, acumulador.ingreso)
+    estados_data = resumir_histogramas(poblacion_estados, ingreso_estados)
+    estados_data.insert(0, "year", year)
+    estados_data.insert(1, "estado", unicos)
+
+    nacional = resumir_histogramas(poblacion_estados.sum(axis=0, keepdims=True), ingreso_estados.sum(axis=0, keepdims=True))
+    nacional.insert(0, "year", year)
+
+    return {
+        "municipios": municipios.sort_values(["estado", "municipio"]).reset_index(drop=True),
+        "estados": estados_data,
+        "nacional": nacional,
+    }
+
+
+def combinar(niveles, directorio_datos=DATA_DIR):
+    """
+    Reemplaza las columnas de ingresos de los CSV procesados en las filas que
+    coinciden por claves (year, estado, municipio). Las filas sin coincidencia
+    en los datos procesados no se agregan: las demás columnas (respuestas,
+    clúster...) vienen de otro proceso.
+
+    Returns:
+    - dict: Nivel -> número de filas actualizadas.
+    """
+    actualizadas = {}
+    for nivel, claves in NIVELES.items():
+        ruta = rutas_archivo(nivel, directorio_datos)[0]
+        procesado = pd.read_csv(ruta)
+        es_municipal = procesado.columns[0].startswith("Unnamed")
+        if es_municipal:
+            procesado = procesado.drop(columns=procesado.columns[0])
+
+        nuevos = niveles[nivel].set_index(claves)[COLUMNAS_INGRESO]
+        posiciones = pd.MultiIndex.from_frame(procesado[claves]).get_indexer(nuevos.index) if len(claves) > 1 \
+            else pd.Index(procesado[claves[0]]).get_indexer(nuevos.index)
+        encontrados = posiciones >= 0
+        columnas = [col for col in COLUMNAS_INGRESO if col in procesado.columns]
+        procesado.loc[procesado.index[posiciones[encontrados]], columnas] = nuevos.loc[encontrados, columnas].to_numpy()
+        procesado.to_csv(ruta, index=es_municipal)
+        actualizadas[nivel] = int(encontrados.sum())
+    return actualizadas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcula deciles, ingreso promedio y GINI desde microdatos de hogares.")
+    parser.add_argument("--year", type=int, required=True, help="Año de la encuesta.")
+    parser.add_argument("--entrada", nargs="+", required=True, help="Archivos de hogares (CSV o Parquet).")
+    parser.add_argument("--destino", help="Directorio donde escribir ingresos_{municipios,estados,nacional}.csv.")
+    parser.add_argument("--combinar", metavar="DIRECTORIO", help="Actualizar los ingresos de los CSV procesados de este directorio.")
+    parser.add_argument("--filas-por-bloque", type=int, default=FILAS_POR_BLOQUE)
+    args = parser.parse_args(argv)
+    if not args.destino and not args.combinar:
+        parser.error("Indica --destino, --combinar o ambos.")
+
+    acumulador = acumular(args.entrada, args.filas_por_bloque)
+    niveles = calcular_niveles(acumulador, args.year, args.combinar or DATA_DIR)
+    print(f"{acumulador.hogares} hogares, {len(niveles['municipios'])} municipios")
+
+    if args.destino:
+        os.makedirs(args.destino, exist_ok=True)
+        for nivel, data in niveles.items():
+            data.to_csv(os.path.join(args.destino, f"ingresos_{nivel}.csv"), index=False)
+    if args.combinar:
+        for nivel, cuenta in combinar(niveles, args.combinar).items():
+            print(f"{nivel:<12}{cuenta} filas actualizadas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Paquete precalculado de las figuras de la sección Respuestas.
+
+Las gráficas de Respuestas dependen solo del municipio, el año y el ingreso del
+usuario. Este paso de construcción serializa fuera de línea, para cada
+municipio × año, el histograma del GINI y la plantilla de deciles (la parte de
+graficar_deciles que no depende del ingreso), además de las gráficas de
+percepciones de cada clúster × año. Todo queda en un solo Parquet (zstd) con la
+clave de la caché de figuras y el JSON de Plotly; la aplicación lo registra en
+CACHE_FIGURAS y sirve las figuras con una búsqueda en lugar de construirlas.
+
+El paquete es un artefacto del pipeline (utils.helpers.pipeline), que lo
+invalida si cambian los datos de origen o VERSION; si no está vigente, las
+figuras se construyen en línea.
+
+Uso:
+    python -m utils.helpers.pipeline --solo paquete_figuras
+"""
+from utils.helpers.data_loader import DATA_DIR
+
+# Cambiar al modificar las funciones de visualizations que entran en el paquete
+VERSION = "1"
+
+BINS_GINI = 20
+
+CATEGORIAS_PERCEPCION = {
+    "Percepción Personal Positiva": "Percepcion_Economica_Personal_Positiva",
+    "Percepción Personal Negativa": "Percepcion_Economica_Personal_Negativa",
+    "Percepción Nacional Positiva": "Percepcion_Naciona_Positiva",
+    "Percepción Nacional Negativa": "Percepcion_Nacional_Negativa",
+}
+CATEGORIAS_CONSUMO_AHORRO = {
+    "Ahorro Positivo": "Consumo_Ahorro_Positivo",
+    "Consumo Restringido": "Consumo_Ahorro_Negativo",
+}
+
+
+# Textos que forman parte de las claves de las figuras (los comparten la app y el paquete)
+def titulo_deciles(year):
+    return f"Comparación de tu Ingreso con los Deciles del Municipio ({year})"
+
+
+def nivel_gini(year):
+    return f"Año {year}"
+
+
+def nivel_cluster(cluster, year):
+    return f"Clúster {cluster} ({year})"
+
+
+def deciles_municipio(fila):
+    """Deciles de una fila de municipios con las etiquetas de graficar_deciles."""
+    return {f"Decil {i}": fila[f"decil_{i}"] for i in range(1, 11)}
+
+
+def generar_figuras(municipios, indice, agregados):
+    """
+    Genera las figuras de Respuestas para todos los municipios y años.
+
+    Parameters:
+    - municipios (pd.DataFrame): Municipios con el esquema compacto.
+    - indice (IndiceMunicipios): Índice construido sobre `municipios`.
+    - agregados (pd.DataFrame): Tabla de construir_agregados_cluster.
+
+    Returns:
+    - dict: clave_paquete(clave de la figura) -> JSON de la figura.
+    """
+    from utils.helpers.agregados import medias
+    from utils.helpers.cache_figuras import clave_paquete
+    from utils.helpers.visualizations import graficar_distribucion_gini, graficar_percepciones, plantilla_deciles
+
+    figuras = {}
+
+    def agregar(funcion, *args):
+        clave = clave_paquete(funcion.clave(*args))
+        if clave not in figuras:
+            figuras[clave] = funcion.sin_cache(*args).to_json()
+
+    for year in sorted(municipios["year"].unique()):
+        year = str(year)
+        filas = indice.filas_year(year)
+        data_year = municipios.iloc[filas]
+        for posicion in filas:
+            fila = municipios.iloc[posicion]
+            agregar(plantilla_deciles, deciles_municipio(fila), titulo_deciles(year))
+            agregar(graficar_distribucion_gini, data_year, fila["gini"], nivel_gini(year), BINS_GINI)
+
+        for cluster in sorted(int(cluster) for cluster in data_year["Cluster"].unique()):
+            promedios = medias(agregados, cluster, year).to_dict()
+            for categorias in (CATEGORIAS_PERCEPCION, CATEGORIAS_CONSUMO_AHORRO):
+                agregar(graficar_percepciones, categorias, promedios, nivel_cluster(cluster, year))
+    return figuras
+
+
+def construir_paquete(directorio=DATA_DIR):
+    """
+    Construye el paquete de figuras a partir de los datos de `directorio`.
+
+    Returns:
+    - dict: clave_paquete -> JSON de la figura.
+    """
+    from utils.helpers.agregados import construir_agregados_cluster
+    from utils.helpers.data_loader import GRUPOS_DASHBOARD, leer_tabla
+    from utils.helpers.indices import IndiceMunicipios
+    from utils.helpers.schema import aplicar_esquema
+
+    municipios = aplicar_esquema(leer_tabla("municipios", GRUPOS_DASHBOARD, directorio))
+    return generar_figuras(municipios, IndiceMunicipios(municipios), construir_agregados_cluster(municipios))
+
+
+def escribir_paquete(figuras, ruta):
+    """Escribe el paquete como Parquet (zstd) con las columnas "clave" y "figura"."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.table({"clave": list(figuras), "figura": list(figuras.values())}), ruta, compression="zstd")
+
+
+def leer_paquete(ruta):
+    """
+    Returns:
+    - dict: clave_paquete -> JSON de la figura.
+    """
+    import pyarrow.parquet as pq
+
+    columnas = pq.read_table(ruta).to_pydict()
+    return dict(zip(columnas["clave"], columnas["figura"]))
@@ -0,0 +1,200 @@
+"""
+Distribución de ingresos de cada municipio × año para ubicar un ingreso en percentiles.
+
+Cada fila de los datos municipales se convierte en una CDF lineal por tramos y
+monótona, construida con sus deciles: el ingreso promedio del decil k queda en
+el punto medio de su décimo de la población ((k - 0.5) / 10) y los extremos se
+extrapolan medio tramo hacia cada lado (sin bajar de 0). Los nudos de todas las
+filas se guardan en una sola matriz contigua (filas, 12) y evaluar la CDF de
+cualquier conjunto de filas es contar nudos (búsqueda tipo searchsorted por
+fila) e interpolar, todo vectorizado.
+
+La CDF de un grupo de municipios (estado, clúster o país en un año) es el
+promedio de las CDF de sus filas: cada municipio pesa lo mismo, como en
+utils.helpers.desigualdad y utils.helpers.cuantiles. Ese promedio también es
+lineal por tramos, así que `DistribucionesIngreso.combinar` lo precalcula de
+forma exacta para muchos grupos (CDFsCombinadas) y luego cada consulta es una
+interpolación.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.helpers.schema import DECILES
+
+# Proporción acumulada de la población en cada nudo
+PROPORCIONES = np.concatenate(([0.0], (np.arange(len(DECILES)) + 0.5) / len(DECILES), [1.0]))
+
+NIVELES = ["Municipio", "Estado", "Clúster", "Nacional"]
+
+# Ancho mínimo (pesos) de un tramo de la CDF: los tramos sin ancho (deciles
+# repetidos) se vuelven rampas muy empinadas al combinar
+ANCHO_MINIMO = 0.01
+
+
+def nudos_desde_deciles(deciles):
+    """
+    Nudos (filas, 12) de las CDF a partir de una matriz (filas, deciles).
+
+    Los deciles se fuerzan a no decrecer; las filas con algún NaN quedan en NaN.
+    """
+    deciles = np.maximum.accumulate(np.asarray(deciles, dtype=np.float64), axis=1)
+    inferior = np.maximum(deciles[:, 0] - (deciles[:, 1] - deciles[:, 0]) / 2, 0)
+    superior = deciles[:, -1] + (deciles[:, -1] - deciles[:, -2]) / 2
+    return np.ascontiguousarray(np.column_stack([inferior, deciles, superior]))
+
+
+class DistribucionesIngreso:
+    """
+    CDF de ingresos de cada fila de los datos municipales (mismas posiciones que
+    IndiceMunicipios), con el estado, clúster y año de cada fila para agrupar.
+    """
+
+    def __init__(self, nudos, years, estados, clusters):
+        self.nudos = np.ascontiguousarray(nudos, dtype=np.float64)
+        self.years = np.asarray(years)
+        self.estados = np.asarray(estados)
+        self.clusters = np.asarray(clusters)
+        self._por_year = {int(year): np.flatnonzero(self.years == year) for year in np.unique(self.years)}
+
+    @classmethod
+    def desde_municipios(cls, municipios):
+        """Distribuciones a partir de los datos municipales (ingresos mensuales, ver aplicar_esquema)."""
+        return cls(
+            nudos_desde_deciles(municipios[DECILES].to_numpy()),
+            municipios["year"].to_numpy(),
+            pd.factorize(municipios["estado"].astype(str).str.strip().str.upper())[0],
+            municipios["Cluster"].to_numpy(),
+        )
+
+    def cdf(self, ingresos, filas):
+        """
+        Proporción de la población de cada fila con ingreso menor o igual.
+
+        Parameters:
+        - ingresos (float | np.ndarray): Ingresos mensuales.
+        - filas (int | np.ndarray): Posiciones de las filas; se combinan con
+          `ingresos` por broadcasting (un ingreso contra muchas filas, o un
+          ingreso por fila).
+
+        Returns:
+        - np.ndarray: Valores de la CDF en [0, 1] (NaN en filas sin deciles).
+        """
+        ingresos, filas = np.broadcast_arrays(np.asarray(ingresos, dtype=np.float64), np.asarray(filas))
+        nudos = self.nudos[filas]
+
+        # Tramo [j - 1, j] de cada ingreso; fuera de los extremos se satura en 0 o 1
+        j = np.clip((nudos <= ingresos[..., None]).sum(axis=-1), 1, len(PROPORCIONES) - 1)
+        inicio = np.take_along_axis(nudos, (j - 1)[..., None], axis=-1)[..., 0]
+        fin = np.take_along_axis(nudos, j[..., None], axis=-1)[..., 0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(fin > inicio, (ingresos - inicio) / (fin - inicio), 1.0)
+        valores = PROPORCIONES[j - 1] + np.clip(t, 0, 1) * (PROPORCIONES[j] - PROPORCIONES[j - 1])
+        return np.where(np.isnan(nudos).any(axis=-1), np.nan, valores)
+
+    def percentiles(self, ingreso, posicion):
+        """
+        Percentil de un ingreso en su municipio, estado, clúster y en el país,
+        todos del año de la fila del municipio.
+
+        Parameters:
+        - ingreso (float): Ingreso mensual.
+        - posicion (int): Fila del municipio (ver IndiceMunicipios.buscar).
+
+        Returns:
+        - dict: Nivel (NIVELES) -> percentil en [0, 100].
+        """
+        filas = self._por_year[int(self.years[posicion])]
+        valores = self.cdf(ingreso, filas)
+        mascaras = np.stack([
+            filas == posicion,
+            self.estados[filas] == self.estados[posicion],
+            self.clusters[filas] == self.clusters[posicion],
+            np.ones(len(filas), dtype=bool),
+        ])
+        validas = mascaras & ~np.isnan(valores)
+        with np.errstate(invalid="ignore"):
+            medias = np.where(validas, valores, 0).sum(axis=1) / validas.sum(axis=1)
+        return dict(zip(NIVELES, (100 * medias).tolist()))
+
+    def combinar(self, grupos):
+        """
+        CDF promedio de cada grupo de filas (las filas sin deciles no cuentan).
+
+        Cada tramo de cada fila aporta una pendiente constante entre sus dos
+        nudos; ordenando todos los nudos del grupo y acumulando los cambios de
+        pendiente se obtiene la CDF promedio exacta en cada nudo.
+
+        Parameters:
+        - grupos (list): Arrays de posiciones de filas, uno por grupo.
+
+        Returns:
+        - CDFsCombinadas: Una CDF por grupo.
+        """
+        grupos = [np.asarray(grupo, dtype=np.int64) for grupo in grupos]
+        filas = np.concatenate(grupos) if grupos else np.empty(0, dtype=np.int64)
+        grupo_fila = np.repeat(np.arange(len(grupos)), [len(grupo) for grupo in grupos])
+        validas = ~np.isnan(self.nudos[filas]).any(axis=1)
+        filas, grupo_fila = filas[validas], grupo_fila[validas]
+        conteos = np.bincount(grupo_fila, minlength=len(grupos))
+
+        nudos = self.nudos[filas]
+        inicio = nudos[:, :-1]
+        fin = np.maximum(nudos[:, 1:], inicio + ANCHO_MINIMO)
+        pendiente = np.diff(PROPORCIONES)[None, :] / conteos[grupo_fila][:, None] / (fin - inicio)
+
+        # Cambios de pendiente (+ al empezar cada tramo, - al terminar), por grupo y posición
+        x = np.concatenate([inicio.ravel(), fin.ravel()])
+        cambio = np.concatenate([pendiente.ravel(), -pendiente.ravel()])
+        grupo = np.tile(np.repeat(grupo_fila, inicio.shape[1]), 2)
+        orden = np.lexsort((x, grupo))
+        x, cambio, grupo = x[orden], cambio[orden], grupo[orden]
+        inicios = np.concatenate(([0], np.cumsum(np.bincount(grupo, minlength=len(grupos)))))
+
+        # Pendiente vigente después de cada nudo e integral entre nudos consecutivos,
+        # reiniciando ambas al empezar cada grupo
+        primero = inicios[grupo]
+        acumulada = np.cumsum(cambio)
+        pendiente_grupo = acumulada - np.concatenate(([0.0], acumulada))[primero]
+        avance = np.zeros_like(x)
+        avance[1:] = pendiente_grupo[:-1] * np.diff(x)
+        avance[primero] = 0
+        integral = np.cumsum(avance)
+        valores = integral - integral[primero]
+        return CDFsCombinadas(inicios, x, np.clip(valores, 0, 1))
+
+
+class CDFsCombinadas:
+    """
+    CDF lineales por tramos de varios grupos, guardadas en formato CSR: los nudos
+    del grupo g están en [inicios[g], inicios[g + 1]). Los grupos vacíos valen NaN.
+    """
+
+    def __init__(self, inicios, x, valores):
+        self.inicios = np.asarray(inicios, dtype=np.int64)
+        self.vacios = np.diff(self.inicios) == 0
+        grupos = len(self.inicios) - 1
+
+        # Centinelas en -1 (CDF 0) y maximo + 1 (CDF 1) en cada grupo, y cada grupo
+        # desplazado a su propio intervalo para interpolar todos con una sola llamada
+        self.maximo = float(x.max()) if len(x) else 0.0
+        self.ancho = self.maximo + 3
+        grupo = np.repeat(np.arange(grupos), np.diff(self.inicios))
+        self._x = np.concatenate([np.asarray(x, dtype=np.float64) + grupo * self.ancho,
+                                  np.arange(grupos) * self.ancho - 1, np.arange(grupos) * self.ancho + self.maximo + 1])
+        self._valores = np.concatenate([valores, np.zeros(grupos), np.ones(grupos)])
+        orden = np.argsort(self._x, kind="stable")
+        self._x, self._valores = self._x[orden], self._valores[orden]
+
+    def __len__(self):
+        return len(self.inicios) - 1
+
+    def evaluar(self, ingresos, grupos):
+        """
+        CDF de cada grupo en cada ingreso (se combinan por broadcasting).
+
+        Returns:
+        - np.ndarray: Valores en [0, 1] (NaN en grupos vacíos).
+        """
+        ingresos, grupos = np.broadcast_arrays(np.asarray(ingresos, dtype=np.float64), np.asarray(grupos))
+        x = np.clip(ingresos, -1, self.maximo + 1) + grupos * self.ancho
+        return np.where(self.vacios[grupos], np.nan, np.interp(x, self._x, self._valores))
@@ -0,0 +1,159 @@
+"""
+Reporte reproducible del tiempo de importación por módulo.
+
+Cada módulo se importa en un intérprete nuevo (`python -X importtime`) después de
+streamlit, de modo que el tiempo medido es el costo adicional del módulo. Se toma
+la mediana de varias repeticiones.
+
+Uso:
+    python -m utils.helpers.perfil_importacion
+    python -m utils.helpers.perfil_importacion --guardar importacion.json
+    python -m utils.helpers.perfil_importacion --comparar importacion.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Módulos que importa main.py al arrancar (camino de la página de inicio)
+MODULOS_ARRANQUE = [
+    "utils.helpers.helper",
+    "utils.helpers.registro",
+    "utils.helpers.introduccion",
+    "utils.helpers.instrumentacion",
+]
+
+# Módulos que se importan de forma diferida dentro de las secciones
+MODULOS_SECCIONES = [
+    "utils.helpers.data_loader",
+    "utils.helpers.agregados",
+    "utils.helpers.pipeline",
+    "utils.helpers.visualizations",
+    "utils.helpers.dashboard",
+]
+
+# Costo máximo (ms) de los módulos del arranque por encima de streamlit
+PRESUPUESTO_ARRANQUE_MS = 50
+
+# Tolerancia al comparar con un reporte anterior
+TOLERANCIA_RELATIVA = 0.25
+TOLERANCIA_ABSOLUTA_MS = 10
+
+_MARCA = "-- perfil_importacion --"
+
+
+def _importar_en_subproceso(modulos, base="streamlit"):
+    """
+    Importa `modulos` en un intérprete nuevo y devuelve (ms totales, dependencias).
+    Las dependencias son los paquetes que cargan directamente los módulos, con su
+    tiempo acumulado en ms.
+    """
+    codigo = (
+        f"import sys, time, {base}\n"
+        f"print({_MARCA!r}, file=sys.stderr, flush=True)\n"
+        "inicio = time.perf_counter()\n"
+        + "".join(f"import {modulo}\n" for modulo in modulos)
+        + "print((time.perf_counter() - inicio) * 1000)\n"
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True, check=True,
+    )
+    total_ms = float(resultado.stdout.strip().splitlines()[-1])
+
+    # Dependencias directas: entradas con un nivel de sangría bajo los módulos medidos
+    dependencias = {}
+    propios = set(modulos) | {"utils", "utils.helpers"}
+    lineas = resultado.stderr.split(_MARCA, 1)[-1].splitlines()
+    for linea in lineas:
+        if not linea.startswith("import time:") or linea.count("|") != 2:
+            continue
+        _, acumulado, nombre = linea.split("|")
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        paquete = nombre.strip()
+        if acumulado.strip().isdigit() and nivel <= 1 and paquete not in propios:
+            dependencias[paquete] = dependencias.get(paquete, 0) + int(acumulado) / 1000
+    return total_ms, dependencias
+
+
+def medir_modulo(modulos, repeticiones=5):
+    """
+    Mide la importación de uno o varios módulos.
+
+    Returns:
+    - dict: Mediana, mínimo y máximo en ms y las dependencias más pesadas.
+    """
+    if isinstance(modulos, str):
+        modulos = [modulos]
+    tiempos = []
+    dependencias = {}
+    for _ in range(repeticiones):
+        total_ms, dependencias = _importar_en_subproceso(modulos)
+        tiempos.append(total_ms)
+    pesadas = sorted(dependencias.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {
+        "mediana_ms": round(statistics.median(tiempos), 2),
+        "min_ms": round(min(tiempos), 2),
+        "max_ms": round(max(tiempos), 2),
+        "dependencias_ms": {nombre: round(ms, 2) for nombre, ms in pesadas},
+    }
+
+
+def generar_reporte(repeticiones=5):
+    """Reporte por módulo más el total del camino de arranque."""
+    reporte = {
+        "python": sys.version.split()[0],
+        "repeticiones": repeticiones,
+        "arranque": medir_modulo(MODULOS_ARRANQUE, repeticiones),
+        "modulos": {},
+    }
+    for modulo in MODULOS_ARRANQUE + MODULOS_SECCIONES:
+        reporte["modulos"][modulo] = medir_modulo(modulo, repeticiones)
+    return reporte
+
+
+def comparar(reporte, anterior):
+    """
+    Lista de regresiones respecto a un reporte anterior (mismo formato).
+    """
+    regresiones = []
+    pares = [("arranque", reporte["arranque"], anterior.get("arranque"))]
+    pares += [(modulo, datos, anterior.get("modulos", {}).get(modulo)) for modulo, datos in reporte["modulos"].items()]
+    for nombre, actual, previo in pares:
+        if not previo:
+            continue
+        limite = previo["mediana_ms"] * (1 + TOLERANCIA_RELATIVA) + TOLERANCIA_ABSOLUTA_MS
+        if actual["mediana_ms"] > limite:
+            regresiones.append(f"{nombre}: {previo['mediana_ms']:.1f} ms -> {actual['mediana_ms']:.1f} ms")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de importación por módulo del dashboard.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--guardar", help="Ruta donde guardar el reporte en JSON.")
+    parser.add_argument("--comparar", help="Reporte JSON anterior contra el cual detectar regresiones.")
+    args = parser.parse_args(argv)
+
+    reporte = generar_reporte(args.repeticiones)
+    print(json.dumps(reporte, indent=2, ensure_ascii=False))
+    if args.guardar:
+        with open(args.guardar, "w") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+    errores = []
+    if reporte["arranque"]["mediana_ms"] > PRESUPUESTO_ARRANQUE_MS:
+        errores.append(
+            f"arranque: {reporte['arranque']['mediana_ms']:.1f} ms excede el presupuesto de {PRESUPUESTO_ARRANQUE_MS} ms"
+        )
+    if args.comparar:
+        with open(args.comparar) as f:
+            errores += comparar(reporte, json.load(f))
+    for error in errores:
+        print(f"REGRESIÓN {error}", file=sys.stderr)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
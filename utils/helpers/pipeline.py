@@ -0,0 +1,398 @@
+"""
+Pipeline de artefactos derivados de data/processed.
+
+Lee los CSV de data/processed y escribe los artefactos que usan main.py y
+dashboard.py (copias Parquet, agregados y centroides por clúster, vistas, promedios globales
+y sketches de cuantiles del dashboard, paquete de figuras...). Cada artefacto registra en el manifiesto
+la huella de sus entradas: SHA-256 del contenido de los archivos de origen (o la
+huella de los artefactos de los que depende) más la versión del artefacto. Al
+volver a ejecutar solo se reconstruye lo que cambió.
+
+La aplicación carga los artefactos con `cargar_artefacto`, que devuelve None si
+el artefacto falta o ya no corresponde a los datos actuales (el registro de datos
+lo construye entonces en el proceso).
+
+Uso:
+    python -m utils.helpers.pipeline              # reconstruye lo que cambió
+    python -m utils.helpers.pipeline --estado     # muestra qué está vigente
+    python -m utils.helpers.pipeline --forzar     # reconstruye todo
+    python -m utils.helpers.pipeline --solo agregados_cluster promedios_estados
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+
+from utils.helpers.data_loader import ARCHIVOS, DATA_DIR, GRUPOS_DASHBOARD, rutas_archivo
+
+DIRECTORIO_DERIVADOS = os.path.join(DATA_DIR, "derivados")
+MANIFIESTO = "manifiesto.json"
+
+# Huellas ya calculadas en este proceso: (ruta, tamaño, mtime) -> SHA-256
+_HUELLAS = {}
+
+
+# Constructores, escritores y lectores (importan pandas/pyarrow solo al usarse)
+def _tabla_base(nombre, directorio_datos):
+    from utils.helpers.data_loader import leer_tabla
+    from utils.helpers.schema import aplicar_esquema
+
+    return aplicar_esquema(leer_tabla(nombre, GRUPOS_DASHBOARD, directorio_datos))
+
+
+def _construir_parquet(nombre):
+    def construir(directorio_datos):
+        import pandas as pd
+
+        return pd.read_csv(rutas_archivo(nombre, directorio_datos)[0])
+    return construir
+
+
+def _construir_agregados(directorio_datos):
+    from utils.helpers.agregados import construir_agregados_cluster
+
+    return construir_agregados_cluster(_tabla_base("municipios", directorio_datos))
+
+
+def _construir_centroides(directorio_datos):
+    from utils.helpers.clasificacion import CentroidesCluster
+
+    return CentroidesCluster.construir(_tabla_base("municipios", directorio_datos))
+
+
+def _construir_vista(nombre):
+    def construir(directorio_datos):
+        from utils.helpers.dashboard import construir_vista
+
+        return construir_vista(_tabla_base(nombre, directorio_datos))
+    return construir
+
+
+def _construir_promedios(nombre):
+    def construir(directorio_datos):
+        from utils.helpers.agregados import construir_promedios_globales
+
+        return construir_promedios_globales(_construir_vista(nombre)(directorio_datos))
+    return construir
+
+
+def _construir_paquete(directorio_datos):
+    from utils.helpers.paquete_figuras import construir_paquete
+
+    return construir_paquete(directorio_datos)
+
+
+def _escribir_parquet(data, ruta):
+    # Los índices por defecto solo se guardan como metadatos; los demás, como columnas
+    data.to_parquet(ruta, engine="pyarrow", compression="zstd")
+
+
+def _leer_parquet(ruta):
+    import pandas as pd
+
+    return pd.read_parquet(ruta)
+
+
+def _escribir_agregados(agregados, ruta):
+    from utils.helpers.agregados import aplanar_agregados
+
+    _escribir_parquet(aplanar_agregados(agregados), ruta)
+
+
+def _leer_agregados(ruta):
+    from utils.helpers.agregados import restaurar_agregados
+
+    return restaurar_agregados(_leer_parquet(ruta))
+
+
+def _escribir_centroides(centroides, ruta):
+    _escribir_parquet(centroides.a_tabla(), ruta)
+
+
+def _leer_centroides(ruta):
+    from utils.helpers.clasificacion import CentroidesCluster
+
+    return CentroidesCluster.desde_tabla(_leer_parquet(ruta))
+
+
+def _construir_sketches(nombre):
+    def construir(directorio_datos):
+        from utils.helpers.agregados import DECILES_VISTA
+        from utils.helpers.cuantiles import SketchesCuantiles
+
+        vista = _construir_vista(nombre)(directorio_datos)
+        return SketchesCuantiles.desde_deciles(vista[DECILES_VISTA].to_numpy())
+    return construir
+
+
+def _escribir_sketches(sketches, ruta):
+    from utils.helpers.cuantiles import escribir_sketches
+
+    escribir_sketches(sketches, ruta)
+
+
+def _leer_sketches(ruta):
+    from utils.helpers.cuantiles import leer_sketches
+
+    return leer_sketches(ruta)
+
+
+def _escribir_paquete(figuras, ruta):
+    from utils.helpers.paquete_figuras import escribir_paquete
+
+    escribir_paquete(figuras, ruta)
+
+
+def _leer_paquete(ruta):
+    from utils.helpers.paquete_figuras import leer_paquete
+
+    return leer_paquete(ruta)
+
+
+def _version_paquete():
+    from utils.helpers.paquete_figuras import VERSION
+
+    return VERSION
+
+
+# Artefactos en orden de construcción. "entradas" son conjuntos de datos de
+# ARCHIVOS (se usa la huella de su CSV) u otros artefactos. "ruta" es opcional:
+# por defecto el artefacto se escribe en el directorio de derivados.
+ARTEFACTOS = {
+    **{
+        f"parquet_{nombre}": {
+            "entradas": (nombre,),
+            "version": "1",
+            "construir": _construir_parquet(nombre),
+            "escribir": _escribir_parquet,
+            "leer": _leer_parquet,
+            # leer_tabla usa la copia Parquet junto al CSV
+            "ruta": lambda directorio_datos, nombre=nombre: rutas_archivo(nombre, directorio_datos)[1],
+        }
+        for nombre in ARCHIVOS
+    },
+    "agregados_cluster": {
+        "entradas": ("municipios",),
+        "version": "4",
+        "construir": _construir_agregados,
+        "escribir": _escribir_agregados,
+        "leer": _leer_agregados,
+    },
+    "centroides_cluster": {
+        "entradas": ("municipios",),
+        "version": "1",
+        "construir": _construir_centroides,
+        "escribir": _escribir_centroides,
+        "leer": _leer_centroides,
+    },
+    "vista_municipios": {
+        "entradas": ("municipios",),
+        "version": "2",
+        "construir": _construir_vista("municipios"),
+        "escribir": _escribir_parquet,
+        "leer": _leer_parquet,
+    },
+    "vista_estados": {
+        "entradas": ("estados",),
+        "version": "2",
+        "construir": _construir_vista("estados"),
+        "escribir": _escribir_parquet,
+        "leer": _leer_parquet,
+    },
+    **{
+        f"promedios_{nombre}": {
+            "entradas": (f"vista_{nombre}",),
+            "version": "2",
+            "construir": _construir_promedios(nombre),
+            "escribir": _escribir_parquet,
+            "leer": _leer_parquet,
+        }
+        for nombre in ("municipios", "estados")
+    },
+    # Sketches de cuantiles alineados con las filas de cada vista
+    **{
+        f"sketches_{nombre}": {
+            "entradas": (f"vista_{nombre}",),
+            "version": "1",
+            "construir": _construir_sketches(nombre),
+            "escribir": _escribir_sketches,
+            "leer": _leer_sketches,
+        }
+        for nombre in ("municipios", "estados")
+    },
+    "paquete_figuras": {
+        "entradas": ("municipios",),
+        "version": _version_paquete,
+        "construir": _construir_paquete,
+        "escribir": _escribir_paquete,
+        "leer": _leer_paquete,
+    },
+}
+
+
+def huella_archivo(ruta):
+    """SHA-256 del contenido de un archivo (memorizado por tamaño y fecha de modificación)."""
+    estado = os.stat(ruta)
+    clave = (os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+    if clave not in _HUELLAS:
+        digest = hashlib.sha256()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(2**20), b""):
+                digest.update(bloque)
+        _HUELLAS[clave] = digest.hexdigest()
+    return _HUELLAS[clave]
+
+
+def huella_datos(directorio_datos=DATA_DIR):
+    """
+    Huella corta de todos los archivos de origen (ARCHIVOS) de un directorio de
+    datos: cambia si cambia cualquiera de ellos o si se usa otro directorio.
+    """
+    partes = [os.path.abspath(directorio_datos)]
+    for nombre in ARCHIVOS:
+        ruta_csv, ruta_parquet = rutas_archivo(nombre, directorio_datos)
+        ruta = ruta_csv if os.path.exists(ruta_csv) else ruta_parquet
+        partes.append(huella_archivo(ruta) if os.path.exists(ruta) else None)
+    return hashlib.sha256(json.dumps(partes).encode()).hexdigest()[:16]
+
+
+def huella_entradas(nombre, directorio_datos=DATA_DIR):
+    """
+    Huella de las entradas de un artefacto: versión del artefacto y huellas de sus
+    entradas (archivos de origen o, recursivamente, otros artefactos).
+    """
+    artefacto = ARTEFACTOS[nombre]
+    version = artefacto["version"]() if callable(artefacto["version"]) else artefacto["version"]
+    partes = [nombre, version]
+    for entrada in artefacto["entradas"]:
+        if entrada in ARTEFACTOS:
+            partes.append(huella_entradas(entrada, directorio_datos))
+        else:
+            ruta_csv, ruta_parquet = rutas_archivo(entrada, directorio_datos)
+            partes.append(huella_archivo(ruta_csv if os.path.exists(ruta_csv) else ruta_parquet))
+    return hashlib.sha256(json.dumps(partes).encode()).hexdigest()
+
+
+def ruta_artefacto(nombre, directorio_datos=DATA_DIR, directorio=DIRECTORIO_DERIVADOS):
+    artefacto = ARTEFACTOS[nombre]
+    if "ruta" in artefacto:
+        return artefacto["ruta"](directorio_datos)
+    return os.path.join(directorio, f"{nombre}.parquet")
+
+
+def leer_manifiesto(directorio=DIRECTORIO_DERIVADOS):
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta) as f:
+        return json.load(f)
+
+
+def _guardar_manifiesto(manifiesto, directorio):
+    temporal = os.path.join(directorio, f"{MANIFIESTO}.{os.getpid()}.tmp")
+    with open(temporal, "w") as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, os.path.join(directorio, MANIFIESTO))
+
+
+def vigente(nombre, manifiesto, directorio_datos=DATA_DIR, directorio=DIRECTORIO_DERIVADOS):
+    """True si el artefacto existe y su huella de entradas coincide con la actual."""
+    registro = manifiesto.get(nombre)
+    if not registro or not os.path.exists(ruta_artefacto(nombre, directorio_datos, directorio)):
+        return False
+    return registro.get("entradas") == huella_entradas(nombre, directorio_datos)
+
+
+def estado(directorio_datos=DATA_DIR, directorio=DIRECTORIO_DERIVADOS):
+    """
+    Estado de cada artefacto.
+
+    Returns:
+    - dict: Nombre del artefacto -> "vigente", "desactualizado" o "faltante".
+    """
+    manifiesto = leer_manifiesto(directorio)
+    resultado = {}
+    for nombre in ARTEFACTOS:
+        if vigente(nombre, manifiesto, directorio_datos, directorio):
+            resultado[nombre] = "vigente"
+        elif nombre in manifiesto and os.path.exists(ruta_artefacto(nombre, directorio_datos, directorio)):
+            resultado[nombre] = "desactualizado"
+        else:
+            resultado[nombre] = "faltante"
+    return resultado
+
+
+def ejecutar(solo=None, forzar=False, directorio_datos=DATA_DIR, directorio=DIRECTORIO_DERIVADOS):
+    """
+    Construye los artefactos que faltan o cuyas entradas cambiaron.
+
+    Parameters:
+    - solo (iterable | None): Artefactos a considerar (por defecto, todos).
+    - forzar (bool): Reconstruir aunque estén vigentes.
+
+    Returns:
+    - dict: Nombre -> segundos de construcción, solo de los artefactos reconstruidos.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    manifiesto = leer_manifiesto(directorio)
+    construidos = {}
+    for nombre, artefacto in ARTEFACTOS.items():
+        if solo is not None and nombre not in solo:
+            continue
+        if not forzar and vigente(nombre, manifiesto, directorio_datos, directorio):
+            continue
+
+        inicio = time.perf_counter()
+        ruta = ruta_artefacto(nombre, directorio_datos, directorio)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        artefacto["escribir"](artefacto["construir"](directorio_datos), temporal)
+        os.replace(temporal, ruta)
+        construidos[nombre] = time.perf_counter() - inicio
+
+        manifiesto[nombre] = {
+            "entradas": huella_entradas(nombre, directorio_datos),
+            "archivo": os.path.relpath(ruta, directorio),
+            "construido": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        _guardar_manifiesto(manifiesto, directorio)
+    return construidos
+
+
+def cargar_artefacto(nombre, directorio_datos=DATA_DIR, directorio=DIRECTORIO_DERIVADOS):
+    """
+    Lee un artefacto si está vigente.
+
+    Returns:
+    - object | None: El artefacto, o None si falta o sus entradas cambiaron.
+    """
+    if not vigente(nombre, leer_manifiesto(directorio), directorio_datos, directorio):
+        return None
+    return ARTEFACTOS[nombre]["leer"](ruta_artefacto(nombre, directorio_datos, directorio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construye los artefactos derivados de data/processed.")
+    parser.add_argument("--solo", nargs="*", choices=list(ARTEFACTOS), help="Artefactos a construir.")
+    parser.add_argument("--forzar", action="store_true", help="Reconstruir aunque estén vigentes.")
+    parser.add_argument("--estado", action="store_true", help="Solo mostrar el estado de los artefactos.")
+    args = parser.parse_args(argv)
+
+    if args.estado:
+        for nombre, situacion in estado().items():
+            print(f"{nombre:<22}{situacion}")
+        return 0
+
+    construidos = ejecutar(solo=args.solo, forzar=args.forzar)
+    for nombre in ARTEFACTOS:
+        if nombre in construidos:
+            print(f"{nombre:<22}construido en {construidos[nombre]:.2f} s")
+        elif args.solo is None or nombre in args.solo:
+            print(f"{nombre:<22}vigente")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
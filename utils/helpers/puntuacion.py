@@ -0,0 +1,250 @@
+"""
+Puntuación por lotes de personas encuestadas (campañas de campo).
+
+Recibe un archivo (CSV o Parquet) con una fila por persona y las columnas del
+cuestionario (las claves de st.session_state["user_data"]: Estado, Municipio,
+Ingresos, Percepcion_Economica_Personal, ..., y opcionalmente year) y agrega,
+en una sola pasada vectorizada por bloque:
+- Cluster_Municipio y GINI_Municipio / Nivel_GINI del municipio en ese año.
+- Percentil del ingreso en el municipio, el estado, el clúster y el país
+  (utils.helpers.percentiles).
+- Brecha_<índice>: el perfil de la persona menos el promedio de su clúster en
+  cada índice de percepción (puntos porcentuales).
+- Cluster_Perfil, Distancia_Perfil y Confianza_Perfil: el clúster más parecido
+  a sus propias respuestas (utils.helpers.clasificacion).
+
+La entrada se lee y la salida se escribe por bloques, así que la memoria no
+depende del tamaño del archivo; con varios procesos, cada uno carga los datos
+una vez y puntúa bloques completos, y los resultados se escriben en orden.
+
+Uso:
+    python -m utils.helpers.puntuacion --entrada respuestas.csv --salida puntuadas.csv
+    python -m utils.helpers.puntuacion --entrada respuestas.parquet --salida puntuadas.csv --year 2022 --procesos 8
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utils.helpers.clasificacion import PERCEPCIONES, CentroidesCluster, perfiles
+from utils.helpers.data_loader import DATA_DIR, GRUPOS_DASHBOARD
+from utils.helpers.desigualdad import grupos_por_etiqueta
+from utils.helpers.percentiles import NIVELES, DistribucionesIngreso
+
+FILAS_POR_BLOQUE = 50_000
+
+# Umbrales del nivel de desigualdad (los mismos de la sección Respuestas)
+NIVELES_GINI = [(0.4, "alto"), (0.3, "moderado")]
+NIVEL_GINI_BAJO = "bajo"
+
+COLUMNAS_PERCENTIL = {nivel: f"Percentil_{nivel.replace('ú', 'u')}" for nivel in NIVELES}
+COLUMNAS_BRECHA = [f"Brecha_{indice}" for indice in PERCEPCIONES]
+
+
+def _claves(estados, municipios, years):
+    """Claves ESTADO|MUNICIPIO|año (normalizadas como en IndiceMunicipios) de columnas completas."""
+    def normalizar(serie):
+        return pd.Series(serie).astype(str).str.strip().str.upper().to_numpy()
+
+    return pd.Index(normalizar(estados) + "|" + normalizar(municipios) + "|" + pd.Series(years).astype(str).to_numpy())
+
+
+class Puntuador:
+    """Datos precalculados para puntuar personas: se construye una vez por proceso."""
+
+    def __init__(self, municipios):
+        self.years = municipios["year"].to_numpy()
+        self.clusters = municipios["Cluster"].to_numpy()
+        self.gini = municipios["gini"].to_numpy(dtype=np.float64)
+        self.ultimo_year = int(self.years.max())
+
+        # (ESTADO|MUNICIPIO|año) -> fila; se conserva la primera coincidencia, como en IndiceMunicipios
+        claves = _claves(municipios["estado"], municipios["nombre_municipio"], self.years)
+        primeras = ~claves.duplicated()
+        self._claves = claves[primeras]
+        self._filas_clave = np.flatnonzero(primeras)
+
+        self.distribuciones = DistribucionesIngreso.desde_municipios(municipios)
+        estados = self.distribuciones.estados
+        # Nivel -> (CDF combinada de cada grupo, grupo de cada fila); los grupos son del mismo año
+        self._grupos = {}
+        for nivel, etiquetas in (
+            ("Estado", [f"{year}|{estado}" for year, estado in zip(self.years, estados)]),
+            ("Clúster", [f"{year}|{cluster}" for year, cluster in zip(self.years, self.clusters)]),
+            ("Nacional", self.years),
+        ):
+            _, grupos = grupos_por_etiqueta(etiquetas)
+            grupo_fila = np.empty(len(municipios), dtype=np.int64)
+            for g, filas in enumerate(grupos):
+                grupo_fila[filas] = g
+            self._grupos[nivel] = (self.distribuciones.combinar(grupos), grupo_fila)
+
+        self.centroides = CentroidesCluster.construir(municipios)
+        self._years_centroides = pd.Index([int(year) for year in self.centroides.years])
+        self._clusters_centroides = pd.Index(self.centroides.clusters)
+
+    @classmethod
+    def desde_directorio(cls, directorio_datos=DATA_DIR):
+        from utils.helpers.data_loader import leer_tabla
+        from utils.helpers.schema import aplicar_esquema
+
+        return cls(aplicar_esquema(leer_tabla("municipios", GRUPOS_DASHBOARD, directorio_datos)))
+
+    def filas(self, estados, municipios, years):
+        """Fila de los datos municipales de cada persona (-1 si no hay datos de su municipio y año)."""
+        posiciones = self._claves.get_indexer(_claves(estados, municipios, years))
+        return np.where(posiciones >= 0, self._filas_clave[np.maximum(posiciones, 0)], -1)
+
+    def puntuar(self, respuestas, year=None):
+        """
+        Puntúa un bloque de personas.
+
+        Parameters:
+        - respuestas (pd.DataFrame): Una fila por persona (ver el docstring del módulo).
+        - year (int | None): Año de los datos para las filas sin columna "year"
+          (por defecto, el más reciente).
+
+        Returns:
+        - pd.DataFrame: Las columnas de `respuestas` más las puntuaciones.
+        """
+        n = len(respuestas)
+        if "year" in respuestas.columns:
+            years = pd.to_numeric(respuestas["year"], errors="coerce").fillna(year or self.ultimo_year).astype(int).to_numpy()
+        else:
+            years = np.full(n, year or self.ultimo_year)
+        filas = self.filas(respuestas["Estado"], respuestas["Municipio"], years)
+        encontradas = filas >= 0
+        fila = np.maximum(filas, 0)
+        ingresos = pd.to_numeric(respuestas["Ingresos"], errors="coerce").to_numpy(dtype=np.float64)
+
+        resultado = respuestas.copy()
+        resultado["year"] = years
+        resultado["Cluster_Municipio"] = pd.Series(self.clusters[fila], index=resultado.index).where(encontradas).astype("Int64")
+
+        gini = np.where(encontradas, self.gini[fila], np.nan)
+        resultado["GINI_Municipio"] = gini
+        niveles = np.select([gini > umbral for umbral, _ in NIVELES_GINI], [nivel for _, nivel in NIVELES_GINI], NIVEL_GINI_BAJO)
+        resultado["Nivel_GINI"] = pd.Series(niveles, index=resultado.index).where(~np.isnan(gini))
+
+        # Percentiles: la CDF del municipio y las CDF combinadas de sus grupos
+        percentiles = {"Municipio": self.distribuciones.cdf(ingresos, fila)}
+        for nivel, (cdfs, grupo_fila) in self._grupos.items():
+            percentiles[nivel] = cdfs.evaluar(ingresos, grupo_fila[fila])
+        for nivel, columna in COLUMNAS_PERCENTIL.items():
+            resultado[columna] = np.where(encontradas, 100 * percentiles[nivel], np.nan)
+
+        # Brechas contra el promedio del clúster del municipio en ese año
+        perfil = perfiles(respuestas)
+        posicion_year = self._years_centroides.get_indexer(years)
+        posicion_cluster = self._clusters_centroides.get_indexer(self.clusters[fila])
+        con_centroide = encontradas & (posicion_year >= 0) & (posicion_cluster >= 0)
+        promedio_cluster = self.centroides.centroides[np.maximum(posicion_year, 0), np.maximum(posicion_cluster, 0), 1:]
+        brechas = np.where(con_centroide[:, None], perfil[:, 1:] - promedio_cluster, np.nan)
+        resultado[COLUMNAS_BRECHA] = brechas
+
+        cercanos = self.centroides.clasificar_lote(perfil, years)
+        resultado["Cluster_Perfil"] = pd.Series(cercanos["cluster"].to_numpy(), index=resultado.index).where(cercanos["cluster"].to_numpy() >= 0).astype("Int64")
+        resultado["Distancia_Perfil"] = cercanos["distancia"].to_numpy()
+        resultado["Confianza_Perfil"] = cercanos["confianza"].to_numpy()
+        return resultado
+
+
+def _bloques(ruta, filas_por_bloque):
+    """Bloques (DataFrame) de un archivo CSV o Parquet."""
+    if ruta.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for lote in pq.ParquetFile(ruta).iter_batches(batch_size=filas_por_bloque):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(ruta, chunksize=filas_por_bloque, dtype={"Estado": str, "Municipio": str})
+
+
+# Puntuador de cada proceso de trabajo (se construye en el inicializador del pool)
+_PUNTUADOR = None
+
+def _iniciar_proceso(directorio_datos):
+    global _PUNTUADOR
+    _PUNTUADOR = Puntuador.desde_directorio(directorio_datos)
+
+
+def _puntuar_bloque(bloque, year, encabezado):
+    """
+    Puntúa un bloque y lo devuelve ya como CSV (bytes): el formateo es la parte
+    más cara, así que se hace en el proceso de trabajo y con el escritor de Arrow.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    puntuado = _PUNTUADOR.puntuar(bloque, year)
+    salida = pa.BufferOutputStream()
+    opciones = pa_csv.WriteOptions(include_header=encabezado, quoting_style="needed")
+    pa_csv.write_csv(pa.Table.from_pandas(puntuado, preserve_index=False), salida, opciones)
+    return salida.getvalue().to_pybytes(), len(puntuado)
+
+
+def puntuar_archivo(entrada, salida, year=None, procesos=None, filas_por_bloque=FILAS_POR_BLOQUE, directorio_datos=DATA_DIR):
+    """
+    Puntúa un archivo de personas y escribe el resultado como CSV, por bloques.
+
+    Parameters:
+    - entrada (str): Archivo CSV o Parquet con una fila por persona.
+    - salida (str): CSV de salida.
+    - year (int | None): Año para las filas sin columna "year".
+    - procesos (int | None): Procesos de trabajo (por defecto, uno por núcleo; 1 = sin pool).
+
+    Returns:
+    - int: Personas puntuadas.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    total = 0
+    with open(salida, "wb") as destino:
+        if procesos == 1:
+            _iniciar_proceso(directorio_datos)
+            for numero, bloque in enumerate(_bloques(entrada, filas_por_bloque)):
+                texto, filas = _puntuar_bloque(bloque, year, numero == 0)
+                destino.write(texto)
+                total += filas
+            return total
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Como máximo dos bloques en vuelo por proceso: la memoria no crece con el
+        # archivo, y los bloques se escriben en el orden de la entrada
+        with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso, initargs=(directorio_datos,)) as pool:
+            pendientes = deque()
+            for numero, bloque in enumerate(_bloques(entrada, filas_por_bloque)):
+                pendientes.append(pool.submit(_puntuar_bloque, bloque, year, numero == 0))
+                while pendientes and (len(pendientes) >= 2 * procesos or pendientes[0].done()):
+                    texto, filas = pendientes.popleft().result()
+                    destino.write(texto)
+                    total += filas
+            while pendientes:
+                texto, filas = pendientes.popleft().result()
+                destino.write(texto)
+                total += filas
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Puntúa por lotes las respuestas de un archivo de personas encuestadas.")
+    parser.add_argument("--entrada", required=True, help="Archivo CSV o Parquet con una fila por persona.")
+    parser.add_argument("--salida", required=True, help="CSV de salida.")
+    parser.add_argument("--year", type=int, help="Año de los datos para las filas sin columna year (por defecto, el más reciente).")
+    parser.add_argument("--procesos", type=int, help="Procesos de trabajo (por defecto, uno por núcleo).")
+    parser.add_argument("--filas-por-bloque", type=int, default=FILAS_POR_BLOQUE)
+    parser.add_argument("--datos", default=DATA_DIR, help="Directorio con los CSV procesados.")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    total = puntuar_archivo(args.entrada, args.salida, args.year, args.procesos, args.filas_por_bloque, args.datos)
+    print(f"{total} personas puntuadas en {time.perf_counter() - inicio:.2f} s -> {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import os
+
+import streamlit as st
+
+from utils.helpers.instrumentacion import tramo
+
+# Este módulo se importa al arrancar la aplicación: pandas, pyarrow y los loaders
+# se importan al primer acceso a los datos para no pesar en la página de inicio.
+
+# Función de data_loader que carga cada conjunto de datos base
+LOADERS = {
+    "estados": "load_estado_data",
+    "municipios": "load_municipio_data",
+    "nacional": "load_nacional_data",
+    "cluster": "load_summary_cluster_data",
+}
+
+
+# Entradas de cada loader en la caché: cada versión de los datos es una entrada
+# nueva (ver version_datos) y las viejas se desalojan
+ENTRADAS_CACHE = 8
+
+
+def version_datos():
+    """
+    Versión de los datos de origen: huella de sus archivos (ver
+    utils.helpers.pipeline.huella_datos). Todos los loaders la reciben como
+    argumento, así que un cambio en los datos produce tablas, derivados y
+    figuras nuevos sin reiniciar el proceso.
+    """
+    from utils.helpers.pipeline import huella_datos
+
+    return huella_datos()
+
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def _tabla_compartida(directorio, nombre, version):
+    """Conjunto de datos mapeado desde la publicación Arrow (modo compartido)."""
+    from utils.helpers.compartido import adjuntar_tabla, asegurar_publicacion
+
+    asegurar_publicacion(directorio)
+    return adjuntar_tabla(os.path.join(directorio, f"{nombre}.arrow"))
+
+
+def cargar_tabla(nombre, grupos=None, version=None):
+    """
+    Carga un conjunto de datos base con los grupos de columnas indicados
+    (por defecto, los grupos que usa el dashboard) en la versión `version`.
+
+    En modo compartido se devuelve la tabla mapeada completa: el mapeo no copia
+    datos, así que restringir columnas no ahorra memoria.
+    """
+    from utils.helpers import data_loader
+    from utils.helpers.compartido import directorio_compartido
+
+    directorio = directorio_compartido()
+    if directorio:
+        return _tabla_compartida(directorio, nombre, version)
+    loader = getattr(data_loader, LOADERS[nombre])
+    return loader(tuple(grupos or data_loader.GRUPOS_DASHBOARD), version)
+
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_indice_municipios(version):
+    from utils.helpers.indices import IndiceMunicipios
+
+    return IndiceMunicipios(cargar_tabla("municipios", ("claves",), version))
+
+def _artefacto(nombre, version=None):
+    """
+    Artefacto precalculado por el pipeline, o None si falta, no está vigente o
+    los datos ya no están en la versión `version` (entonces se construye en el
+    proceso con las tablas de esa versión).
+    """
+    from utils.helpers.pipeline import cargar_artefacto
+
+    artefacto = cargar_artefacto(nombre)
+    if artefacto is not None and version is not None and version_datos() != version:
+        return None
+    return artefacto
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_agregados_cluster(version):
+    agregados = _artefacto("agregados_cluster", version)
+    if agregados is None:
+        from utils.helpers.agregados import construir_agregados_cluster
+
+        agregados = construir_agregados_cluster(cargar_tabla("municipios", version=version))
+    return agregados
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_resumen_clusters(version):
+    from utils.helpers.agregados import construir_resumen_clusters
+
+    return construir_resumen_clusters(cargar_agregados_cluster(version))
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_centroides_cluster(version):
+    """Centroides por año de los clústeres, para clasificar a quien responde el cuestionario."""
+    centroides = _artefacto("centroides_cluster", version)
+    if centroides is None:
+        from utils.helpers.clasificacion import CentroidesCluster
+
+        centroides = CentroidesCluster.construir(cargar_tabla("municipios", version=version))
+    return centroides
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_distribuciones_ingreso(version):
+    """CDF de ingresos de cada municipio × año (mismas posiciones que el índice de municipios)."""
+    from utils.helpers.percentiles import DistribucionesIngreso
+
+    return DistribucionesIngreso.desde_municipios(cargar_tabla("municipios", version=version))
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_vista(nombre, version):
+    """Vista del dashboard (columnas normalizadas y depuradas) de un conjunto de datos."""
+    vista = _artefacto(f"vista_{nombre}", version)
+    if vista is None:
+        from utils.helpers.dashboard import construir_vista
+
+        vista = construir_vista(cargar_tabla(nombre, version=version))
+    return vista
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_indice_vista(nombre, version):
+    from utils.helpers.indices import IndiceVista
+
+    return IndiceVista(cargar_vista(nombre, version))
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_promedios_globales(nombre, version):
+    """Promedios globales por año (y "Todos") de la vista del dashboard de un conjunto de datos."""
+    promedios = _artefacto(f"promedios_{nombre}", version)
+    if promedios is None:
+        from utils.helpers.agregados import construir_promedios_globales
+
+        promedios = construir_promedios_globales(cargar_vista(nombre, version))
+    return promedios
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_sketches(nombre, version):
+    """Sketches de cuantiles de cada fila de la vista del dashboard de un conjunto de datos."""
+    sketches = _artefacto(f"sketches_{nombre}", version)
+    if sketches is None:
+        from utils.helpers.agregados import DECILES_VISTA
+        from utils.helpers.cuantiles import SketchesCuantiles
+
+        sketches = SketchesCuantiles.desde_deciles(cargar_vista(nombre, version)[DECILES_VISTA].to_numpy())
+    return sketches
+
+@st.cache_resource(max_entries=ENTRADAS_CACHE)
+def cargar_paquete_figuras(version):
+    """
+    Registra en la caché de figuras el paquete precalculado de Respuestas (si está
+    vigente y corresponde a la versión `version` de los datos).
+    """
+    from utils.helpers.cache_figuras import CACHE_FIGURAS
+
+    figuras = _artefacto("paquete_figuras", version) or {}
+    CACHE_FIGURAS.cargar_paquete(figuras, version)
+    return len(figuras)
+
+
+# Datos derivados, construidos una vez por versión de los datos y compartidos
+# entre sesiones; cada uno recibe la versión
+DERIVADOS = {
+    "indice_municipios": cargar_indice_municipios,
+    "agregados_cluster": cargar_agregados_cluster,
+    "resumen_clusters": cargar_resumen_clusters,
+    "centroides_cluster": cargar_centroides_cluster,
+    "distribuciones_ingreso": cargar_distribuciones_ingreso,
+    "vista_municipios": lambda version: cargar_vista("municipios", version),
+    "vista_estados": lambda version: cargar_vista("estados", version),
+    "indice_vista_municipios": lambda version: cargar_indice_vista("municipios", version),
+    "indice_vista_estados": lambda version: cargar_indice_vista("estados", version),
+    "promedios_municipios": lambda version: cargar_promedios_globales("municipios", version),
+    "promedios_estados": lambda version: cargar_promedios_globales("estados", version),
+    "sketches_municipios": lambda version: cargar_sketches("municipios", version),
+    "sketches_estados": lambda version: cargar_sketches("estados", version),
+}
+
+
+class RegistroDatos:
+    """
+    Registro perezoso de datos para una sección.
+
+    Cada conjunto de datos se carga la primera vez que se accede a él
+    (`registro["municipios"]`) con los grupos de columnas que declara la sección
+    (None = grupos del dashboard), y queda cacheado por los loaders para los
+    siguientes reruns.
+
+    La versión de los datos se toma una sola vez por rerun (al primer acceso) y
+    se usa para todos los conjuntos de datos y para las figuras del rerun (ver
+    CacheFiguras.usar_version), así que tablas, derivados, figuras y paquete de
+    figuras siempre corresponden a los mismos datos.
+    """
+
+    def __init__(self, requisitos=None, version=None):
+        self._requisitos = requisitos or {}
+        self._cargados = {}
+        self._version = version
+        self._fijada = False
+
+    @property
+    def version(self):
+        if not self._fijada:
+            from utils.helpers.cache_figuras import CACHE_FIGURAS
+
+            if self._version is None:
+                self._version = version_datos()
+            CACHE_FIGURAS.usar_version(self._version)
+            self._fijada = True
+        return self._version
+
+    def __contains__(self, nombre):
+        return nombre in LOADERS or nombre in DERIVADOS
+
+    def __getitem__(self, nombre):
+        if nombre not in self._cargados:
+            if nombre not in DERIVADOS and nombre not in LOADERS:
+                raise KeyError(nombre)
+            with tramo("datos", conjunto=nombre):
+                if nombre in DERIVADOS:
+                    self._cargados[nombre] = DERIVADOS[nombre](self.version)
+                else:
+                    self._cargados[nombre] = cargar_tabla(nombre, self._requisitos.get(nombre), self.version)
+        return self._cargados[nombre]
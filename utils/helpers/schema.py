@@ -0,0 +1,82 @@
+import re
+
+import pandas as pd
+
+# Columnas de ingresos trimestrales que se convierten a valores mensuales
+DECILES = [f"decil_{i}" for i in range(1, 11)]
+COLUMNAS_MENSUALES = DECILES + ["ingreso_promedio_total"]
+
+# Claves geográficas con pocos valores distintos: se guardan como categorías
+CLAVES_CATEGORICAS = ["estado", "nombre_municipio", "Region"]
+
+# Grupos de columnas que una sección puede solicitar a los loaders
+GRUPOS_COLUMNAS = {
+    "claves": ["Cluster", "year", "estado", "nombre_municipio", "municipio", "Region"],
+    "ingresos": ["gini"] + COLUMNAS_MENSUALES,
+    "percepciones": [
+        "Percepcion_Economica_Personal_Positiva",
+        "Percepcion_Economica_Personal_Negativa",
+        "Percepcion_Naciona_Positiva",
+        "Percepcion_Nacional_Negativa",
+        "Consumo_Ahorro_Positivo",
+        "Consumo_Ahorro_Negativo",
+        "Incertidumbre_Economica_Personal",
+        "Incertidumbre_Economica_Nacional",
+    ],
+}
+PATRON_RESPUESTAS = re.compile(r"^p\d+_Respuesta_\d+$")
+
+
+def convertir_a_mensual(data):
+    """Convertir las columnas de ingresos trimestrales presentes a valores mensuales."""
+    columns_to_convert = [col for col in COLUMNAS_MENSUALES if col in data.columns]
+    data[columns_to_convert] = data[columns_to_convert] / 3
+    return data
+
+
+def aplicar_esquema(data):
+    """
+    Aplica el esquema compacto común a todos los conjuntos de datos:
+    - Ingresos convertidos a valores mensuales (una sola vez, en float64).
+    - Claves geográficas como `category`.
+    - Enteros reducidos al tipo más pequeño posible y medidas en float32.
+
+    Parameters:
+    - data (pd.DataFrame): Datos tal como se leen del CSV/Parquet.
+
+    Returns:
+    - pd.DataFrame: Los mismos datos con tipos compactos.
+    """
+    data = convertir_a_mensual(data)
+    tipos = {}
+    for col in data.columns:
+        serie = data[col]
+        if col in CLAVES_CATEGORICAS:
+            tipos[col] = "category"
+        elif pd.api.types.is_integer_dtype(serie):
+            tipos[col] = pd.to_numeric(serie, downcast="integer").dtype
+        elif pd.api.types.is_float_dtype(serie):
+            tipos[col] = "float32"
+    return data.astype(tipos)
+
+
+def reporte_memoria(datos):
+    """
+    Reporta el uso de memoria de cada DataFrame.
+
+    Parameters:
+    - datos (dict): Nombre -> DataFrame.
+
+    Returns:
+    - pd.DataFrame: Filas, columnas y MB (memoria profunda) por conjunto de datos.
+    """
+    filas = [
+        {
+            "datos": nombre,
+            "filas": len(df),
+            "columnas": df.shape[1],
+            "memoria_mb": df.memory_usage(deep=True).sum() / 2**20,
+        }
+        for nombre, df in datos.items()
+    ]
+    return pd.DataFrame(filas).set_index("datos")
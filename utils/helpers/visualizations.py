@@ -1,40 +1,58 @@
 # visualizations.py
 
-import streamlit as st
-import matplotlib.pyplot as plt
-import matplotlib.cm
+import json
+
 import plotly.graph_objects as go
 import plotly.express as px
-import matplotlib.colors as mcolors
 
+from utils.helpers.cache_figuras import figura_cacheada
+from utils.helpers.instrumentacion import medir
 
-@st.cache_resource
-def graficar_deciles(deciles, ingreso_usuario, titulo):
-    fig = go.Figure()
+# Paletas de graficar_deciles precalculadas para los 10 deciles (antes se generaban con
+# matplotlib en cada llamada):
+#   rojo invertido: matplotlib.cm.YlOrRd(1 - i / 11)    verde calmado: matplotlib.cm.YlGn(i / 11)
+PALETA_ROJO_INVERTIDO = [
+    "#800026", "#ac0026", "#ce0c22", "#e7231e", "#fa4a29",
+    "#fd7636", "#fd9a42", "#feb54f", "#fed36f", "#ffe48d",
+]
+PALETA_VERDE_CALMADO = [
+    "#ffffe5", "#f9fdc5", "#eaf7af", "#d2eda0", "#b1df90",
+    "#8bce81", "#64bc6f", "#3fa85b", "#288a47", "#10743c",
+]
 
-    # Calcular diferencias con respecto al ingreso del usuario
-    diferencias = {key: value - ingreso_usuario for key, value in deciles.items()}
-    valores = list(diferencias.values())
 
-    # Generar colores cálidos (rojo invertido y verde cálido)
-    rojo_invertido = [mcolors.rgb2hex(matplotlib.cm.YlOrRd(1 - i / (len(valores) + 1))) for i in range(len(valores))]
-    verde_calmado = [mcolors.rgb2hex(matplotlib.cm.YlGn(i / (len(valores) + 1))) for i in range(len(valores))]
+def _clave_clusters(clusters_seleccionados):
+    return tuple(sorted(map(str, clusters_seleccionados)))
 
-    # Crear las barras con colores personalizados
-    for i, (key, diferencia) in enumerate(diferencias.items()):
-        color = verde_calmado[i] if diferencia > 0 else rojo_invertido[i]
+
+@figura_cacheada(
+    "plantilla_deciles",
+    lambda deciles, titulo: (titulo, tuple(float(v) for v in deciles.values())),
+)
+def plantilla_deciles(deciles, titulo):
+    """
+    Partes de graficar_deciles que no dependen del ingreso del usuario: trazas,
+    títulos y estilos. Se precalcula por municipio y año en el paquete de figuras.
+
+    Parameters:
+    - deciles (dict): Ingreso promedio por decil del municipio.
+    - titulo (str): Título de la gráfica.
+
+    Returns:
+    - go.Figure: Figura sin valores; los completa `_aplicar_ingreso`.
+    """
+    fig = go.Figure()
+
+    # Una barra por decil (valores, textos y colores dependen del ingreso)
+    for i, key in enumerate(deciles):
         fig.add_trace(go.Bar(
             name=f"Decil {i + 1}",
             x=[key],
-            y=[diferencia],
-            text=f"{diferencia:+,.0f} MXN",
             textposition="outside",
-            marker_color=color
         ))
 
-    # Agregar línea base del usuario
+    # Línea base del usuario
     fig.add_trace(go.Scatter(
-        name=f"Ingreso del Usuario (${ingreso_usuario:,.0f})",
         x=list(deciles.keys()),
         y=[0] * len(deciles),
         mode="lines",
@@ -42,14 +60,7 @@ def graficar_deciles(deciles, ingreso_usuario, titulo):
         showlegend=False
     ))
 
-    # Ajustar rango dinámico para asegurar que la anotación sea visible
-    max_valor = max(valores)
-    min_valor = min(valores)
-    margen = (abs(max_valor) + abs(min_valor)) * 0.1
-    y_max = max_valor + margen
-    y_min = min_valor - margen
-
-    # Configurar anotación simplificada, movida a la derecha
+    # Anotación movida a la derecha, fuera de la gráfica
     fig.update_layout(
         annotations=[
             dict(
@@ -57,10 +68,6 @@ def graficar_deciles(deciles, ingreso_usuario, titulo):
                 yref="y",
                 x=1.05,  # Mover a la derecha, fuera de la gráfica
                 y=0,  # Centrado en el eje Y
-                text=(
-                    f"<b style='font-size:16px; color:red;'>Ingreso del Usuario</b><br>"
-                    f"<span style='font-size:16px; color:black;'>${ingreso_usuario:,.0f} MXN</span>"
-                ),
                 showarrow=False,  # Eliminar la flecha
                 align="left",  # Alinear texto a la izquierda
                 bordercolor="black",
@@ -87,7 +94,6 @@ def graficar_deciles(deciles, ingreso_usuario, titulo):
             title="Diferencia de Ingresos ($)",
             titlefont=dict(size=14),
             tickfont=dict(size=12),
-            range=[y_min, y_max],
             zeroline=True,
             zerolinewidth=2,
             zerolinecolor="brown"
@@ -98,28 +104,68 @@ def graficar_deciles(deciles, ingreso_usuario, titulo):
     return fig
 
 
-@st.cache_resource
-def graficar_percepciones(categorias_percepcion, data, nivel):
+def _aplicar_ingreso(figura, deciles, ingreso_usuario):
+    """Completa el dict de la plantilla de deciles con los valores que dependen del ingreso."""
+    # Calcular diferencias con respecto al ingreso del usuario
+    diferencias = [value - ingreso_usuario for value in deciles.values()]
+
+    # Barras con colores personalizados (rojo invertido y verde cálido)
+    for i, diferencia in enumerate(diferencias):
+        barra = figura["data"][i]
+        barra["y"] = [diferencia]
+        barra["text"] = f"{diferencia:+,.0f} MXN"
+        barra["marker"] = dict(color=PALETA_VERDE_CALMADO[i] if diferencia > 0 else PALETA_ROJO_INVERTIDO[i])
+    figura["data"][len(diferencias)]["name"] = f"Ingreso del Usuario (${ingreso_usuario:,.0f})"
+
+    # Ajustar rango dinámico para asegurar que la anotación sea visible
+    max_valor = max(diferencias)
+    min_valor = min(diferencias)
+    margen = (abs(max_valor) + abs(min_valor)) * 0.1
+    figura["layout"]["yaxis"]["range"] = [min_valor - margen, max_valor + margen]
+    figura["layout"]["annotations"][0]["text"] = (
+        f"<b style='font-size:16px; color:red;'>Ingreso del Usuario</b><br>"
+        f"<span style='font-size:16px; color:black;'>${ingreso_usuario:,.0f} MXN</span>"
+    )
+    return figura
+
+
+@medir("graficar_deciles")
+@figura_cacheada(
+    "deciles",
+    lambda deciles, ingreso_usuario, titulo: (titulo, float(ingreso_usuario), tuple(float(v) for v in deciles.values())),
+)
+def graficar_deciles(deciles, ingreso_usuario, titulo):
+    # La plantilla sale de la caché o del paquete de figuras; solo se aplica el ingreso
+    figura = json.loads(plantilla_deciles.json(deciles, titulo))
+    return go.Figure(_aplicar_ingreso(figura, deciles, ingreso_usuario))
+
+
+@medir("graficar_percepciones")
+@figura_cacheada(
+    "percepciones",
+    lambda categorias_percepcion, promedios, nivel: (nivel, tuple(categorias_percepcion.items())),
+)
+def graficar_percepciones(categorias_percepcion, promedios, nivel):
     """
     Genera un gráfico de barras que muestra la distribución de percepciones económicas.
 
     Parameters:
-    - categorias_percepcion (dict): Diccionario que asocia categorías de percepciones con las columnas en el DataFrame.
-    - data (pd.DataFrame): DataFrame que contiene los datos de percepciones.
+    - categorias_percepcion (dict): Diccionario que asocia categorías de percepciones con las columnas de los promedios.
+    - promedios (dict): Promedios precalculados por columna (p. ej. de la tabla de agregados por clúster).
     - nivel (str): Nivel de agregación (e.g., Nacional, Estatal, Municipal).
 
     Returns:
-    - None: Renderiza el gráfico directamente en Streamlit.
+    - go.Figure: Gráfico de barras (la caché de figuras la identifica por nivel y categorías).
     """
     # Crear un gráfico de barras con las percepciones
     fig = go.Figure()
     for categoria, columna in categorias_percepcion.items():
-        if columna in data.columns:
+        if columna in promedios:
             fig.add_trace(go.Bar(
                 name=categoria,
                 x=[nivel],
-                y=[data[columna].mean()],
-                text=[f"{data[columna].mean():.2f}%"],
+                y=[promedios[columna]],
+                text=[f"{promedios[columna]:.2f}%"],
                 textposition="auto"
             ))
     
@@ -129,9 +175,13 @@ def graficar_percepciones(categorias_percepcion, data, nivel):
         yaxis_title="Porcentaje (%)",
         barmode="group",
     )
-    st.plotly_chart(fig)
+    return fig
 
-@st.cache_resource
+@medir("graficar_distribucion_gini")
+@figura_cacheada(
+    "distribucion_gini",
+    lambda data, gini_municipio, nivel, bins=20: (nivel, float(gini_municipio), bins),
+)
 def graficar_distribucion_gini(data, gini_municipio, nivel, bins=20):
     """
     Genera un gráfico que muestra la distribución del coeficiente GINI
@@ -144,7 +194,7 @@ def graficar_distribucion_gini(data, gini_municipio, nivel, bins=20):
     - bins (int): Número de bins para el histograma.
 
     Returns:
-    - None: Renderiza el gráfico directamente en Streamlit.
+    - go.Figure: Histograma (la caché de figuras lo identifica por nivel, GINI y bins).
     """
     # Crear el histograma con Plotly
     fig = px.histogram(
@@ -207,12 +257,10 @@ def graficar_distribucion_gini(data, gini_municipio, nivel, bins=20):
         plot_bgcolor="rgba(245, 245, 245, 1)",  # Fondo claro
         margin=dict(t=50, b=50, l=50, r=50)  # Márgenes uniformes
     )
-    # Mostrar el gráfico en Streamlit
-    st.plotly_chart(fig)
+    return fig
 
 
 '''------------------DASHBOARD-------------------------'''
-@st.cache_resource
 def ajustar_rango_y(fig, max_value, margen=0.15):
     """
     Ajusta el rango del eje Y para evitar que los valores altos se corten.
@@ -224,11 +272,14 @@ def ajustar_rango_y(fig, max_value, margen=0.15):
         fig.update_yaxes(range=[0, 1])  # Configuración predeterminada para valores bajos o nulos
     return fig
 
-@st.cache_resource
+@medir("graficar_ingresos_deciles")
+@figura_cacheada("ingresos_deciles", lambda data, clusters_seleccionados: _clave_clusters(clusters_seleccionados))
 def graficar_ingresos_deciles(data, clusters_seleccionados):
     import plotly.express as px
 
-    melted_data = data.melt(id_vars=["Cluster_Nombre"], value_vars=["decil_1", "decil_10"])
+    # Deciles de la población combinada de cada clúster (no el promedio de los deciles municipales)
+    melted_data = data.melt(id_vars=["Cluster_Nombre"], value_vars=["decil_1_agregado", "decil_10_agregado"])
+    melted_data["variable"] = melted_data["variable"].str.removesuffix("_agregado")
     max_value = melted_data["value"].max()
 
     fig = px.bar(
@@ -253,15 +304,16 @@ def graficar_ingresos_deciles(data, clusters_seleccionados):
     fig.update_traces(texttemplate="%{y:,.0f}", textposition="outside", cliponaxis=False)
     return ajustar_rango_y(fig, max_value)
 
-@st.cache_resource
+@medir("graficar_gini")
+@figura_cacheada("gini", lambda df_clusters, clusters_seleccionados: _clave_clusters(clusters_seleccionados))
 def graficar_gini(df_clusters, clusters_seleccionados):
     import plotly.graph_objects as go
 
     # Filter only the selected clusters
     filtered_clusters = df_clusters[df_clusters["Cluster_Nombre"].isin(clusters_seleccionados)]
 
-    # Maximum GINI value for scaling
-    max_value = filtered_clusters["gini"].max()
+    # GINI de la población combinada de cada clúster (no el promedio de los GINI municipales)
+    max_value = filtered_clusters["gini_agregado"].max()
 
     # Create a bar chart
     fig = go.Figure()
@@ -270,8 +322,8 @@ def graficar_gini(df_clusters, clusters_seleccionados):
     for _, row in filtered_clusters.iterrows():
         fig.add_trace(go.Bar(
             x=[row["Cluster_Nombre"]],
-            y=[row["gini"]],
-            text=f"{row['gini']:.2f}",
+            y=[row["gini_agregado"]],
+            text=f"{row['gini_agregado']:.2f}",
             textposition="outside",
             marker_color=px.colors.qualitative.Set2[filtered_clusters.index.get_loc(_)],
             name=row["Cluster_Nombre"]
@@ -301,7 +353,8 @@ def graficar_gini(df_clusters, clusters_seleccionados):
     return fig
 
 
-@st.cache_resource
+@medir("graficar_percepciones_economicas")
+@figura_cacheada("percepciones_economicas", lambda data, clusters_seleccionados: _clave_clusters(clusters_seleccionados))
 def graficar_percepciones_economicas(data, clusters_seleccionados):
     import plotly.express as px
 
@@ -341,7 +394,8 @@ def graficar_percepciones_economicas(data, clusters_seleccionados):
     )
     return ajustar_rango_y(fig, max_value)
 
-@st.cache_resource
+@medir("graficar_consumo_ahorro")
+@figura_cacheada("consumo_ahorro", lambda data, clusters_seleccionados: _clave_clusters(clusters_seleccionados))
 def graficar_consumo_ahorro(data, clusters_seleccionados):
     import plotly.express as px
 